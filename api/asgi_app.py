@@ -0,0 +1,98 @@
+import json
+import logging
+import time
+import uuid
+from typing import Optional
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+from flask import Flask
+from controllers.recommendation_controller import RecommendationController
+from helpers.deadline import DEADLINE_HEADER
+from infra.metrics import observe_request
+from infra.profiling import PROFILE_HEADER, RequestProfiler
+from .middleware import REQUEST_ID_HEADER
+
+log = logging.getLogger(__name__)
+
+ASYNC_ROUTES = {("GET", "/recommendations")}
+
+
+def _header(scope, name: str):
+    target = name.lower().encode("latin-1")
+    for k, v in scope.get("headers") or []:
+        if k.lower() == target:
+            return v.decode("latin-1")
+    return None
+
+
+async def _send_json(send, status: int, payload: dict, request_id: str, extra_headers=()):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (REQUEST_ID_HEADER.lower().encode(), request_id.encode("latin-1")),
+            *extra_headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_asgi_app(flask_app: Flask):
+    """
+    ASGI entrypoint (run under an async worker, e.g. uvicorn).
+    - GET /recommendations is served natively async, so one worker can keep many
+      LLM calls in flight.
+    - Every other route is delegated to the Flask WSGI app unchanged.
+    - The request profiler configured on the Flask app (X-Profile-Token or
+      sampling, see infra/profiling.py) also covers the native routes.
+    """
+    controller: RecommendationController = flask_app.extensions["recommendation_controller"]
+    profiler: Optional[RequestProfiler] = flask_app.extensions.get("request_profiler")
+    wsgi = WsgiToAsgi(flask_app)
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in ASYNC_ROUTES:
+            return await wsgi(scope, receive, send)
+
+        rid = _header(scope, REQUEST_ID_HEADER) or str(uuid.uuid4())
+        start = time.time()
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        prof = None
+        if profiler is not None and profiler.wants(_header(scope, PROFILE_HEADER)):
+            prof = profiler.start()
+        try:
+            payload, status = await controller.aget_recommendations(
+                (query.get("id") or [None])[0],
+                deadline_ms=_header(scope, DEADLINE_HEADER),
+                mode=(query.get("mode") or [None])[0],
+            )
+        except Exception:
+            # Same contract as api/errors.py: do not leak internal details
+            log.exception({"event": "unhandled_exception", "path": scope["path"], "request_id": rid})
+            payload, status = {
+                "code": 500,
+                "error": "Internal Server Error",
+                "message": "An unexpected error occurred.",
+                "path": scope["path"],
+                "request_id": rid,
+            }, 500
+        finally:
+            # Also on cancellation (client gone), so the profiler slot is released
+            if prof is not None:
+                profiler.stop(prof, rid)
+        extra_headers = [(b"x-profile-written", b"1")] if prof is not None else []
+        await _send_json(send, status, payload, rid, extra_headers)
+        observe_request(scope["method"], scope["path"], status, time.time() - start)
+        log.info({
+            "event": "request_complete",
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": int((time.time() - start) * 1000),
+            "request_id": rid,
+        })
+
+    return app
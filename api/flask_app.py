@@ -6,5 +6,6 @@ from .routes import register_routes
 def create_app() -> Flask:
     app = Flask(__name__)
     controller: RecommendationController = build_recommendation_controller()
+    app.extensions["recommendation_controller"] = controller
     register_routes(app, controller)
     return app
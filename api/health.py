@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify
-from config.settings import Settings
+from config.settings import get_settings
+from infra.warmup import WARMUP
+from infra.registry import STARTUP
 
 bp = Blueprint("health", __name__)
 
@@ -10,7 +12,7 @@ def healthz():
     - Validates required config presence.
     - Optionally can ping vector store / embeddings in future.
     """
-    s = Settings()
+    s = get_settings()
     status = {
         "status": "ok",
         "environment": s.environment,
@@ -18,4 +20,14 @@ def healthz():
         "embeddings_model": s.embeddings_model,
         "vectorstore_provider": s.vectorstore_provider,
     }
-    return jsonify(status), 200
\ No newline at end of file
+    return jsonify(status), 200
+
+@bp.get("/readyz")
+def readyz():
+    """
+    Readiness: 200 once this worker's warm-up finished (or when warm-up is
+    disabled), 503 while it is pending/running or a required step failed.
+    """
+    snapshot = WARMUP.snapshot()
+    snapshot["startup"] = STARTUP.snapshot()
+    return jsonify(snapshot), 200 if snapshot["ready"] else 503
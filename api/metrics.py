@@ -0,0 +1,12 @@
+from flask import Blueprint, Response, jsonify
+from infra.metrics import render
+
+bp = Blueprint("metrics", __name__)
+
+@bp.get("/metrics")
+def metrics():
+    """Prometheus text exposition (aggregated over gunicorn workers with PROMETHEUS_MULTIPROC_DIR)."""
+    body, content_type = render()
+    if body is None:
+        return jsonify({"error": "prometheus_client is not installed"}), 501
+    return Response(body, mimetype=None, content_type=content_type)
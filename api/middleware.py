@@ -1,7 +1,10 @@
 import logging
 import time
 import uuid
+from typing import Optional
 from flask import g, request
+from infra.metrics import observe_request
+from infra.profiling import PROFILE_HEADER, RequestProfiler
 
 REQUEST_ID_HEADER = "X-Request-ID"
 
@@ -16,7 +19,7 @@ def _safe_headers(headers):
             out[k] = v
     return out
 
-def configure_logging(app):
+def configure_logging(app, profiler: Optional[RequestProfiler] = None):
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s %(levelname)s %(name)s %(message)s'
@@ -31,7 +34,11 @@ def configure_logging(app):
 
     @app.after_request
     def _after_request(response):
-        duration_ms = int((time.time() - getattr(g, "_start_time", time.time())) * 1000)
+        elapsed = time.time() - getattr(g, "_start_time", time.time())
+        duration_ms = int(elapsed * 1000)
+        # Route template, not the raw path, keeps label cardinality bounded
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        observe_request(request.method, route, response.status_code, elapsed)
         # Only sizes/metadata, avoid PII
         qs_len = len(request.query_string or b"")
         try:
@@ -55,3 +62,29 @@ def configure_logging(app):
         app.logger.info(payload)
         response.headers[REQUEST_ID_HEADER] = getattr(g, "request_id", "")
         return response
+
+    if profiler is not None:
+        # The ASGI app (api/asgi_app.py) profiles its native routes with the same instance
+        app.extensions["request_profiler"] = profiler
+        # Registered only when profiling is configured: zero cost otherwise.
+        # Runs inside the logging hooks (registered after them, so Flask calls
+        # this before_request last and this after_request first).
+        @app.before_request
+        def _start_profile():
+            if profiler.wants(request.headers.get(PROFILE_HEADER)):
+                g._profile = profiler.start()
+
+        @app.after_request
+        def _stop_profile(response):
+            prof = g.pop("_profile", None)
+            if prof is not None:
+                profiler.stop(prof, getattr(g, "request_id", None))
+                response.headers["X-Profile-Written"] = "1"
+            return response
+
+        @app.teardown_request
+        def _teardown_profile(exc):
+            # after_request is skipped when a response could not be built
+            prof = g.pop("_profile", None)
+            if prof is not None:
+                profiler.stop(prof, getattr(g, "request_id", None))
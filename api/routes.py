@@ -1,6 +1,7 @@
 from flask import Flask
 from controllers.recommendation_controller import RecommendationController
 from .health import bp as health_bp
+from .metrics import bp as metrics_bp
 
 def register_routes(app: Flask, controller: RecommendationController):
     # Business endpoints
@@ -9,6 +10,17 @@ def register_routes(app: Flask, controller: RecommendationController):
         view_func=controller.get_recommendations,
         methods=["GET"]
     )
+    app.add_url_rule(
+        "/recommendations/stream",
+        view_func=controller.stream_recommendations,
+        methods=["GET"]
+    )
+    app.add_url_rule(
+        "/recommendations/batch",
+        view_func=controller.batch_recommendations,
+        methods=["POST"]
+    )
 
-    # Health endpoints
+    # Health & metrics endpoints
     app.register_blueprint(health_bp)
+    app.register_blueprint(metrics_bp)
@@ -0,0 +1,118 @@
+"""
+Synthetic product catalog and customer profiles in local Chroma collections.
+
+Names follow the real catalog's shape (see data/sample.py), e.g.
+"Ryker LumaTech&trade; Tee (Crew-neck)-XS-Blue": a base product with
+size/color variants, so dedupe/grouping does the same work it does in
+production. Vectors come from FakeEmbeddings (no network).
+"""
+import logging
+import random
+from typing import List, Optional
+import numpy as np
+from bench.fakes import FakeEmbeddings
+from helpers.product_grouping import enrich_product_metadata
+from vectorstores.chroma_store import ChromaStore
+
+log = logging.getLogger(__name__)
+
+PRODUCTS_COLLECTION = "bench_products"
+PROFILES_COLLECTION = "bench_profiles"
+
+FIRST = ["Ryker", "Aero", "Helios", "Juno", "Atlas", "Nova", "Zephyr", "Orion", "Vega", "Lyra", "Cobalt", "Summit",
+         "Ember", "Drift", "Pulse", "Stride", "Tide", "Ridge", "Haven", "Echo"]
+TECH = ["LumaTech&trade;", "DryFit", "ThermaCore", "FlexWeave", "CoolMax", "StormShell", "AirMesh", "SoftTouch"]
+ITEMS = {
+    "tops": ["Tee", "Tank", "Hoodie", "Sweatshirt", "Jacket", "Polo"],
+    "bottoms": ["Short", "Pant", "Legging", "Jogger", "Capri"],
+    "gear": ["Backpack", "Duffle", "Water Bottle", "Yoga Mat", "Headband"],
+    "shoes": ["Runner", "Trainer", "Sneaker", "Slide"],
+    "women tops": ["Bra", "Crop Tee", "Camisole", "Pullover"],
+}
+STYLES = ["", " (Crew-neck)", " (V-neck)", " (Zip)", " (Relaxed)", " (Slim)"]
+SIZES = ["XS", "S", "M", "L", "XL"]
+COLORS = ["Blue", "Black", "Red", "Green", "Gray", "White", "Orange", "Purple"]
+
+
+def _base_products(n_bases: int, rng: random.Random) -> List[tuple]:
+    """(base_name, category) pairs; unique names, deterministic for a seed."""
+    cats = list(ITEMS)
+    seen, out = set(), []
+    while len(out) < n_bases:
+        cat = rng.choice(cats)
+        name = f"{rng.choice(FIRST)} {rng.choice(TECH)} {rng.choice(ITEMS[cat])}{rng.choice(STYLES)}"
+        if name in seen:
+            name = f"{name} {len(out)}"
+        seen.add(name)
+        out.append((name, cat))
+    return out
+
+
+def build_catalog(
+    persist_dir: str,
+    n_skus: int = 10_000,
+    n_profiles: int = 1_000,
+    variants_per_product: int = 8,
+    embeddings: Optional[FakeEmbeddings] = None,
+    seed: int = 0,
+    batch_size: int = 2_000,
+) -> dict:
+    """
+    Write `n_skus` variant rows and `n_profiles` customer profiles.
+    Variant vectors = base vector + small noise; profile vectors = mean of
+    the products they viewed/ordered (as real profiles are behaviour summaries).
+    Returns a summary dict.
+    """
+    rng = random.Random(seed)
+    nrng = np.random.default_rng(seed)
+    embeddings = embeddings or FakeEmbeddings(seed=seed)
+    products = ChromaStore(PRODUCTS_COLLECTION, persist_dir, embedding_lc=embeddings.lc)
+    profiles = ChromaStore(PROFILES_COLLECTION, persist_dir, embedding_lc=embeddings.lc)
+
+    n_bases = max(1, n_skus // variants_per_product)
+    bases = _base_products(n_bases, rng)
+    base_vecs = np.stack([embeddings.vector(name) for name, _ in bases])
+    log.info("bench catalog: %d base products", n_bases)
+
+    names: List[str] = []
+    vectors = np.empty((n_skus, embeddings.dim), dtype=np.float32)
+    for start in range(0, n_skus, batch_size):
+        ids, vecs, metas, docs = [], [], [], []
+        for pid in range(start + 1, min(n_skus, start + batch_size) + 1):
+            b = (pid - 1) % n_bases
+            base, cat = bases[b]
+            name = f"{base}-{SIZES[rng.randrange(len(SIZES))]}-{COLORS[rng.randrange(len(COLORS))]}"
+            vec = base_vecs[b] + nrng.normal(0, 0.05, embeddings.dim).astype(np.float32)
+            vec /= np.linalg.norm(vec)
+            vectors[pid - 1] = vec
+            names.append(name)
+            price = round(rng.uniform(10, 150), 2)
+            md = enrich_product_metadata({"product_id": pid, "name": name, "categories": cat, "price": price})
+            ids.append(f"sku-{pid}")
+            vecs.append(vec.tolist())
+            metas.append(md)
+            docs.append(f"Product ID: {pid}\nName: {name}\nCategories: {cat}\nPrice: {price}")
+        products.upsert_embeddings(ids, vecs, metas, docs)
+        log.info("bench catalog: %d/%d skus", min(n_skus, start + batch_size), n_skus)
+
+    for start in range(0, n_profiles, batch_size):
+        ids, vecs, metas, docs = [], [], [], []
+        for cid in range(start + 1, min(n_profiles, start + batch_size) + 1):
+            ordered = rng.sample(range(n_skus), min(n_skus, rng.randint(1, 4)))
+            viewed = rng.sample(range(n_skus), min(n_skus, rng.randint(2, 8)))
+            text = (
+                f"Customer {cid} placed orders for "
+                + ", ".join(f"'{names[i]}'" for i in ordered)
+                + ", viewed products like "
+                + ", ".join(f"'{names[i]}'" for i in viewed)
+                + "."
+            )
+            vec = vectors[ordered + viewed].mean(axis=0)
+            vec /= np.linalg.norm(vec) or 1.0
+            ids.append(f"cust-{cid}")
+            vecs.append(vec.tolist())
+            metas.append({"customer_id": str(cid)})
+            docs.append(text)
+        profiles.upsert_embeddings(ids, vecs, metas, docs)
+
+    return {"skus": n_skus, "base_products": n_bases, "profiles": n_profiles, "dim": embeddings.dim, "seed": seed}
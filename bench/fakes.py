@@ -0,0 +1,194 @@
+"""
+Deterministic offline stand-ins for the LLM and embeddings providers.
+Latency is simulated with sleep, so concurrency behaves like network I/O.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from llm.interfaces import EmbeddingsClient, LLMClient
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# bench/catalog.py profiles start with "Customer <id> placed orders for ..."
+CUSTOMER_RE = re.compile(r"\bCustomer (\d+)\b")
+
+
+def _latency(base_seconds: float, jitter: float, rng: random.Random) -> float:
+    """base ± jitter (fraction of base), never negative."""
+    if base_seconds <= 0:
+        return 0.0
+    return max(0.0, base_seconds * (1.0 + rng.uniform(-jitter, jitter)))
+
+
+class FakeEmbeddings(EmbeddingsClient):
+    """
+    Hashed bag-of-words vectors: every token maps to a fixed pseudo-random
+    direction, a text is the normalized sum of its tokens. Similar names get
+    similar vectors, which is all the search stages need.
+    """
+
+    def __init__(self, dim: int = 256, latency_seconds: float = 0.0, jitter: float = 0.2, seed: int = 0):
+        self.model = f"fake-embeddings-{dim}"
+        self.dim = dim
+        self.latency_seconds = latency_seconds
+        self.jitter = jitter
+        self.seed = seed
+        self._tokens: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._lc = _LangChainAdapter(self)
+
+    def _token_vec(self, token: str) -> np.ndarray:
+        vec = self._tokens.get(token)
+        if vec is None:
+            rng = np.random.default_rng(zlib.crc32(token.encode("utf-8")) ^ self.seed)
+            vec = rng.standard_normal(self.dim).astype(np.float32)
+            with self._lock:
+                self._tokens[token] = vec
+        return vec
+
+    def vector(self, text: str) -> np.ndarray:
+        """Embedding without simulated latency (used to build the synthetic catalog)."""
+        acc = np.zeros(self.dim, dtype=np.float32)
+        for tok in TOKEN_RE.findall((text or "").lower()):
+            acc += self._token_vec(tok)
+        n = np.linalg.norm(acc)
+        return acc / n if n else acc
+
+    def _sleep(self) -> None:
+        time.sleep(_latency(self.latency_seconds, self.jitter, self._rng))
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        self._sleep()
+        return [self.vector(t).tolist() for t in texts]
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(_latency(self.latency_seconds, self.jitter, self._rng))
+        return [self.vector(t).tolist() for t in texts]
+
+    async def aembed_one(self, text: str) -> List[float]:
+        return (await self.aembed([text]))[0]
+
+    @property
+    def lc(self) -> Embeddings:
+        return self._lc
+
+
+class _LangChainAdapter(Embeddings):
+    def __init__(self, owner: FakeEmbeddings):
+        self._owner = owner
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._owner.embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._owner.embed_one(text)
+
+
+class FakeLLM(LLMClient):
+    """
+    Answers the recommendation prompt with valid JSON picked from the
+    shortlist embedded in the prompt (JSON or compact `id|name` encoding).
+    The choice depends only on the prompt, so runs are reproducible.
+    - latency_seconds / jitter: simulated generation time.
+    - error_rate: fraction of calls that raise (exercises fallback paths).
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.5,
+        jitter: float = 0.2,
+        error_rate: float = 0.0,
+        picks: int = 10,
+        chunk_chars: int = 24,
+        seed: int = 0,
+    ):
+        self.latency_seconds = latency_seconds
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.picks = picks
+        self.chunk_chars = chunk_chars
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    @staticmethod
+    def _shortlist(prompt: str) -> List[tuple]:
+        block = prompt.rsplit("Shortlist", 1)[-1].split("\n", 1)[-1].strip()
+        try:
+            items = json.loads(block)
+            return [(int(i["product_id"]), i["name"]) for i in items]
+        except (ValueError, KeyError, TypeError):
+            pass
+        out = []
+        for line in block.splitlines():
+            alias, _, name = line.partition("|")
+            if alias.strip().isdigit():
+                out.append((int(alias), name))
+        return out
+
+    @staticmethod
+    def _customer_id(prompt: str) -> int:
+        """Id from the profile section of the prompt (the schema requires an int); 0 if absent."""
+        m = CUSTOMER_RE.search(prompt.rsplit("Customer profile", 1)[-1])
+        return int(m.group(1)) if m else 0
+
+    def _answer(self, prompt: str) -> str:
+        items = self._shortlist(prompt)
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        rng = random.Random(digest)
+        picked = rng.sample(items, min(self.picks, len(items)))
+        return json.dumps({
+            "customer_id": self._customer_id(prompt),
+            "recommendations": [
+                {"product_id": pid, "product_name": name, "reason": "Matches the customer's recent interests."}
+                for pid, name in picked
+            ],
+        })
+
+    def _draw(self) -> tuple[float, bool]:
+        with self._lock:
+            self.calls += 1
+            return _latency(self.latency_seconds, self.jitter, self._rng), self._rng.random() < self.error_rate
+
+    def generate(self, *, prompt: str, **kwargs) -> str:
+        delay, fail = self._draw()
+        timeout = kwargs.get("timeout")
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("fake LLM timed out")
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError("fake LLM failure")
+        return self._answer(prompt)
+
+    async def agenerate(self, *, prompt: str, **kwargs) -> str:
+        delay, fail = self._draw()
+        timeout = kwargs.get("timeout")
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError("fake LLM timed out")
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("fake LLM failure")
+        return self._answer(prompt)
+
+    def stream(self, *, prompt: str, **kwargs) -> Iterator[str]:
+        delay, fail = self._draw()
+        text = self._answer(prompt)
+        n = max(1, (len(text) + self.chunk_chars - 1) // self.chunk_chars)
+        for i in range(n):
+            time.sleep(delay / n)
+            if fail and i == n // 2:
+                raise RuntimeError("fake LLM failure")
+            yield text[i * self.chunk_chars:(i + 1) * self.chunk_chars]
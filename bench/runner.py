@@ -0,0 +1,331 @@
+"""
+Offline benchmark: synthetic catalog + fake providers, real pipeline.
+
+    python -m bench.runner build --dir /tmp/recs-bench --skus 100000 --profiles 5000
+    python -m bench.runner run --dir /tmp/recs-bench --target service --requests 500 --concurrency 16 \
+        --llm-latency-ms 400 --out before.json
+    python -m bench.runner run ... --target flask --out after.json
+    python -m bench.runner compare before.json after.json
+    python -m bench.runner smoke --dir /tmp/recs-smoke     # tiny catalog, zero latency, all targets
+
+Reports end-to-end and per-stage (recs_stage_seconds stages) p50/p95/p99 in
+milliseconds plus throughput, as JSON. Nothing leaves the machine.
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from bench.catalog import PRODUCTS_COLLECTION, PROFILES_COLLECTION, build_catalog
+from bench.fakes import FakeEmbeddings, FakeLLM
+from data.repositories import CustomerProfileRepository, ProductCatalogRepository
+from helpers.deadline import DEADLINE_HEADER, Deadline
+from infra.metrics import add_stage_listener, remove_stage_listener
+from llm.clients.cached_chat import CachedChat
+from llm.prompt_renderer import PromptRenderer
+from service.recommender_service import RecommenderService
+from service.result_cache import RecommendationResultCache
+from vectorstores.chroma_store import ChromaStore
+
+log = logging.getLogger("bench")
+
+PERCENTILES = (50, 95, 99)
+
+# Outcome of one request, as reported by a driver
+OK, DEGRADED, ERROR = "ok", "degraded", "error"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def summarize(values_ms: List[float]) -> dict:
+    data = sorted(values_ms)
+    out = {"count": len(data)}
+    for q in PERCENTILES:
+        out[f"p{q}"] = round(percentile(data, q), 3)
+    out["mean"] = round(sum(data) / len(data), 3) if data else 0.0
+    out["max"] = round(data[-1], 3) if data else 0.0
+    return out
+
+
+class StageRecorder:
+    """Collects raw stage timings from infra.metrics.stage_timer."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def __call__(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.samples[stage].append(seconds * 1000.0)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {stage: summarize(v) for stage, v in sorted(self.samples.items())}
+
+
+def build_service(args) -> RecommenderService:
+    """Same composition as infra.factory.build_recommender_service, with fake providers."""
+    embeddings = FakeEmbeddings(dim=args.dim, latency_seconds=args.embed_latency_ms / 1000.0, seed=args.seed)
+    llm = FakeLLM(
+        latency_seconds=args.llm_latency_ms / 1000.0,
+        jitter=args.llm_jitter,
+        error_rate=args.llm_error_rate,
+        seed=args.seed,
+    )
+    if args.llm_cache:
+        llm = CachedChat(llm, model="fake-llm")
+    profiles = CustomerProfileRepository(ChromaStore(PROFILES_COLLECTION, args.dir, embedding_lc=embeddings.lc))
+    products = ProductCatalogRepository(
+        ChromaStore(PRODUCTS_COLLECTION, args.dir, embedding_lc=embeddings.lc), fetch_k=args.fetch_k,
+        embeddings=embeddings,
+    )
+    result_cache = RecommendationResultCache() if args.result_cache else None
+    return RecommenderService(
+        llm=llm,
+        profiles=profiles,
+        products=products,
+        renderer=PromptRenderer(),
+        result_cache=result_cache,
+        shortlist_k=args.shortlist_k,
+        prompt_encoding=args.prompt_encoding,
+    )
+
+
+def _service_driver(service: RecommenderService, args) -> Callable[[str], str]:
+    def call(cid: str) -> str:
+        deadline = Deadline.from_ms(args.deadline_ms)
+        if args.mode == "fast":
+            result = service.get_fast_recommendations(cid, deadline=deadline)
+        else:
+            result = service.get_recommendations(cid, deadline=deadline)
+        return OK if result.degraded is None else DEGRADED
+    return call
+
+
+def _flask_driver(service: RecommenderService, args) -> Callable[[str], str]:
+    """The real Flask routes/controller/middleware, driven in-process through test clients."""
+    from flask import Flask
+    from api.errors import register_error_handlers
+    from api.middleware import configure_logging
+    from api.routes import register_routes
+    from controllers.recommendation_controller import RecommendationController
+
+    app = Flask("bench")
+    controller = RecommendationController(service, request_deadline_ms=args.deadline_ms)
+    app.extensions["recommendation_controller"] = controller
+    register_routes(app, controller)
+    configure_logging(app)
+    register_error_handlers(app)
+    logging.getLogger().setLevel(logging.WARNING)  # request logs would dominate the timings
+    app.logger.setLevel(logging.WARNING)
+    local = threading.local()
+
+    def call(cid: str) -> str:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        headers = {DEADLINE_HEADER: str(args.deadline_ms)} if args.deadline_ms else {}
+        resp = client.get(f"/recommendations?id={cid}&mode={args.mode}", headers=headers)
+        if resp.status_code >= 400:
+            log.error("request failed customer_id=%s status=%d", cid, resp.status_code)
+            return ERROR
+        return DEGRADED if "degraded" in (resp.get_json() or {}) else OK
+    return call
+
+
+def run(args) -> dict:
+    service = build_service(args)
+    call = _flask_driver(service, args) if args.target == "flask" else _service_driver(service, args)
+    rng = random.Random(args.seed)
+    ids = [str(rng.randint(1, args.profiles)) for _ in range(args.requests + args.warmup)]
+
+    for cid in ids[:args.warmup]:
+        if call(cid) == ERROR:
+            raise RuntimeError(f"warm-up request for customer {cid} failed; see the log above")
+
+    recorder = StageRecorder()
+    add_stage_listener(recorder)
+    latencies: List[float] = []
+    errors = degraded = 0
+    lock = threading.Lock()
+
+    def one(cid: str) -> None:
+        nonlocal errors, degraded
+        start = time.perf_counter()
+        try:
+            outcome = call(cid)
+        except Exception:
+            log.exception("request failed customer_id=%s", cid)
+            outcome = ERROR
+        elapsed = (time.perf_counter() - start) * 1000.0
+        with lock:
+            # Failed requests are counted, but their (often very short) latencies stay out of the percentiles
+            if outcome == ERROR:
+                errors += 1
+                return
+            latencies.append(elapsed)
+            if outcome == DEGRADED:
+                degraded += 1
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(one, ids[args.warmup:]))
+    finally:
+        remove_stage_listener(recorder)
+    wall = time.perf_counter() - started
+
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("func", "out")},
+        "requests": args.requests,
+        "errors": errors,
+        "degraded": degraded,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "latency_ms": summarize(latencies),
+        "stages_ms": recorder.summary(),
+    }
+
+
+def compare(base: dict, new: dict) -> dict:
+    """Per-metric (new - base) and ratio for end-to-end, stage percentiles and throughput."""
+    def delta(a: float, b: float) -> dict:
+        return {"base": a, "new": b, "diff": round(b - a, 3), "ratio": round(b / a, 3) if a else None}
+
+    out = {"throughput_rps": delta(base["throughput_rps"], new["throughput_rps"]), "latency_ms": {}, "stages_ms": {}}
+    for q in PERCENTILES:
+        key = f"p{q}"
+        out["latency_ms"][key] = delta(base["latency_ms"][key], new["latency_ms"][key])
+    for stage in sorted(set(base["stages_ms"]) | set(new["stages_ms"])):
+        a, b = base["stages_ms"].get(stage), new["stages_ms"].get(stage)
+        if a is None or b is None:
+            out["stages_ms"][stage] = {"only_in": "new" if a is None else "base"}
+            continue
+        out["stages_ms"][stage] = {f"p{q}": delta(a[f"p{q}"], b[f"p{q}"]) for q in PERCENTILES}
+    return out
+
+
+def _write(payload: dict, path: Optional[str]) -> None:
+    text = json.dumps(payload, indent=2, sort_keys=True)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+def cmd_build(args) -> None:
+    summary = build_catalog(
+        args.dir,
+        n_skus=args.skus,
+        n_profiles=args.profiles,
+        variants_per_product=args.variants,
+        embeddings=FakeEmbeddings(dim=args.dim, seed=args.seed),
+        seed=args.seed,
+    )
+    _write(summary, None)
+
+
+def cmd_run(args) -> None:
+    _write(run(args), args.out)
+
+
+def cmd_compare(args) -> None:
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    _write(compare(base, new), args.out)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Offline recommendation pipeline benchmark.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build", help="write the synthetic catalog and profiles")
+    p.add_argument("--dir", required=True, help="Chroma persist dir for the bench collections")
+    p.add_argument("--skus", type=int, default=10_000)
+    p.add_argument("--profiles", type=int, default=1_000)
+    p.add_argument("--variants", type=int, default=8, help="size/color variants per base product")
+    p.add_argument("--dim", type=int, default=256)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser("run", help="drive the pipeline and report latency percentiles")
+    p.add_argument("--dir", required=True)
+    p.add_argument("--target", choices=["service", "flask"], default="service")
+    p.add_argument("--mode", choices=["llm", "fast"], default="llm")
+    p.add_argument("--requests", type=int, default=200)
+    p.add_argument("--warmup", type=int, default=10)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--profiles", type=int, default=1_000, help="customer ids are drawn from 1..profiles")
+    p.add_argument("--dim", type=int, default=256, help="must match the build")
+    p.add_argument("--llm-latency-ms", type=float, default=500)
+    p.add_argument("--llm-jitter", type=float, default=0.2)
+    p.add_argument("--llm-error-rate", type=float, default=0.0)
+    p.add_argument("--embed-latency-ms", type=float, default=50)
+    p.add_argument("--deadline-ms", type=int, default=0, help="per-request deadline (0 = none)")
+    p.add_argument("--shortlist-k", type=int, default=50)
+    p.add_argument("--fetch-k", type=int, default=105)
+    p.add_argument("--prompt-encoding", choices=["json", "compact"], default="json")
+    p.add_argument("--llm-cache", action="store_true", help="put CachedChat in front of the fake LLM")
+    p.add_argument("--result-cache", action="store_true", help="enable the per-customer result cache")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", help="also write the JSON report here")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("compare", help="diff two run reports")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--out")
+    p.set_defaults(func=cmd_compare)
+
+    p = sub.add_parser("smoke", help="tiny catalog, zero latency, both targets; fails on any error")
+    p.add_argument("--dir", required=True)
+    p.set_defaults(func=cmd_smoke)
+    return parser
+
+
+def smoke(directory: str) -> dict:
+    """
+    Run the documented build/run commands end to end on a tiny catalog with
+    zero simulated latency (service and flask targets, llm and fast modes).
+    Raises if any request errors or is degraded.
+    """
+    parser = build_parser()
+    cmd_build(parser.parse_args(["build", "--dir", directory, "--skus", "200", "--profiles", "20", "--dim", "32"]))
+    reports = {}
+    for target in ("service", "flask"):
+        for mode in ("llm", "fast"):
+            args = parser.parse_args([
+                "run", "--dir", directory, "--target", target, "--mode", mode, "--requests", "10", "--warmup", "2",
+                "--concurrency", "2", "--profiles", "20", "--dim", "32", "--llm-latency-ms", "0",
+                "--embed-latency-ms", "0",
+            ])
+            report = run(args)
+            if report["errors"] or report["degraded"] or report["latency_ms"]["count"] != args.requests:
+                raise RuntimeError(f"smoke run {target}/{mode} failed: {report}")
+            reports[f"{target}/{mode}"] = {"errors": 0, "degraded": 0, "p50_ms": report["latency_ms"]["p50"]}
+    return reports
+
+
+def cmd_smoke(args) -> None:
+    _write(smoke(args.dir), None)
+
+
+def main():
+    args = build_parser().parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s %(message)s')
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 from pydantic import Field, field_validator
 from typing import Optional
+from functools import lru_cache
 import os
 from pathlib import Path
 
@@ -22,12 +23,38 @@ class Settings(BaseSettings):
     openai_api_key: str = Field(default_factory=lambda: os.getenv("OPENAI_API_KEY"))
     openai_base_url: Optional[str] = Field(default_factory=lambda: os.getenv("OPENAI_BASE_URL", None))
 
+    # Multi-provider routing: e.g. "GROQ,OPENAI" (first is preferred). Empty → llm_provider only.
+    llm_providers: str = ""
+    openai_llm_model: str = "gpt-4o-mini"
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_seconds: float = 0.5
+    llm_hedge_default_seconds: float = 2.0
+    llm_rate_limit_cooldown_seconds: float = 10.0
+    # Router threads = LLM calls in flight per process, hedges included (sync path).
+    # 0 → 2 × max(batch_max_concurrency, llm_router_concurrency) × providers
+    llm_router_max_workers: int = 0
+    llm_router_concurrency: int = 16  # expected concurrent LLM requests (gunicorn threads, precompute --workers)
+
+    # LLM response cache (only responses that parse are stored)
+    llm_cache_enabled: bool = True
+    llm_cache_size: int = 1024
+    llm_cache_ttl_seconds: float = 3600
+    llm_cache_path: Optional[str] = None
+    llm_cache_disk_max_entries: int = 50_000
+    llm_cache_deterministic_only: bool = True  # cache temperature-0 calls only
+
     # Embeddings
     embeddings_provider: str = "openai"
     embeddings_model: str = "text-embedding-3-small"
+    embeddings_cache_enabled: bool = True
+    embeddings_cache_size: int = 4096
+    embeddings_cache_path: Optional[str] = None  # e.g. /var/cache/recs/embeddings.sqlite3
 
-    # Vector store
+    # Vector store ("chroma" | "numpy": products served from an in-memory snapshot of the Chroma catalog)
     vectorstore_provider: str = "chroma"
+    numpy_snapshot_dir: str = Field(
+        default_factory=lambda: str((VECTORSTORES_DIR / "product_catalog_numpy_snapshot").resolve())
+    )
     chroma_dir_profiles: str = Field(
         default_factory=lambda: str((VECTORSTORES_DIR / "customer_profile_vectorstore").resolve())
     )
@@ -36,6 +63,55 @@ class Settings(BaseSettings):
     )
     chroma_collection_profiles: str = "customer_profiles_collection"
     chroma_collection_products: str = "product_catalog"
+    # Variant-collapsed catalog (ingest.py build-base); product search uses it when set
+    chroma_collection_products_base: Optional[str] = None
+
+    # Shortlist sizing for the MMR product search
+    shortlist_k: int = 50
+    product_search_fetch_k: int = 105
+
+    # Recommendation prompt: "json" or "compact" (aliased ids, id|name lines);
+    # token budget trims the shortlist block (0 = no limit)
+    prompt_encoding: str = "json"
+    prompt_shortlist_token_budget: int = 0
+
+    # Recommendation result cache (per worker)
+    result_cache_enabled: bool = True
+    result_cache_ttl_seconds: float = 300
+    result_cache_max_entries: int = 10_000
+
+    # Precomputed recommendations (precompute.py); serving reads them first when set
+    precomputed_store_path: Optional[str] = None
+    precomputed_max_age_seconds: float = 86_400
+
+    # Shared HTTP pool for the LLM/embeddings SDKs (one per worker process)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 60
+    http2_enabled: bool = False  # needs httpx[http2]
+    http_connect_timeout_seconds: float = 5
+    http_read_timeout_seconds: float = 60
+
+    # Per-worker warm-up before traffic (gunicorn post_worker_init); /readyz reports it
+    warmup_enabled: bool = False
+
+    # Per-request time budget for GET /recommendations (0 disables); clients may
+    # lower/raise it with X-Request-Deadline-Ms (1..request_deadline_max_ms; 0 is ignored)
+    request_deadline_ms: int = 3000
+    request_deadline_max_ms: int = 30_000
+
+    # Serve the locally ranked shortlist (mode=fast ranking) when the LLM fails or times out
+    fast_fallback_enabled: bool = True
+
+    # Request profiling (cProfile .pstats per request); off unless a dir is set.
+    # Triggered by X-Profile-Token == profiling_admin_token, or sampled at profiling_sample_rate.
+    profiling_dir: Optional[str] = None
+    profiling_sample_rate: float = 0.0
+    profiling_admin_token: Optional[str] = None
+
+    # POST /recommendations/batch
+    batch_max_ids: int = 1000
+    batch_max_concurrency: int = 16
 
     @field_validator("openai_api_key")
     @classmethod
@@ -45,4 +121,10 @@ class Settings(BaseSettings):
         return v
 
 class Config:
-    env_file = ".env"
\ No newline at end of file
+    env_file = ".env"
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Process-wide Settings (environment and .env are read once). Offline jobs that
+    override fields build their own Settings() instead of mutating this one."""
+    return Settings()
\ No newline at end of file
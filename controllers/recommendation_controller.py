@@ -1,14 +1,138 @@
 # app/controller/recommendation_controller.py
-from flask import jsonify, request
+import asyncio
+import json
+import logging
+from typing import Optional
+from flask import Response, jsonify, request, stream_with_context
 from service.recommender_service import RecommenderService
+from helpers.deadline import DEADLINE_HEADER, Deadline
+
+log = logging.getLogger(__name__)
+
+# mode=llm (default): LLM picks and explains; mode=fast: local ranking, no LLM call
+MODES = ("llm", "fast")
 
 class RecommendationController:
-    def __init__(self, service: RecommenderService):
+    def __init__(
+        self,
+        service: RecommenderService,
+        batch_max_ids: int = 1000,
+        batch_max_concurrency: int = 16,
+        request_deadline_ms: int = 3000,
+        request_deadline_max_ms: int = 30_000,
+    ):
         self.service = service
+        self.batch_max_ids = batch_max_ids
+        self.batch_max_concurrency = batch_max_concurrency
+        self.request_deadline_ms = request_deadline_ms
+        self.request_deadline_max_ms = request_deadline_max_ms
+
+    def _deadline(self, header_value: Optional[str]) -> Optional[Deadline]:
+        """
+        Request budget from the X-Request-Deadline-Ms header, clamped to
+        [1, request_deadline_max_ms], else the configured default. Only the
+        configured default can disable it (0): a header value of 0 or garbage
+        falls back to the default.
+        """
+        budget_ms = self.request_deadline_ms
+        if header_value is not None and header_value.strip().isdigit() and int(header_value) > 0:
+            budget_ms = min(int(header_value), self.request_deadline_max_ms)
+        return Deadline.from_ms(budget_ms)
+
+    @staticmethod
+    def _log_budget(customer_id: str, deadline: Optional[Deadline]) -> None:
+        if deadline is not None:
+            log.info({"event": "request_budget", "customer_id": customer_id, **deadline.summary()})
 
     def get_recommendations(self):
         id_param = request.args.get("id")
         if id_param is None or not id_param.isdigit():
             return jsonify({"error": "id (int) is required"}), 400
-        result = self.service.get_recommendations(customer_id=str(id_param))
-        return jsonify(result.model_dump()), 200
+        mode = request.args.get("mode", "llm")
+        if mode not in MODES:
+            return jsonify({"error": f"mode must be one of {', '.join(MODES)}"}), 400
+        deadline = self._deadline(request.headers.get(DEADLINE_HEADER))
+        if mode == "fast":
+            result = self.service.get_fast_recommendations(customer_id=str(id_param), deadline=deadline)
+        else:
+            result = self.service.get_recommendations(customer_id=str(id_param), deadline=deadline)
+        self._log_budget(id_param, deadline)
+        return jsonify(result.model_dump(exclude_none=True)), 200
+
+    def batch_recommendations(self):
+        """
+        POST {"customer_ids": [...], "concurrency": n}
+        Streams one NDJSON line per customer as soon as it completes.
+        """
+        body = request.get_json(silent=True) or {}
+        ids = body.get("customer_ids")
+        if not isinstance(ids, list) or not ids or not all(str(i).isdigit() for i in ids):
+            return jsonify({"error": "customer_ids (list of int) is required"}), 400
+        if len(ids) > self.batch_max_ids:
+            return jsonify({"error": f"at most {self.batch_max_ids} customer_ids per request"}), 400
+        try:
+            concurrency = int(body.get("concurrency") or self.batch_max_concurrency)
+        except (TypeError, ValueError):
+            return jsonify({"error": "concurrency must be an int"}), 400
+        concurrency = max(1, min(concurrency, self.batch_max_concurrency))
+
+        # Bulk profile fetch happens here, before the 200 is sent: a store error becomes a 500, not a truncated stream
+        results = self.service.get_recommendations_batch([str(i) for i in ids], concurrency=concurrency)
+
+        def _lines():
+            for cid, result, err in results:
+                if err is not None:
+                    # Do not leak internal details; the log has the traceback
+                    log.error({"event": "batch_item_failed", "customer_id": cid}, exc_info=err)
+                    line = {"customer_id": cid, "status": "error", "error": "recommendation failed"}
+                else:
+                    line = {"customer_id": cid, "status": "ok", "result": result.model_dump(exclude_none=True)}
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+
+        return Response(stream_with_context(_lines()), mimetype="application/x-ndjson")
+
+    def stream_recommendations(self):
+        """
+        Server-Sent Events: one `recommendation` event per validated item as the
+        LLM generates it, then `done` (or `error`).
+        """
+        id_param = request.args.get("id")
+        if id_param is None or not id_param.isdigit():
+            return jsonify({"error": "id (int) is required"}), 400
+
+        def _events():
+            count = 0
+            try:
+                for item in self.service.stream_recommendations(customer_id=str(id_param)):
+                    count += 1
+                    yield f"event: recommendation\ndata: {item.model_dump_json()}\n\n"
+            except Exception:
+                # Headers are already sent; report in-band without internal details
+                log.exception({"event": "stream_failed", "customer_id": id_param})
+                yield f"event: error\ndata: {json.dumps({'message': 'An unexpected error occurred.'})}\n\n"
+                return
+            yield f"event: done\ndata: {json.dumps({'customer_id': int(id_param), 'count': count})}\n\n"
+
+        return Response(
+            stream_with_context(_events()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def aget_recommendations(
+        self, id_param: Optional[str], deadline_ms: Optional[str] = None, mode: Optional[str] = None
+    ) -> tuple[dict, int]:
+        """Framework-agnostic async handler used by the ASGI app; returns (payload, status)."""
+        if id_param is None or not id_param.isdigit():
+            return {"error": "id (int) is required"}, 400
+        mode = mode or "llm"
+        if mode not in MODES:
+            return {"error": f"mode must be one of {', '.join(MODES)}"}, 400
+        deadline = self._deadline(deadline_ms)
+        if mode == "fast":
+            # No LLM call: the blocking store work runs off the event loop
+            result = await asyncio.to_thread(self.service.get_fast_recommendations, str(id_param), None, deadline)
+        else:
+            result = await self.service.aget_recommendations(customer_id=str(id_param), deadline=deadline)
+        self._log_budget(id_param, deadline)
+        return result.model_dump(exclude_none=True), 200
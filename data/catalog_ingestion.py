@@ -0,0 +1,329 @@
+import csv
+import hashlib
+import json
+import logging
+import random
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from llm.interfaces import EmbeddingsClient
+from vectorstores.chroma_store import ChromaStore
+from helpers.product_grouping import enrich_product_metadata
+
+log = logging.getLogger(__name__)
+
+ENRICHED_FIELDS = ("base_name", "group_key", "category")
+
+
+def backfill_enrichment(store: ChromaStore, page_size: int = 500, force: bool = False) -> int:
+    """
+    Add precomputed grouping fields (base_name, group_key, normalized category)
+    to every product's metadata in place. Rows that already carry them are
+    skipped unless `force`. Returns the number of rows updated; any update
+    bumps the store revision.
+    """
+    updated = 0
+    offset = 0
+    while True:
+        rows = store.get_page(offset=offset, limit=page_size)
+        if not rows:
+            break
+        offset += len(rows)
+        ids, metadatas = [], []
+        for r in rows:
+            md = r.get("metadata") or {}
+            if not force and all(md.get(f) for f in ENRICHED_FIELDS):
+                continue
+            ids.append(r["id"])
+            metadatas.append(enrich_product_metadata(md, r.get("page_content")))
+        if ids:
+            store.update_metadatas(ids, metadatas)
+            updated += len(ids)
+        log.info("enrich: scanned=%d updated=%d", offset, updated)
+    if updated:
+        store.bump_revision()
+    return updated
+
+
+def _group_id(group_key: str) -> str:
+    return "grp-" + hashlib.sha1(group_key.encode("utf-8")).hexdigest()
+
+
+def build_base_collection(source: ChromaStore, target: ChromaStore, page_size: int = 1000, batch_size: int = 500) -> int:
+    """
+    Collapse size/color variants into one "base product" row per group key.
+    - Vector: normalized mean of the variants' stored vectors (no embedding calls).
+    - Metadata: the representative variant's (lowest product_id) enriched metadata,
+      plus `variant_product_ids` (comma-separated) and `variant_count`.
+    - Row id is derived from the group key, so rebuilds upsert in place; groups
+      that no longer exist are deleted, and the target's revision is bumped.
+    Returns the number of base products written.
+    """
+    groups: Dict[str, dict] = {}
+    offset = 0
+    while True:
+        rows = source.get_page(offset=offset, limit=page_size, with_embedding=True)
+        if not rows:
+            break
+        offset += len(rows)
+        for r in rows:
+            if r.get("embedding") is None:
+                continue
+            md = r.get("metadata") or {}
+            if not md.get("group_key"):
+                md = enrich_product_metadata(md, r.get("page_content"))
+            g = groups.setdefault(md["group_key"], {"rows": [], "vectors": []})
+            g["rows"].append((md, r.get("page_content")))
+            g["vectors"].append(r["embedding"])
+    log.info("build-base: %d variants → %d base products", offset, len(groups))
+
+    def _pid(md: dict):
+        try:
+            return int(md.get("product_id"))
+        except (TypeError, ValueError):
+            return float("inf")
+
+    ids, vectors, metadatas, documents = [], [], [], []
+    for key, g in groups.items():
+        rep_md, rep_doc = min(g["rows"], key=lambda x: _pid(x[0]))
+        variant_ids = [str(md.get("product_id")) for md, _ in g["rows"] if md.get("product_id") is not None]
+        vec = np.mean(np.asarray(g["vectors"], dtype=np.float32), axis=0)
+        norm = np.linalg.norm(vec)
+        vec = vec / norm if norm else vec
+        md = dict(rep_md)
+        md["variant_product_ids"] = ",".join(variant_ids)
+        md["variant_count"] = len(g["rows"])
+        ids.append(_group_id(key))
+        vectors.append(vec.tolist())
+        metadatas.append(md)
+        documents.append(rep_doc)
+
+    for i in range(0, len(ids), batch_size):
+        target.upsert_embeddings(
+            ids[i:i + batch_size], vectors[i:i + batch_size], metadatas[i:i + batch_size], documents[i:i + batch_size]
+        )
+    stale = set(target.list_ids()) - set(ids)
+    target.delete(sorted(stale))
+    if ids or stale:
+        target.bump_revision()
+    log.info("build-base: wrote=%d deleted=%d", len(ids), len(stale))
+    return len(ids)
+
+
+# ---- incremental sync from a file source ----
+
+SOURCE_FIELDS = ("product_id", "name", "description", "categories", "price")
+
+
+def iter_source_products(path: str) -> Iterator[dict]:
+    """
+    Stream product rows from a .csv (header row) or .jsonl file, one dict at a time.
+    Expected fields: product_id, name, description, categories, price; extra
+    fields are kept and stored as metadata.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(f)
+            return
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                log.warning("sync: skipping malformed line %d of %s", lineno, path)
+
+
+def _price(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def product_document(row: dict) -> str:
+    """Embedded text, in the same layout as the existing catalog rows."""
+    return (
+        f"Product ID: {row['product_id']}\n"
+        f"Name: {row.get('name') or ''}\n"
+        f"Description: {row.get('description') or ''}\n"
+        f"Categories: {row.get('categories') or 'No categories'}\n"
+        f"Price: {_price(row.get('price'))}"
+    )
+
+
+def content_hash(document: str) -> str:
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+def _product_metadata(row: dict, doc_hash: str, embeddings_model: str) -> dict:
+    # Extra source fields become metadata when chroma can store them (scalars only)
+    md = {k: v for k, v in row.items()
+          if k and k != "description" and isinstance(v, (str, int, float, bool)) and v != ""}
+    md["product_id"] = int(row["product_id"])
+    md["price"] = _price(row.get("price"))
+    md["categories"] = row.get("categories") or "No categories"
+    md = enrich_product_metadata({k: v for k, v in md.items() if v is not None})
+    md["content_hash"] = doc_hash
+    md["embeddings_model"] = embeddings_model
+    return md
+
+
+def _existing_index(store: ChromaStore, page_size: int) -> Dict[str, Tuple[str, str, str, str]]:
+    """
+    product_id -> (chroma id, content hash, metadata hash, embeddings model) for the stored catalog.
+    Rows written before hashes existed are hashed from their stored document, so
+    the first sync does not re-embed an unchanged catalog.
+    """
+    index = {}
+    offset = 0
+    while True:
+        rows = store.get_page(offset=offset, limit=page_size)
+        if not rows:
+            break
+        offset += len(rows)
+        for r in rows:
+            md = r.get("metadata") or {}
+            if md.get("product_id") is None:
+                continue
+            doc_hash = md.get("content_hash") or content_hash(r.get("page_content") or "")
+            index[str(md["product_id"])] = (r["id"], doc_hash, _metadata_hash(md), md.get("embeddings_model") or "")
+    log.info("sync: %d products in store", len(index))
+    return index
+
+
+def _metadata_hash(md: dict) -> str:
+    return content_hash(json.dumps(md, sort_keys=True, default=str))
+
+
+def _embed_with_retry(
+    embeddings: EmbeddingsClient, texts: List[str], max_retries: int, backoff_seconds: float
+) -> List[List[float]]:
+    for attempt in range(max_retries + 1):
+        try:
+            return embeddings.embed(texts=texts)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+            log.warning("sync: embed batch of %d failed (%s), retry %d in %.1fs",
+                        len(texts), type(e).__name__, attempt + 1, delay)
+            time.sleep(delay)
+
+
+def sync_catalog(
+    source_path: str,
+    store: ChromaStore,
+    embeddings: EmbeddingsClient,
+    embeddings_model: str,
+    batch_size: int = 100,
+    concurrency: int = 4,
+    max_retries: int = 3,
+    backoff_seconds: float = 1.0,
+    page_size: int = 1000,
+    delete_missing: bool = True,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Bring the product collection in line with a CSV/JSONL source, embedding only what changed.
+    - New or changed text (content hash of the embedded document differs) or a
+      different embeddings model (rows without one are assumed current): re-embedded in `batch_size` batches, up to
+      `concurrency` in flight, each retried with exponential backoff.
+    - Batches are submitted as the source streams in and written as they
+      complete; at most 2 × `concurrency` batches are queued at once, so
+      memory stays bounded whatever the number of changed rows.
+    - Metadata-only changes (e.g. price in an extra field): update_metadatas, no embedding.
+    - SKUs missing from the source are deleted (`delete_missing`); an empty
+      source never deletes anything.
+    A batch that still fails after retries is skipped and counted in `failed`;
+    its rows keep their old hash, so the next sync retries them.
+    A sync that wrote anything bumps the store revision, so serving processes
+    drop results (cache, precomputed, NumPy snapshot) built from the old rows.
+    Returns counts per outcome.
+    """
+    index = _existing_index(store, page_size)
+    stats = {"scanned": 0, "unchanged": 0, "metadata_only": 0, "new": 0, "changed": 0,
+             "embedded": 0, "failed": 0, "deleted": 0, "invalid": 0}
+    seen = set()
+    pending: List[Tuple[str, str, dict]] = []  # (chroma id, document, metadata) for the next batch
+    meta_ids, meta_rows = [], []
+    in_flight = {}  # embedding future -> its batch
+    max_in_flight = 2 * max(1, concurrency)
+
+    def _collect(return_when: str) -> None:
+        # Writes stay on this thread; only the embedding calls run concurrently
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            batch = in_flight.pop(future)
+            try:
+                vectors = future.result()
+            except Exception:
+                log.exception("sync: giving up on a batch of %d products", len(batch))
+                stats["failed"] += len(batch)
+                continue
+            store.upsert_embeddings(
+                [i for i, _, _ in batch], vectors, [md for _, _, md in batch], [doc for _, doc, _ in batch]
+            )
+            stats["embedded"] += len(batch)
+            log.info("sync: embedded=%d queued=%d", stats["embedded"], stats["new"] + stats["changed"])
+
+    def _submit(pool: ThreadPoolExecutor, batch: List[Tuple[str, str, dict]]) -> None:
+        if len(in_flight) >= max_in_flight:
+            _collect(FIRST_COMPLETED)
+        future = pool.submit(_embed_with_retry, embeddings, [doc for _, doc, _ in batch], max_retries, backoff_seconds)
+        in_flight[future] = batch
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for row in iter_source_products(source_path):
+            stats["scanned"] += 1
+            pid = str(row.get("product_id") or "").strip()
+            if not pid.isdigit() or pid in seen:
+                stats["invalid"] += 1
+                continue
+            seen.add(pid)
+            document = product_document(row)
+            doc_hash = content_hash(document)
+            md = _product_metadata(row, doc_hash, embeddings_model)
+            existing = index.get(pid)
+            if existing is None:
+                stats["new"] += 1
+                pending.append((f"sku-{pid}", document, md))
+            elif existing[1] != doc_hash or existing[3] not in ("", embeddings_model):
+                stats["changed"] += 1
+                pending.append((existing[0], document, md))
+            elif existing[2] != _metadata_hash(md):
+                stats["metadata_only"] += 1
+                meta_ids.append(existing[0])
+                meta_rows.append(md)
+            else:
+                stats["unchanged"] += 1
+            if dry_run:
+                pending.clear()
+                continue
+            if len(pending) >= batch_size:
+                _submit(pool, pending)
+                pending = []
+            if len(meta_ids) >= page_size:
+                store.update_metadatas(meta_ids, meta_rows)
+                meta_ids, meta_rows = [], []
+        if meta_ids and not dry_run:
+            store.update_metadatas(meta_ids, meta_rows)
+        if pending:
+            _submit(pool, pending)
+        log.info("sync: scanned=%d new=%d changed=%d metadata_only=%d unchanged=%d",
+                 stats["scanned"], stats["new"], stats["changed"], stats["metadata_only"], stats["unchanged"])
+        if in_flight:
+            _collect(ALL_COMPLETED)
+
+    if delete_missing and seen:
+        stale = sorted(chroma_id for pid, (chroma_id, _, _, _) in index.items() if pid not in seen)
+        stats["deleted"] = len(stale)
+        if not dry_run:
+            for i in range(0, len(stale), page_size):
+                store.delete(stale[i:i + page_size])
+    if not dry_run and (stats["metadata_only"] or stats["embedded"] or stats["deleted"]):
+        store.bump_revision()
+    log.info("sync: done %s", stats)
+    return stats
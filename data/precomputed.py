@@ -0,0 +1,83 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+from domain.models import RecommendationResult
+from service.result_cache import profile_hash
+
+
+class PrecomputedStore:
+    """
+    SQLite store of materialized recommendations (written by precompute.py).
+    - One row per customer with the profile hash and catalog version it was
+      computed against, so serving can tell fresh from stale.
+    - A small checkpoints table makes the offline job resumable.
+    WAL mode: the job can write while serving workers read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10.0)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS recommendations ("
+                " customer_id TEXT PRIMARY KEY,"
+                " profile_hash TEXT NOT NULL,"
+                " catalog_version TEXT NOT NULL,"
+                " result_json TEXT NOT NULL,"
+                " computed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints (job TEXT PRIMARY KEY, next_offset INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def lookup(
+        self, customer_id: str, profile_text: str, catalog_version: str, max_age_seconds: Optional[float] = None
+    ) -> Optional[RecommendationResult]:
+        """Fresh precomputed result or None (missing, profile changed, catalog changed or too old)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT profile_hash, catalog_version, result_json, computed_at FROM recommendations WHERE customer_id = ?",
+                (str(customer_id),),
+            ).fetchone()
+        if row is None:
+            return None
+        p_hash, c_version, result_json, computed_at = row
+        if p_hash != profile_hash(profile_text) or c_version != catalog_version:
+            return None
+        if max_age_seconds is not None and time.time() - computed_at > max_age_seconds:
+            return None
+        return RecommendationResult.model_validate(json.loads(result_json))
+
+    def is_fresh(self, customer_id: str, profile_text: str, catalog_version: str, max_age_seconds: Optional[float] = None) -> bool:
+        return self.lookup(customer_id, profile_text, catalog_version, max_age_seconds) is not None
+
+    def put(self, customer_id: str, profile_text: str, catalog_version: str, result: RecommendationResult) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO recommendations (customer_id, profile_hash, catalog_version, result_json, computed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (str(customer_id), profile_hash(profile_text), catalog_version, result.model_dump_json(), time.time()),
+            )
+            self._conn.commit()
+
+    def get_checkpoint(self, job: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT next_offset FROM checkpoints WHERE job = ?", (job,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def set_checkpoint(self, job: str, next_offset: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (job, next_offset, updated_at) VALUES (?, ?, ?)",
+                (job, int(next_offset), time.time()),
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM recommendations").fetchone()[0])
@@ -1,32 +1,81 @@
-from typing import Optional, List
+import asyncio
+from typing import Optional, List, Dict, Iterator, Tuple
 from domain.models import CustomerProfile, Product
+from llm.interfaces import EmbeddingsClient
 from vectorstores.interfaces import VectorStore
 from helpers.product_grouping import dedupe_by_group, interleave_by_category, pick_max_per_cat
-from datetime import datetime
+from infra.metrics import stage_timer
 
 class CustomerProfileRepository:
     def __init__(self, store: VectorStore):
         self.store = store
+
+    @property
+    def version(self) -> str:
+        return self.store.version
     
     def get_by_customer_id(self, customer_id: str) -> Optional[CustomerProfile]:
         # Ensure type matches how it was stored in Chroma metadata
-        row = self.store.get_one(where={"customer_id": customer_id})
+        # The stored vector comes along so product search needs no embedding call
+        with stage_timer("profile_lookup"):
+            row = self.store.get_one(where={"customer_id": customer_id}, with_embedding=True)
         if not row:
             return None
-        d = row
+        return self._to_profile(row)
+
+    def get_by_customer_ids(self, customer_ids: List[str], chunk_size: int = 500) -> Dict[str, CustomerProfile]:
+        """Bulk lookup with one `$in` get per chunk; keyed by str(customer_id), missing ids are absent."""
+        out: Dict[str, CustomerProfile] = {}
+        ids = list(dict.fromkeys(customer_ids))
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            for row in self.store.get_many(where={"customer_id": {"$in": chunk}}, with_embedding=True):
+                profile = self._to_profile(row)
+                out.setdefault(str(row["metadata"]["customer_id"]), profile)
+        return out
+
+    def iter_pages(self, page_size: int = 200, start_offset: int = 0) -> Iterator[Tuple[int, List[CustomerProfile]]]:
+        """Stream every profile in pages; yields (next_offset, profiles) so callers can checkpoint."""
+        offset = start_offset
+        while True:
+            rows = self.store.get_page(offset=offset, limit=page_size, with_embedding=True)
+            if not rows:
+                return
+            offset += len(rows)
+            yield offset, [self._to_profile(r) for r in rows]
+
+    @staticmethod
+    def _to_profile(d: dict) -> CustomerProfile:
         return CustomerProfile(
             customer_id=d["metadata"]["customer_id"],
             profile_text=d["page_content"],
+            vector=d.get("embedding"),
             metadata=d["metadata"],
         )
     
 class ProductCatalogRepository:
-    def __init__(self, store: VectorStore):
+    def __init__(self, store: VectorStore, fetch_k: int = 105, embeddings: Optional[EmbeddingsClient] = None):
+        # store may be the full catalog or the variant-collapsed base collection
         self.store = store
+        self.fetch_k = fetch_k
+        # Same model as the store's embedding function; lets the async path embed without a thread
+        self.embeddings = embeddings
+
+    @property
+    def version(self) -> str:
+        return self.store.version
 
-    def search_similar(self, text: str, k: int = 50) -> List[Product]:
-        current_time = datetime.now()
-        results = self.store.max_mmr_search(query=text, k=k)
+    def search_similar(self, text: str, k: int = 50, vector: Optional[List[float]] = None) -> List[Product]:
+        """
+        MMR search for products near `text`. When `vector` (the stored profile
+        embedding) is given it is used as-is and no embedding API call is made;
+        it must come from the same embeddings model as the catalog.
+        """
+        with stage_timer("vector_search"):
+            if vector:
+                results = self.store.max_mmr_search_by_vector(vector=vector, k=k, fetch_k=max(k, self.fetch_k))
+            else:
+                results = self.store.max_mmr_search(query=text, k=k, fetch_k=max(k, self.fetch_k))
         products = []
         for r in results:
             md = r["metadata"]
@@ -36,12 +85,21 @@ class ProductCatalogRepository:
                 category=md.get("categories"),
                 price=md.get("price", 0.0),
                 url=md.get("url", None),
-                metadata=md
+                metadata=md,
+                score=r.get("score"),
             ))
-        print("time taken to complete the product vector search: ", datetime.now() - current_time)
-        current_time = datetime.now()
-        products = dedupe_by_group(products)
-        max_per_cat = pick_max_per_cat(products, k=k, min_total=15)
-        products = interleave_by_category(products, k=k, max_per_cat=max_per_cat)
-        print("Time taken to filtering : ", datetime.now() - current_time)
-        return products
\ No newline at end of file
+        with stage_timer("filtering"):
+            products = dedupe_by_group(products)
+            max_per_cat = pick_max_per_cat(products, k=k, min_total=15)
+            return interleave_by_category(products, k=k, max_per_cat=max_per_cat)
+
+    async def asearch_similar(self, text: str, k: int = 50, vector: Optional[List[float]] = None) -> List[Product]:
+        """
+        Async search_similar. A missing query vector is embedded with the async
+        client (no thread held during the API call); the store search itself is
+        blocking and runs in the default thread pool.
+        """
+        if not vector and self.embeddings is not None:
+            with stage_timer("embedding"):
+                vector = await self.embeddings.aembed_one(text)
+        return await asyncio.to_thread(self.search_similar, text, k, vector)
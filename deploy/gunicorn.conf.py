@@ -1,8 +1,30 @@
-wsgi_app = "new_version_recommendations_backend.main:app"
+import os
+
+# Default: sync Flask app on gthread workers.
+# Async: GUNICORN_APP=new_version_recommendations_backend.main:asgi_app
+#        GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+wsgi_app = os.getenv("GUNICORN_APP", "new_version_recommendations_backend.main:app")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
 bind = "0.0.0.0:8000"
 workers = 2
 threads = 4
 timeout = 120
 graceful_timeout = 30
+
+# Prometheus across workers: export PROMETHEUS_MULTIPROC_DIR=/tmp/recs-metrics
+def on_starting(server):
+    from infra.metrics import reset_multiproc_dir
+    reset_multiproc_dir()
+
+def child_exit(server, worker):
+    from infra.metrics import mark_worker_dead
+    mark_worker_dead(worker.pid)
+
+# Warm-up (WARMUP_ENABLED=true): runs in each worker after the app is loaded and
+# before it accepts connections; /readyz reports the outcome
+def post_worker_init(worker):
+    from infra.warmup import WARMUP
+    WARMUP.run()
+
 # accesslog = "-"  # stdout
 # errorlog = "-"   # stdout
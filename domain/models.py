@@ -8,6 +8,8 @@ class Product(BaseModel):
     price: float
     url: Optional[HttpUrl] = None
     metadata: dict = Field(default_factory=dict)
+    # Vector-search distance (lower = closer) when the product came from a search
+    score: Optional[float] = None
 
 
 class CustomerProfile(BaseModel):
@@ -25,6 +27,14 @@ class Recommendation(BaseModel):
 class RecommendationResult(BaseModel):
     customer_id: int
     recommendations: List[Recommendation]
+    # None for a full LLM answer; otherwise why the result is degraded:
+    # - "deadline_exceeded", no fallback (empty recommendations): {"reason", "stage",
+    #   "budget_ms", "elapsed_ms", "exhausted_by", "stages_ms"}
+    # - "deadline_exceeded" (LLM call timed out), "llm_error" (provider error, incl. 429)
+    #   or "llm_invalid_response" (answer did not parse/validate), with the fast-ranked
+    #   shortlist: {"reason", "stage": "llm_generate" | "parse", "fallback": "fast"},
+    #   plus the deadline keys above when the request had a deadline
+    degraded: Optional[dict] = None
 
 class ComplementarySet(BaseModel):
     base_product_id: str
@@ -1,4 +1,6 @@
 import json
+from functools import lru_cache
+from helpers.product_grouping import base_name_of
 
 def _to_llm_item(p) -> dict:
     # Only what’s needed to decide uniqueness & selection:
@@ -8,4 +10,69 @@ def _to_llm_item(p) -> dict:
     }
 
 def _compact_json(obj: dict | list) -> str:
-    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
\ No newline at end of file
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+def _product_id(p) -> int:
+    return int(getattr(p, "product_id", getattr(p, "id", 0)))
+
+@lru_cache(maxsize=1)
+def _encoding():
+    # Loaded on first use, not at import: get_encoding may download the BPE file,
+    # and only a token budget needs it
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:  # optional dependency / offline: fall back to a char heuristic
+        return None
+
+def estimate_tokens(text: str) -> int:
+    """Local token estimate (tiktoken cl100k when available, else ~4 chars/token)."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+def fit_token_budget(parts: list, budget: int) -> int:
+    """How many leading parts fit in `budget` tokens (budget <= 0 means no limit)."""
+    if budget <= 0:
+        return len(parts)
+    used = 0
+    for i, part in enumerate(parts):
+        used += estimate_tokens(part) + 1  # + separator
+        if used > budget:
+            return i
+    return len(parts)
+
+def encode_shortlist_compact(products) -> tuple[list, dict]:
+    """
+    Tabular shortlist: one `alias|base name` line per product.
+    Aliases are 1..N (per request) instead of long product IDs; names drop
+    size/color suffixes. Returns (lines, alias → real product_id).
+    """
+    lines, aliases = [], {}
+    for i, p in enumerate(products, start=1):
+        aliases[i] = _product_id(p)
+        name = base_name_of(p).replace("|", "/").replace("\n", " ")
+        lines.append(f"{i}|{name}")
+    return lines, aliases
+
+def names_by_id(products) -> dict:
+    """product_id → full (variant) name, for restoring names after resolve_aliases."""
+    return {_product_id(p): getattr(p, "product_name", getattr(p, "name", "")) for p in products}
+
+def resolve_aliases(recommendations: list, aliases: dict, names: dict | None = None) -> list:
+    """
+    Map aliased product_ids back to real ones; items with unknown aliases are dropped.
+    The LLM only saw base names, so with `names` (names_by_id of the shortlist)
+    product_name is reset to the variant the id resolves to.
+    """
+    out = []
+    for r in recommendations:
+        pid = aliases.get(r.product_id)
+        if pid is None:
+            continue
+        r.product_id = pid
+        if names and names.get(pid):
+            r.product_name = names[pid]
+        out.append(r)
+    return out
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+# Blocking stage calls run here so the caller can stop waiting at the deadline.
+# A timed-out call keeps its thread until the underlying I/O returns.
+_STAGE_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="deadline")
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage: str, budget_ms: int):
+        super().__init__(f"deadline of {budget_ms} ms exceeded during {stage}")
+        self.stage = stage
+        self.budget_ms = budget_ms
+
+
+class Deadline:
+    """
+    Time budget for one request.
+    - `remaining()` is what each stage gets as its timeout.
+    - `call` / `acall` run a stage with that timeout and raise DeadlineExceeded
+      naming the stage that ran out of budget.
+    - `timings` records how long every stage took (ms), for logs and responses.
+    """
+
+    def __init__(self, budget_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.budget_seconds = budget_seconds
+        self.started = clock()
+        self.expires_at = self.started + budget_seconds
+        self.timings: Dict[str, int] = {}
+        self.exhausted_by: Optional[str] = None
+
+    @classmethod
+    def from_ms(cls, budget_ms: Optional[int]) -> Optional["Deadline"]:
+        """None (no deadline) for a missing or non-positive budget."""
+        if not budget_ms or budget_ms <= 0:
+            return None
+        return cls(budget_ms / 1000.0)
+
+    @property
+    def budget_ms(self) -> int:
+        return int(self.budget_seconds * 1000)
+
+    def elapsed_ms(self) -> int:
+        return int((self._clock() - self.started) * 1000)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    def check(self, stage: str) -> float:
+        """Remaining seconds, or DeadlineExceeded if nothing is left for `stage`."""
+        left = self.remaining()
+        if left <= 0:
+            self.exhaust(stage)
+        return left
+
+    def exhaust(self, stage: str) -> None:
+        """Record `stage` as the one that used up the budget and raise DeadlineExceeded."""
+        if self.exhausted_by is None:
+            self.exhausted_by = stage
+        raise DeadlineExceeded(stage, self.budget_ms)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[float]:
+        """Times a stage; yields its remaining budget in seconds."""
+        left = self.check(name)
+        start = self._clock()
+        try:
+            yield left
+        finally:
+            self.timings[name] = self.timings.get(name, 0) + int((self._clock() - start) * 1000)
+
+    def call(self, stage: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking stage, giving up when the budget runs out."""
+        with self.stage(stage) as left:
+            fut = _STAGE_POOL.submit(fn, *args, **kwargs)
+            try:
+                return fut.result(timeout=left)
+            except FutureTimeout:
+                fut.cancel()
+                self.exhaust(stage)
+
+    async def acall(self, stage: str, aw: Callable[[], Awaitable[Any]]) -> Any:
+        """Await a stage with the remaining budget as its timeout."""
+        with self.stage(stage) as left:
+            try:
+                return await asyncio.wait_for(aw(), timeout=left)
+            except asyncio.TimeoutError:
+                self.exhaust(stage)
+
+    def summary(self) -> dict:
+        return {
+            "budget_ms": self.budget_ms,
+            "elapsed_ms": self.elapsed_ms(),
+            "exhausted_by": self.exhausted_by,
+            "stages_ms": dict(self.timings),
+        }
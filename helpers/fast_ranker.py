@@ -0,0 +1,46 @@
+from typing import List, Optional
+from domain.models import CustomerProfile, Product, Recommendation
+from helpers.product_grouping import _item_category, interleave_by_category, pick_max_per_cat
+
+# Same size the LLM is asked for in RECOMMENDATION_PROMPT
+FAST_RESULT_SIZE = 10
+
+
+def _score_key(indexed):
+    """Vector distance first (lower = closer); unscored items keep search order, after scored ones."""
+    i, p = indexed
+    return (p.score is None, p.score if p.score is not None else 0.0, i)
+
+
+def _reason(p: Product, rank: int, profile_text: str) -> str:
+    """Template reason (≤ 10 words, like the LLM's)."""
+    cat = _item_category(p)
+    known = cat and cat != "unknown"
+    if known and cat.lower() in profile_text:
+        return f"Matches your interest in {cat}."
+    if rank < 3:
+        return "Closely matches your recent shopping profile."
+    if known:
+        return f"Adds variety from {cat}."
+    return "Recommended based on your shopping profile."
+
+
+def rank_shortlist(
+    shortlist: List[Product], profile: Optional[CustomerProfile] = None, k: int = FAST_RESULT_SIZE
+) -> List[Recommendation]:
+    """
+    LLM-free ranking of an already deduped/filtered shortlist:
+    - order by vector similarity (search score),
+    - round-robin across categories (interleave_by_category) for diversity,
+    - reasons from templates.
+    """
+    ranked = [p for _, p in sorted(enumerate(shortlist), key=_score_key)]
+    ranked = interleave_by_category(ranked, k=k, max_per_cat=pick_max_per_cat(ranked, k=k, min_total=k))
+    profile_text = (profile.profile_text if profile else "").lower()
+    out: List[Recommendation] = []
+    for p in ranked:
+        pid = str(p.metadata.get("product_id") or p.id or "").strip()
+        if not pid.isdigit():
+            continue
+        out.append(Recommendation(product_id=int(pid), product_name=p.name, reason=_reason(p, len(out), profile_text)))
+    return out
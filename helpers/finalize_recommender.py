@@ -1,32 +1,55 @@
-from helpers.product_grouping import _base_name
+from helpers.product_grouping import _base_name, base_name_of
 
-def finalize_recommendations(parsed, shortlist, k):
-    # Build allowlists from shortlist
-    id_to_name = {}
-    allowed_ids = set()
-    for p in shortlist:
-        pid = str(p.metadata.get("product_id") or p.id or "").strip()
-        if not pid:
-            continue
-        allowed_ids.add(pid)
-        id_to_name[pid] = (p.name or "").strip()
 
-    out, seen = [], set()
-    for r in parsed.recommendations:
+class ShortlistValidator:
+    """
+    Per-item checks applied to LLM recommendations against the shortlist:
+    ID must be in the shortlist, name must match it (base-name tolerant),
+    no duplicate product_id, at most k items. Usable incrementally (streaming).
+    """
+
+    def __init__(self, shortlist, k):
+        # Build allowlists from shortlist
+        self.k = k
+        self.id_to_base = {}
+        self.allowed_ids = set()
+        self.seen = set()
+        for p in shortlist:
+            pid = str(p.metadata.get("product_id") or p.id or "").strip()
+            if not pid:
+                continue
+            self.allowed_ids.add(pid)
+            self.id_to_base[pid] = base_name_of(p).lower()
+
+    @property
+    def full(self) -> bool:
+        return len(self.seen) >= self.k
+
+    def accept(self, r) -> bool:
+        if self.full:
+            return False
         pid = str(getattr(r, "product_id", "")).strip()
         pname = (getattr(r, "product_name", "") or "").strip()
-        if not pid or pid not in allowed_ids:
-            continue  # drop invented/invalid IDs
+        if not pid or pid not in self.allowed_ids:
+            return False  # drop invented/invalid IDs
         # name must be consistent with shortlist (base-name tolerant)
         bn_model = _base_name(pname).lower()
-        bn_short = _base_name(id_to_name.get(pid, "")).lower()
+        bn_short = self.id_to_base.get(pid, "")
         if bn_model and bn_short and bn_model != bn_short:
-            continue  # ID↔name mismatch, drop
-        if pid in seen:
-            continue  # dedupe by product_id
-        seen.add(pid)
-        out.append(r)
-        if len(out) >= k:
+            return False  # ID↔name mismatch, drop
+        if pid in self.seen:
+            return False  # dedupe by product_id
+        self.seen.add(pid)
+        return True
+
+
+def finalize_recommendations(parsed, shortlist, k):
+    validator = ShortlistValidator(shortlist, k)
+    out = []
+    for r in parsed.recommendations:
+        if validator.accept(r):
+            out.append(r)
+        if validator.full:
             break
     parsed.recommendations = out
     return parsed
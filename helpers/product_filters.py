@@ -1,7 +1,7 @@
 import re
 from typing import List, Set
 from domain.models import Product, CustomerProfile
-from helpers.product_grouping import _base_name
+from helpers.product_grouping import _base_name, base_name_of
 
 def _ordered_names_from_profile_text(txt: str) -> Set[str]:
     """
@@ -39,7 +39,7 @@ def drop_already_ordered(products: List[Product], profile: CustomerProfile) -> L
     out = []
     for p in products:
         pid = str(p.metadata.get("product_id") or p.id or "").strip()
-        base = _base_name(p.name or "").lower()
+        base = base_name_of(p).lower()
 
         if pid and pid in ordered_ids:
             continue
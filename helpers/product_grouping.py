@@ -1,5 +1,6 @@
 import html, re, unicodedata
-from typing import Any, List, Dict
+from functools import lru_cache
+from typing import Any, List, Dict, Optional
 from collections import defaultdict
 
 COLOR = {
@@ -9,6 +10,11 @@ COLOR = {
 }
 SIZE = {"xxs","xs","s","m","l","xl","xxl","xxxl","2xl","3xl","4xl","5xl"} | {str(n) for n in range(24, 65)}
 
+# Bound for the request-time memo caches (used only when metadata lacks the
+# precomputed fields written by enrich_product_metadata at ingestion)
+NAME_CACHE_SIZE = 20_000
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def _slug(s: str) -> str:
     s = unicodedata.normalize("NFKC", s.lower())
     s = html.unescape(s)
@@ -16,6 +22,7 @@ def _slug(s: str) -> str:
     s = re.sub(r"\s+", "-", s).strip("-")
     return s
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def _base_name(name: str) -> str:
     """Remove trailing size/color tokens like '-XL-Blue' but keep style like '(Crew-neck)'."""
     parts = re.split(r"[-_/]", html.unescape(name))
@@ -30,16 +37,51 @@ def _base_name(name: str) -> str:
     base = re.sub(r"\s+", " ", base).strip()
     return base
 
+def _group_key(name: str) -> str:
+    return "name:" + _slug(_base_name(name))
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def _normalize_category(cat: Optional[str]) -> str:
+    cat = (cat or "").strip() or "unknown"
+    if cat.lower() in {"no categories", "none", "null"}:
+        cat = "unknown"
+    return cat
+
+def base_name_of(it: Any) -> str:
+    """Base name of a product: precomputed metadata['base_name'] when present, else computed."""
+    meta = getattr(it, "metadata", None) or {}
+    if meta.get("base_name"):
+        return meta["base_name"]
+    return _base_name(meta.get("name") or getattr(it, "name", None) or "")
+
+def enrich_product_metadata(meta: dict, page_content: Optional[str] = None) -> dict:
+    """
+    Ingestion-time enrichment: returns a copy of `meta` with `base_name`,
+    `group_key` and normalized `category` so request-time helpers skip the
+    unicode/html/regex work.
+    """
+    out = dict(meta)
+    name = out.get("name") or ""
+    if not name and page_content:
+        m = re.search(r"^Name:\s*(.+)$", page_content, flags=re.MULTILINE)
+        if m:
+            name = m.group(1)
+    out["base_name"] = _base_name(name)
+    out["group_key"] = _group_key(name)
+    out["category"] = _normalize_category(out.get("categories"))
+    return out
+
 def group_key_from_doc(doc: Any) -> str:
     """Build a stable 'base product' key from a LangChain Document OR your domain Product."""
     meta = getattr(doc, "metadata", None) or {}
+    if meta.get("group_key"):
+        return meta["group_key"]
     name = meta.get("name") or getattr(doc, "product_name", None) or getattr(doc, "name", "")
     if not name and getattr(doc, "page_content", ""):
         m = re.search(r"^Name:\s*(.+)$", doc.page_content, flags=re.MULTILINE)
         if m:
             name = m.group(1)
-    base = _base_name(name)
-    return "name:" + _slug(base)
+    return _group_key(name)
 
 def dedupe_by_group(items: List[Any]) -> List[Any]:
     seen, out = set(), []
@@ -54,11 +96,10 @@ def dedupe_by_group(items: List[Any]) -> List[Any]:
 def _item_category(it: Any) -> str:
     """Normalize category from metadata['categories'] → .category → .product_category → 'unknown'."""
     meta = getattr(it, "metadata", None) or {}
+    if meta.get("category"):
+        return meta["category"]  # normalized at ingestion
     cat = meta.get("categories") or getattr(it, "category", None) or getattr(it, "product_category", None) or "unknown"
-    cat = (cat or "").strip() or "unknown"
-    if cat.lower() in {"no categories", "none", "null"}:
-        cat = "unknown"
-    return cat
+    return _normalize_category(cat)
 
 import math
 
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class WaitTimeout(TimeoutError):
+    """A joining caller stopped waiting for the in-flight call (the call itself goes on)."""
+
+
+class SingleFlight:
+    """
+    In-process request coalescing (Go's singleflight):
+    concurrent do(key, fn) calls with the same key run fn once; every caller
+    gets its result, or re-raises its exception. A joining caller waits at most
+    `timeout` seconds (its own budget), then gets WaitTimeout.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> tuple[Any, bool]:
+        """Returns (result, shared) where shared is True for callers that joined an in-flight call."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise WaitTimeout(f"in-flight call still running after {timeout:.3f}s")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight; coalesces within one event loop.
+    The shared work runs in its own task, so cancelling the request that
+    started it (client disconnect) neither cancels nor fails the callers
+    that joined it.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def _done(self, slot: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(slot) is task:
+            del self._calls[slot]
+        if not task.cancelled():
+            # Retrieved here so a task whose callers all left doesn't log "exception never retrieved"
+            task.exception()
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None
+    ) -> tuple[Any, bool]:
+        """
+        Returns (result, shared). Joining callers wait at most `timeout` seconds
+        and then get WaitTimeout; the caller that starts the work waits for it.
+        """
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        task = self._calls.get(slot)
+        shared = task is not None
+        if not shared:
+            task = loop.create_task(fn())
+            self._calls[slot] = task
+            task.add_done_callback(lambda t: self._done(slot, t))
+        # shield: a cancelled (or timed-out) waiter must not cancel the shared task
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout if shared else None), shared
+        except asyncio.TimeoutError:
+            if task.done():
+                raise
+            raise WaitTimeout(f"in-flight call still running after {timeout:.3f}s") from None
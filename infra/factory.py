@@ -1,42 +1,226 @@
-from config.settings import Settings
-from llm.clients.openai_chat import OpenAIChat
-from llm.clients.groq_chat import GroqChat
-from llm.embeddings.openai_embeddings import OpenAIEmbeddings
-from vectorstores.chroma_store import ChromaStore
+from typing import Optional
+from config.settings import Settings, get_settings
+from llm.clients.cached_chat import CachedChat
+from llm.clients.routing_chat import RoutingChat
+from llm.embeddings.cached_embeddings import CachedEmbeddings
+from llm.interfaces import EmbeddingsClient, LLMClient
+from vectorstores.interfaces import VectorStore
 from data.repositories import CustomerProfileRepository, ProductCatalogRepository
+from data.precomputed import PrecomputedStore
 from llm.prompt_renderer import PromptRenderer
 from service.recommender_service import RecommenderService
+from service.result_cache import RecommendationResultCache
 from controllers.recommendation_controller import RecommendationController
+from infra.profiling import RequestProfiler
+from infra.http import open_connection, shared_http_clients
+from infra.warmup import WARMUP
+from infra.registry import EMBEDDINGS_PROVIDERS, LLM_PROVIDERS, STARTUP, VECTORSTORE_PROVIDERS, load
 
-def build_recommendation_controller() -> RecommendationController:
-    s = Settings()
+def wrap_embeddings(embeddings: EmbeddingsClient, s: Settings) -> EmbeddingsClient:
+    """Put the query-embedding cache in front of any embeddings provider."""
+    if not s.embeddings_cache_enabled:
+        return embeddings
+    return CachedEmbeddings(
+        embeddings,
+        model=s.embeddings_model,
+        maxsize=s.embeddings_cache_size,
+        path=s.embeddings_cache_path,
+    )
 
-    # LLM client (strategy)
-    # llm = OpenAIChat(api_key=s.openai_api_key, model=s.llm_model, base_url=s.openai_base_url)
-    llm = GroqChat(api_key=s.groq_api_key, model=s.llm_model)
+# OpenAI-compatible API roots, used to pre-open pooled connections at warm-up
+PROVIDER_BASE_URLS = {
+    "GROQ": "https://api.groq.com/openai/v1",
+    "OPENAI": "https://api.openai.com/v1",
+}
 
-    # Embeddings fn for vectorstore
-    embeddings = OpenAIEmbeddings(api_key=s.openai_api_key, model=s.embeddings_model, base_url=s.openai_base_url)
+def llm_provider_names(s: Settings) -> list[str]:
+    return [n.strip().upper() for n in s.llm_providers.split(",") if n.strip()] or [s.llm_provider.upper()]
 
-    # Vector stores
-    profile_store = ChromaStore(
-        collection_name=s.chroma_collection_profiles,
-        persist_dir=s.chroma_dir_profiles,
-        embedding_lc=embeddings.lc
+def llm_model_for(provider: str, s: Settings) -> str:
+    return s.openai_llm_model if provider.strip().upper() == "OPENAI" else s.llm_model
+
+def build_chat(provider: str, s: Settings) -> LLMClient:
+    provider = provider.strip().upper()
+    chat_cls = load(LLM_PROVIDERS, provider)  # only the selected SDK is imported
+    http_client, http_async_client = shared_http_clients(s)
+    with STARTUP.timed("construct", f"llm:{provider.lower()}"):
+        if provider == "GROQ":
+            return chat_cls(
+                api_key=s.groq_api_key, model=s.llm_model, http_client=http_client, http_async_client=http_async_client
+            )
+        return chat_cls(
+            api_key=s.openai_api_key,
+            model=s.openai_llm_model,
+            base_url=s.openai_base_url,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        )
+
+def build_embeddings(s: Settings) -> EmbeddingsClient:
+    embeddings_cls = load(EMBEDDINGS_PROVIDERS, s.embeddings_provider)
+    http_client, http_async_client = shared_http_clients(s)
+    with STARTUP.timed("construct", f"embeddings:{s.embeddings_provider.lower()}"):
+        embeddings = embeddings_cls(
+            api_key=s.openai_api_key,
+            model=s.embeddings_model,
+            base_url=s.openai_base_url,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        )
+    return wrap_embeddings(embeddings, s)
+
+def build_chroma(collection_name: str, persist_dir: str, embeddings: EmbeddingsClient) -> VectorStore:
+    chroma_cls = load(VECTORSTORE_PROVIDERS, "chroma")
+    with STARTUP.timed("construct", f"chroma:{collection_name}"):
+        return chroma_cls(collection_name=collection_name, persist_dir=persist_dir, embedding_lc=embeddings.lc)
+
+def build_llm(s: Settings) -> LLMClient:
+    """Single provider, or a latency-aware router when several are configured."""
+    names = llm_provider_names(s)
+    if len(names) == 1:
+        return build_chat(names[0], s)
+    # Every in-flight request may hold a primary and a hedge per provider
+    max_workers = s.llm_router_max_workers or 2 * max(s.batch_max_concurrency, s.llm_router_concurrency) * len(names)
+    return RoutingChat(
+        [(n, build_chat(n, s)) for n in names],
+        max_workers=max_workers,
+        hedge_percentile=s.llm_hedge_percentile,
+        hedge_min_seconds=s.llm_hedge_min_seconds,
+        hedge_default_seconds=s.llm_hedge_default_seconds,
+        rate_limit_cooldown_seconds=s.llm_rate_limit_cooldown_seconds,
     )
-    product_store = ChromaStore(
-        collection_name=s.chroma_collection_products,
-        persist_dir=s.chroma_dir_products,
-        embedding_lc=embeddings.lc
+
+def wrap_llm(llm: LLMClient, s: Settings) -> LLMClient:
+    """Put the response cache in front of any LLM client."""
+    if not s.llm_cache_enabled:
+        return llm
+    return CachedChat(
+        llm,
+        # Every provider/model that can answer, so a model change never serves old responses
+        model=",".join(f"{n}:{llm_model_for(n, s)}" for n in llm_provider_names(s)),
+        maxsize=s.llm_cache_size,
+        ttl_seconds=s.llm_cache_ttl_seconds,
+        path=s.llm_cache_path,
+        disk_max_entries=s.llm_cache_disk_max_entries,
+        deterministic_only=s.llm_cache_deterministic_only,
     )
 
+def product_collection_name(s: Settings) -> str:
+    return s.chroma_collection_products_base or s.chroma_collection_products
+
+def build_product_store(s: Settings, embeddings: EmbeddingsClient) -> VectorStore:
+    if s.vectorstore_provider.lower() != "numpy":
+        return build_chroma(product_collection_name(s), s.chroma_dir_products, embeddings)
+    numpy_cls = load(VECTORSTORE_PROVIDERS, "numpy")
+    # Exported offline (refresh_product_snapshot); workers only mmap it and
+    # switch in-process to versions published later
+    try:
+        with STARTUP.timed("construct", "numpy:products"):
+            return numpy_cls(s.numpy_snapshot_dir, embed_query=embeddings.embed_one)
+    except FileNotFoundError as e:
+        raise RuntimeError(
+            f"no NumPy product snapshot under {s.numpy_snapshot_dir!r}; run `python ingest.py snapshot` first"
+        ) from e
+
+def refresh_product_snapshot(s: Settings) -> bool:
+    """
+    Re-export the NumPy product snapshot (as a new manifest version) when the
+    Chroma catalog's version moved on. Offline only: ingest.py and precompute.py.
+    """
+    chroma_cls = load(VECTORSTORE_PROVIDERS, "chroma")
+    numpy_cls = load(VECTORSTORE_PROVIDERS, "numpy")
+    # Stored vectors are exported as they are: no embedding function needed
+    source = chroma_cls(collection_name=product_collection_name(s), persist_dir=s.chroma_dir_products, embedding_lc=None)
+    try:
+        return numpy_cls.ensure_snapshot(source, s.numpy_snapshot_dir, versioned=True)
+    finally:
+        source.close()
+
+def build_recommender_service(s: Settings) -> RecommenderService:
+    # LLM client (strategy): LLM_PROVIDERS=GROQ,OPENAI routes with hedging/failover
+    llm = wrap_llm(build_llm(s), s)
+
+    # Embeddings fn for vectorstore
+    embeddings = build_embeddings(s)
+
+    # Vector stores
+    profile_store = build_chroma(s.chroma_collection_profiles, s.chroma_dir_profiles, embeddings)
+    product_store = build_product_store(s, embeddings)
+
     # Repositories
     profiles = CustomerProfileRepository(profile_store)
-    products = ProductCatalogRepository(product_store)
+    products = ProductCatalogRepository(product_store, fetch_k=s.product_search_fetch_k, embeddings=embeddings)
 
     # Renderer & service
     renderer = PromptRenderer()
-    service = RecommenderService(llm=llm, profiles=profiles, products=products, renderer=renderer)
+    result_cache = None
+    if s.result_cache_enabled:
+        result_cache = RecommendationResultCache(
+            ttl_seconds=s.result_cache_ttl_seconds, max_entries=s.result_cache_max_entries
+        )
+        # Rebuilt stores invalidate everything computed against them
+        for store in (profile_store, product_store):
+            if hasattr(store, "on_swap"):
+                store.on_swap(result_cache.clear)
+    precomputed = PrecomputedStore(s.precomputed_store_path) if s.precomputed_store_path else None
+    return RecommenderService(
+        llm=llm,
+        profiles=profiles,
+        products=products,
+        renderer=renderer,
+        result_cache=result_cache,
+        precomputed=precomputed,
+        precomputed_max_age_seconds=s.precomputed_max_age_seconds,
+        shortlist_k=s.shortlist_k,
+        prompt_encoding=s.prompt_encoding.lower(),
+        prompt_shortlist_token_budget=s.prompt_shortlist_token_budget,
+        fast_fallback=s.fast_fallback_enabled,
+    )
+
+def register_warmup(service: RecommenderService, s: Settings) -> None:
+    """
+    Warm-up steps run per worker before traffic (gunicorn post_worker_init):
+    pooled TLS connections to the providers, Chroma collections loaded, one
+    dummy vector query. Connection steps are optional (provider blips must
+    not keep a worker out of rotation); store steps are required.
+    """
+    http_client, _ = shared_http_clients(s)
+    keys = {"GROQ": s.groq_api_key, "OPENAI": s.openai_api_key}
+    urls = {name: PROVIDER_BASE_URLS[name] for name in llm_provider_names(s) if name in PROVIDER_BASE_URLS}
+    # OpenAIEmbeddings and OpenAIChat both send to OPENAI_BASE_URL when it is set
+    urls["OPENAI"] = s.openai_base_url or PROVIDER_BASE_URLS["OPENAI"]
+    for name, url in urls.items():
+        WARMUP.add(f"connect_{name.lower()}", lambda url=url, name=name: open_connection(http_client, url, keys[name]),
+                   required=False)
+
+    WARMUP.add("load_profiles", lambda: service.profiles.version)
+    WARMUP.add("load_products", lambda: service.products.version)
+
+    def _dummy_query():
+        rows = service.products.store.get_page(offset=0, limit=1, with_embedding=True)
+        if not rows or rows[0].get("embedding") is None:
+            return "empty catalog"
+        return len(service.products.store.max_mmr_search_by_vector(rows[0]["embedding"], k=5, fetch_k=10))
+    WARMUP.add("vector_query", _dummy_query)
+
+def build_recommendation_controller() -> RecommendationController:
+    s = get_settings()
+    with STARTUP.timed("construct", "recommender_service"):
+        service = build_recommender_service(s)
+    if s.warmup_enabled:
+        register_warmup(service, s)
 
     # Controller
-    return RecommendationController(service)
+    return RecommendationController(
+        service,
+        batch_max_ids=s.batch_max_ids,
+        batch_max_concurrency=s.batch_max_concurrency,
+        request_deadline_ms=s.request_deadline_ms,
+        request_deadline_max_ms=s.request_deadline_max_ms,
+    )
+
+def build_request_profiler(s: Settings) -> Optional[RequestProfiler]:
+    """None (no middleware hooks) unless a dir and a trigger are configured."""
+    if not s.profiling_dir or not (s.profiling_sample_rate > 0 or s.profiling_admin_token):
+        return None
+    return RequestProfiler(s.profiling_dir, sample_rate=s.profiling_sample_rate, admin_token=s.profiling_admin_token)
@@ -0,0 +1,64 @@
+import logging
+import os
+import threading
+from typing import Dict, Tuple
+import httpx
+from config.settings import Settings
+
+log = logging.getLogger(__name__)
+
+# One sync + one async pool per process, shared by every provider client.
+# Keyed by pid: a pool created before a fork must not be reused by the child.
+_POOLS: Dict[int, Tuple[httpx.Client, httpx.AsyncClient]] = {}
+_LOCK = threading.Lock()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (httpx[http2])
+    except ImportError:
+        return False
+    return True
+
+
+def _client_kwargs(s: Settings) -> dict:
+    http2 = s.http2_enabled
+    if http2 and not _http2_available():
+        log.warning({"event": "http2_unavailable", "detail": "install httpx[http2]; using HTTP/1.1"})
+        http2 = False
+    return {
+        "http2": http2,
+        "limits": httpx.Limits(
+            max_connections=s.http_max_connections,
+            max_keepalive_connections=s.http_max_keepalive_connections,
+            keepalive_expiry=s.http_keepalive_expiry_seconds,
+        ),
+        "timeout": httpx.Timeout(
+            connect=s.http_connect_timeout_seconds,
+            read=s.http_read_timeout_seconds,
+            write=s.http_connect_timeout_seconds,
+            pool=s.http_connect_timeout_seconds,
+        ),
+    }
+
+
+def shared_http_clients(s: Settings) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Process-wide keep-alive pools (sync, async) for the LLM and embeddings SDKs."""
+    pid = os.getpid()
+    with _LOCK:
+        pools = _POOLS.get(pid)
+        if pools is None:
+            kwargs = _client_kwargs(s)
+            pools = (httpx.Client(**kwargs), httpx.AsyncClient(**kwargs))
+            _POOLS.clear()  # drop pools inherited from a parent process (never closed: sockets belong to it)
+            _POOLS[pid] = pools
+        return pools
+
+
+def open_connection(client: httpx.Client, base_url: str, api_key: str) -> int:
+    """
+    Establish (and keep in the pool) a TLS connection to an OpenAI-compatible
+    API with a cheap authenticated GET /models. Returns the HTTP status.
+    """
+    resp = client.get(base_url.rstrip("/") + "/models", headers={"Authorization": f"Bearer {api_key}"})
+    return resp.status_code
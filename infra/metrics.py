@@ -0,0 +1,136 @@
+"""
+Prometheus metrics (optional dependency: prometheus_client).
+
+- Stage latency histograms replace the old "Time taken to ..." prints.
+- Works across gunicorn workers: set PROMETHEUS_MULTIPROC_DIR to an empty,
+  writable directory before the server starts; /metrics then aggregates every
+  worker's files (see deploy/gunicorn.conf.py for the cleanup hooks).
+- Without prometheus_client every helper is a no-op and /metrics returns 501.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    ENABLED = True
+except ImportError:  # optional dependency
+    ENABLED = False
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# Pipeline stages, each observed once per request: profile_lookup, embedding,
+# vector_search, filtering (dedupe + category interleave), ordered_filter
+# (already-ordered products dropped), prompt_build, llm_generate, parse,
+# finalize (embedding nests inside vector_search when the store has to
+# embed the query text itself). Deadline stage names use the same vocabulary.
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Noop:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, *args, **kwargs):
+        pass
+
+    def inc(self, *args, **kwargs):
+        pass
+
+
+if ENABLED:
+    STAGE_SECONDS = Histogram(
+        "recs_stage_seconds", "Recommendation pipeline stage latency", ["stage"], buckets=STAGE_BUCKETS
+    )
+    REQUEST_SECONDS = Histogram(
+        "recs_http_request_seconds", "HTTP request latency", ["method", "route", "status"], buckets=STAGE_BUCKETS
+    )
+    CACHE_EVENTS = Counter("recs_cache_events_total", "Cache lookups", ["cache", "result"])
+    LLM_TOKENS = Counter("recs_llm_tokens_total", "LLM tokens reported by the provider", ["provider", "kind"])
+    LLM_FAILURES = Counter("recs_llm_failures_total", "Failed LLM generations", ["reason"])
+else:
+    STAGE_SECONDS = REQUEST_SECONDS = CACHE_EVENTS = LLM_TOKENS = LLM_FAILURES = _Noop()
+
+
+# In-process consumers of raw stage timings (e.g. the offline benchmark)
+_STAGE_LISTENERS: List[Callable[[str, float], None]] = []
+
+
+def add_stage_listener(fn: Callable[[str, float], None]) -> None:
+    """Call fn(stage, seconds) for every observed stage."""
+    _STAGE_LISTENERS.append(fn)
+
+
+def remove_stage_listener(fn: Callable[[str, float], None]) -> None:
+    if fn in _STAGE_LISTENERS:
+        _STAGE_LISTENERS.remove(fn)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Observe the duration of a pipeline stage (also when it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage=stage).observe(elapsed)
+        for fn in _STAGE_LISTENERS:
+            fn(stage, elapsed)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    REQUEST_SECONDS.labels(method=method, route=route, status=str(status)).observe(seconds)
+
+
+def cache_event(cache: str, hit: bool, n: int = 1) -> None:
+    if n > 0:
+        CACHE_EVENTS.labels(cache=cache, result="hit" if hit else "miss").inc(n)
+
+
+def llm_failure(reason: str) -> None:
+    LLM_FAILURES.labels(reason=reason).inc()
+
+
+def record_llm_usage(provider: str, message) -> None:
+    """Token counts from a LangChain AIMessage/chunk (`usage_metadata`), when the provider sends them."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.labels(provider=provider, kind=kind).inc(usage[kind])
+
+
+def render() -> Tuple[Optional[bytes], str]:
+    """(body, content type) for /metrics; body is None when prometheus_client is missing."""
+    if not ENABLED:
+        return None, "text/plain"
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead(pid: int) -> None:
+    """gunicorn child_exit hook: drop a dead worker's live gauges from the multiprocess dir."""
+    if ENABLED and os.environ.get(MULTIPROC_DIR_ENV):
+        multiprocess.mark_process_dead(pid)
+
+
+def reset_multiproc_dir() -> None:
+    """gunicorn on_starting hook: stale files from a previous run would be aggregated too."""
+    path = os.environ.get(MULTIPROC_DIR_ENV)
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
@@ -0,0 +1,72 @@
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile-Token"
+
+
+class RequestProfiler:
+    """
+    On-demand per-request cProfile dumps.
+    - A request is profiled when it carries X-Profile-Token matching
+      `admin_token`, or when it is picked by `sample_rate` (0..1).
+    - Output: `<out_dir>/<unix_ms>-<request_id>.pstats` (snakeviz, flameprof,
+      `python -m pstats` can read it).
+    - At most one request per process is profiled at a time; requests
+      arriving meanwhile run normally.
+    - Coverage depends on the Python version. Before 3.12, cProfile only sees
+      the thread that enabled it, so work handed to thread pools (deadline
+      stages, batch) is missing. On 3.12+ it is process-wide, so the dump also
+      holds whatever other threads ran meanwhile. Under ASGI the request shares
+      the event loop with other requests, whose coroutines show up too.
+      Streamed response bodies are never covered.
+    Build it only when enabled (see build_request_profiler): with no profiler
+    neither the Flask middleware nor the ASGI app adds any per-request work.
+    """
+
+    def __init__(self, out_dir: str, sample_rate: float = 0.0, admin_token: Optional[str] = None):
+        self.out_dir = out_dir
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token
+        self._busy = threading.Lock()
+        os.makedirs(out_dir, exist_ok=True)
+
+    def wants(self, token: Optional[str]) -> bool:
+        if token and self.admin_token and hmac.compare_digest(token, self.admin_token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self) -> Optional[cProfile.Profile]:
+        if not self._busy.acquire(blocking=False):
+            return None
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:  # another profiler (e.g. a debugger) is active
+            self._busy.release()
+            return None
+        return prof
+
+    def stop(self, prof: cProfile.Profile, request_id: Optional[str]) -> Optional[str]:
+        """Disable `prof`, write its pstats file and return the path."""
+        try:
+            prof.disable()
+        finally:
+            self._busy.release()
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", request_id or "no-request-id")[:128]
+        path = os.path.join(self.out_dir, f"{int(time.time() * 1000)}-{safe_id}.pstats")
+        try:
+            prof.dump_stats(path)
+        except OSError:
+            log.exception({"event": "profile_dump_failed", "path": path})
+            return None
+        log.info({"event": "request_profiled", "request_id": request_id, "path": path})
+        return path
@@ -0,0 +1,79 @@
+"""
+Provider registry: backends are imported only when selected by settings.
+
+Entries are "module:attribute" strings, so listing a provider costs nothing;
+`load()` imports it on first use. Import and construction times are recorded
+in STARTUP and logged once the app is built (cold-start visibility).
+"""
+import importlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+log = logging.getLogger(__name__)
+
+LLM_PROVIDERS = {
+    "GROQ": "llm.clients.groq_chat:GroqChat",
+    "OPENAI": "llm.clients.openai_chat:OpenAIChat",
+}
+EMBEDDINGS_PROVIDERS = {
+    "OPENAI": "llm.embeddings.openai_embeddings:OpenAIEmbeddings",
+}
+VECTORSTORE_PROVIDERS = {
+    "CHROMA": "vectorstores.chroma_store:ChromaStore",
+    "NUMPY": "vectorstores.numpy_store:NumpyStore",
+}
+
+
+class StartupReport:
+    """Wall time of provider imports and component construction in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries: List[dict] = []
+        self.started = time.perf_counter()
+        self.completed_ms: Optional[float] = None
+
+    @contextmanager
+    def timed(self, kind: str, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.entries.append({"kind": kind, "name": name, "ms": round((time.perf_counter() - start) * 1000, 1)})
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            entries = list(self.entries)
+        # Entries nest (the service includes its clients), so they are not summed
+        total = self.completed_ms if self.completed_ms is not None else (time.perf_counter() - self.started) * 1000
+        return {"startup_ms": round(total, 1), "entries": entries}
+
+    def log(self) -> None:
+        """Mark the app as built (fixes startup_ms) and log the report."""
+        if self.completed_ms is None:
+            self.completed_ms = (time.perf_counter() - self.started) * 1000
+        log.info({"event": "startup_report", **self.snapshot()})
+
+
+STARTUP = StartupReport()
+
+_LOADED: Dict[str, Any] = {}
+
+
+def load(registry: Dict[str, str], name: str) -> Any:
+    """Import and return the class registered under `name` (case-insensitive)."""
+    key = name.strip().upper()
+    target = registry.get(key)
+    if target is None:
+        raise ValueError(f"Unknown provider {name!r}; expected one of {sorted(registry)}")
+    cls = _LOADED.get(target)
+    if cls is None:
+        module_name, attr = target.split(":")
+        with STARTUP.timed("import", module_name):
+            cls = getattr(importlib.import_module(module_name), attr)
+        _LOADED[target] = cls
+    return cls
@@ -0,0 +1,76 @@
+"""
+Per-worker warm-up before traffic.
+
+The factory registers steps (open provider connections, load the Chroma
+collections, run a dummy vector query) on the process-wide WARMUP object;
+gunicorn's post_worker_init hook runs them, and /readyz reports the result.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+
+class Warmup:
+    """
+    Ordered warm-up steps and their outcome for this process.
+    Status: "disabled" (nothing registered), "pending", "running", "ready", "failed".
+    A failing optional step is recorded but does not block readiness; a
+    failing required step marks the worker "failed" (not ready).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps: List[Tuple[str, Callable[[], object], bool]] = []
+        self.status = "disabled"
+        self.pid = os.getpid()
+        self.results: Dict[str, dict] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def add(self, name: str, fn: Callable[[], object], required: bool = True) -> None:
+        with self._lock:
+            self._steps.append((name, fn, required))
+            self.status = "pending"
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "disabled")
+
+    def run(self) -> bool:
+        """Run every step once (later calls are no-ops); returns readiness."""
+        with self._lock:
+            if self.status != "pending":
+                return self.ready
+            self.status = "running"
+            steps = list(self._steps)
+        self.started_at = time.time()
+        failed = False
+        for name, fn, required in steps:
+            start = time.perf_counter()
+            try:
+                detail = fn()
+                self.results[name] = {"ok": True, "ms": int((time.perf_counter() - start) * 1000)}
+                if detail is not None:
+                    self.results[name]["detail"] = detail
+            except Exception as e:
+                self.results[name] = {"ok": False, "ms": int((time.perf_counter() - start) * 1000),
+                                      "error": type(e).__name__, "required": required}
+                log.warning({"event": "warmup_step_failed", "step": name, "required": required}, exc_info=True)
+                failed = failed or required
+        self.finished_at = time.time()
+        self.status = "failed" if failed else "ready"
+        log.info({"event": "warmup_done", "status": self.status, "pid": self.pid, "steps": self.results})
+        return self.ready
+
+    def snapshot(self) -> dict:
+        out = {"status": self.status, "ready": self.ready, "pid": os.getpid(), "steps": dict(self.results)}
+        if self.started_at and self.finished_at:
+            out["duration_ms"] = int((self.finished_at - self.started_at) * 1000)
+        return out
+
+
+WARMUP = Warmup()
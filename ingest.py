@@ -0,0 +1,124 @@
+"""
+Catalog ingestion / maintenance commands.
+
+    python ingest.py enrich            # add base_name/group_key/category to product metadata
+    python ingest.py build-base        # one row per base product (variants collapsed)
+    python ingest.py sync products.jsonl   # embed new/changed products, delete removed SKUs
+    python ingest.py snapshot          # publish a new NumPy snapshot version (if the catalog changed)
+
+With --new-version the command runs against a copy of the active product store
+version and publishes it via the manifest only if it succeeds (vectorstores.manifest).
+The copy is a full one (sqlite file and HNSW segments), so it needs the store's size
+in free disk space and time proportional to it, even for a small sync. Hard links
+are not an option: Chroma rewrites those files in place, which would corrupt the
+version being served.
+"""
+import argparse
+import logging
+from config.settings import Settings
+from vectorstores.chroma_store import ChromaStore
+from vectorstores.manifest import staged_version
+from vectorstores.numpy_store import NumpyStore
+from data.catalog_ingestion import backfill_enrichment, build_base_collection, sync_catalog
+
+log = logging.getLogger("ingest")
+
+DEFAULT_BASE_COLLECTION = "product_catalog_base"
+
+
+def _product_store(s: Settings, collection_name: str = None) -> ChromaStore:
+    # These commands reuse stored vectors and never embed, so no embedding function is needed
+    return ChromaStore(
+        collection_name=collection_name or s.chroma_collection_products,
+        persist_dir=s.chroma_dir_products,
+        embedding_lc=None,
+    )
+
+
+def cmd_enrich(args, s: Settings) -> None:
+    n = backfill_enrichment(_product_store(s), page_size=args.page_size, force=args.force)
+    log.info("enriched %d products", n)
+
+
+def cmd_build_base(args, s: Settings) -> None:
+    target = args.collection or s.chroma_collection_products_base or DEFAULT_BASE_COLLECTION
+    n = build_base_collection(_product_store(s), _product_store(s, target), page_size=args.page_size)
+    log.info("built %d base products into %r (set CHROMA_COLLECTION_PRODUCTS_BASE=%s to serve it)", n, target, target)
+
+
+def cmd_sync(args, s: Settings) -> None:
+    from infra.factory import build_embeddings
+    # Catalog documents are embedded once; keep them out of the query-embedding cache
+    embeddings = build_embeddings(s.model_copy(update={"embeddings_cache_enabled": False}))
+    stats = sync_catalog(
+        args.source,
+        _product_store(s),
+        embeddings,
+        embeddings_model=s.embeddings_model,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        max_retries=args.max_retries,
+        delete_missing=not args.keep_missing,
+        dry_run=args.dry_run,
+    )
+    if stats["embedded"] or stats["deleted"]:
+        log.info("catalog changed; re-run build-base if CHROMA_COLLECTION_PRODUCTS_BASE is served")
+
+
+def cmd_snapshot(args, s: Settings) -> None:
+    from infra.factory import product_collection_name, refresh_product_snapshot
+    if args.force:
+        NumpyStore.build_snapshot(_product_store(s, product_collection_name(s)), s.numpy_snapshot_dir, versioned=True)
+    elif not refresh_product_snapshot(s):
+        log.info("snapshot under %s is current", s.numpy_snapshot_dir)
+        return
+    log.info("published a new snapshot version under %s", s.numpy_snapshot_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product catalog ingestion commands.")
+    parser.add_argument("--new-version", action="store_true",
+                        help="write to a new version of the product store and publish it atomically "
+                             "(starts from a full copy of the active version: needs its size in free disk)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enrich", help="precompute grouping fields in product metadata")
+    p.add_argument("--page-size", type=int, default=500)
+    p.add_argument("--force", action="store_true", help="recompute even when fields are present")
+    p.set_defaults(func=cmd_enrich)
+
+    p = sub.add_parser("build-base", help="build the variant-collapsed base product collection")
+    p.add_argument("--collection", help=f"target collection (default: settings or {DEFAULT_BASE_COLLECTION!r})")
+    p.add_argument("--page-size", type=int, default=1000)
+    p.set_defaults(func=cmd_build_base)
+
+    p = sub.add_parser("sync", help="incrementally sync the product collection from a CSV/JSONL file")
+    p.add_argument("source", help="products file (.csv with header row, or .jsonl)")
+    p.add_argument("--batch-size", type=int, default=100, help="texts per embeddings request")
+    p.add_argument("--concurrency", type=int, default=4, help="embeddings requests in flight")
+    p.add_argument("--max-retries", type=int, default=3)
+    p.add_argument("--keep-missing", action="store_true", help="do not delete SKUs absent from the source")
+    p.add_argument("--dry-run", action="store_true", help="report what would change, write nothing")
+    p.set_defaults(func=cmd_sync)
+
+    p = sub.add_parser("snapshot", help="export the product collection as a new NumPy snapshot version "
+                                          "(skipped when it is current)")
+    p.add_argument("--force", action="store_true", help="export even when the snapshot is current")
+    p.set_defaults(func=cmd_snapshot)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s %(message)s')
+    s = Settings()
+    if not args.new_version:
+        args.func(args, s)
+    else:
+        with staged_version(s.chroma_dir_products) as (version, path):
+            args.func(args, s.model_copy(update={"chroma_dir_products": path}))
+        log.info("published product store version %s", version)
+    if args.command != "snapshot" and s.vectorstore_provider.lower() == "numpy":
+        # Serving workers never export; keep their snapshot in step with what was just written
+        cmd_snapshot(argparse.Namespace(force=False), s)
+
+
+if __name__ == "__main__":
+    main()
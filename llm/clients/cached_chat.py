@@ -0,0 +1,165 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional
+from llm.interfaces import LLMClient
+from helpers.cache import LRUCache
+from infra.metrics import cache_event
+
+# Call-site kwarg naming the parser a response must pass before it is cached
+VALIDATOR_KWARG = "cache_validator"
+
+
+class _DiskCache:
+    """SQLite key → response text with TTL and a row cap (oldest rows pruned)."""
+
+    def __init__(self, path: str, ttl_seconds: Optional[float], max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._lock = threading.Lock()
+        self._writes = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_created ON llm_responses (created_at)")
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if self.ttl is not None and time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, time.time()),
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self) -> None:
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM llm_responses WHERE key IN ("
+            " SELECT key FROM llm_responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class CachedChat(LLMClient):
+    """
+    Response cache around any LLMClient.
+    - Key: sha256 of model, system message, prompt and generation kwargs.
+    - In-memory LRU (TTL) plus an optional SQLite tier shared across workers/restarts.
+    - A response is stored only if the call-site `cache_validator` (e.g.
+      parse_recommendations) accepts it; calls without one are not cached.
+    - With `deterministic_only`, only temperature-0 calls are cached.
+    """
+
+    def __init__(
+        self,
+        inner: LLMClient,
+        model: str,
+        maxsize: int = 1024,
+        ttl_seconds: Optional[float] = 3600,
+        path: Optional[str] = None,
+        disk_max_entries: int = 50_000,
+        deterministic_only: bool = True,
+    ):
+        self._inner = inner
+        self.model = model
+        self.deterministic_only = deterministic_only
+        self._memory = LRUCache(maxsize=maxsize, ttl=ttl_seconds)
+        self._disk = _DiskCache(path, ttl_seconds, disk_max_entries) if path else None
+
+    def _key(self, prompt: str, kwargs: dict) -> str:
+        # timeout is per-request transport state, not part of the generation
+        gen = {k: v for k, v in kwargs.items() if k not in ("system", "timeout")}
+        payload = json.dumps(
+            {"model": self.model, "system": kwargs.get("system"), "prompt": prompt, "kwargs": gen},
+            sort_keys=True, default=str, ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cacheable(self, kwargs: dict, validator: Optional[Callable[[str], Any]]) -> bool:
+        if validator is None:
+            return False
+        if self.deterministic_only:
+            t = kwargs.get("temperature")
+            return t is not None and float(t) == 0.0
+        return True
+
+    def _get(self, key: str) -> Optional[str]:
+        hit = self._memory.get(key)
+        if hit is None and self._disk is not None:
+            hit = self._disk.get(key)
+            if hit is not None:
+                self._memory.set(key, hit)
+        cache_event("llm", hit=hit is not None)
+        return hit
+
+    def _put(self, key: str, response: str, validator: Callable[[str], Any]) -> None:
+        try:
+            validator(response)
+        except Exception:
+            return  # never cache output the caller would reject
+        self._memory.set(key, response)
+        if self._disk is not None:
+            self._disk.set(key, response)
+
+    def generate(self, *, prompt: str, **kwargs) -> str:
+        validator = kwargs.pop(VALIDATOR_KWARG, None)
+        if not self._cacheable(kwargs, validator):
+            return self._inner.generate(prompt=prompt, **kwargs)
+        key = self._key(prompt, kwargs)
+        hit = self._get(key)
+        if hit is not None:
+            return hit
+        response = self._inner.generate(prompt=prompt, **kwargs)
+        self._put(key, response, validator)
+        return response
+
+    async def agenerate(self, *, prompt: str, **kwargs) -> str:
+        validator = kwargs.pop(VALIDATOR_KWARG, None)
+        if not self._cacheable(kwargs, validator):
+            return await self._inner.agenerate(prompt=prompt, **kwargs)
+        key = self._key(prompt, kwargs)
+        hit = self._get(key)
+        if hit is not None:
+            return hit
+        response = await self._inner.agenerate(prompt=prompt, **kwargs)
+        self._put(key, response, validator)
+        return response
+
+    def stream(self, *, prompt: str, **kwargs) -> Iterator[str]:
+        validator = kwargs.pop(VALIDATOR_KWARG, None)
+        if not self._cacheable(kwargs, validator):
+            yield from self._inner.stream(prompt=prompt, **kwargs)
+            return
+        key = self._key(prompt, kwargs)
+        hit = self._get(key)
+        if hit is not None:
+            yield hit
+            return
+        parts = []
+        for chunk in self._inner.stream(prompt=prompt, **kwargs):
+            parts.append(chunk)
+            yield chunk
+        # Reached only when the consumer read the whole stream
+        self._put(key, "".join(parts), validator)
+
+    def stats(self) -> dict:
+        return self._memory.stats()
@@ -1,5 +1,6 @@
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 from llm.interfaces import LLMClient
+from infra.metrics import record_llm_usage
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 
@@ -18,6 +19,8 @@ class OpenAIChat(LLMClient):
         model: str,
         temperature: float = 0,
         base_url: Optional[str] = None,
+        http_client=None,
+        http_async_client=None,
     ):
         """
         Args:
@@ -28,27 +31,24 @@ class OpenAIChat(LLMClient):
             timeout: Request timeout in seconds (passed via http client).
             model_kwargs: Extra model kwargs forwarded to the provider
                          (e.g., {"response_format": {"type": "json_object"}} to set a default).
+            http_client / http_async_client: shared httpx pools (infra/http.py); SDK defaults when None.
         """
         self._llm = ChatOpenAI(
             api_key=api_key,
             model=model,
             temperature=temperature,
-            base_url=base_url
+            base_url=base_url,
+            http_client=http_client,
+            http_async_client=http_async_client,
         )
         self._default_temperature = temperature
 
-    def generate(self, *, prompt: str, **kwargs) -> str:
-        """
-        Generate a completion from the LLM.
-
-        Kwargs supported:
-            - system: str = "You are a helpful assistant."
-            - temperature: float (overrides instance default)
-            - response_format: dict (e.g., {"type": "json_object"} or JSON schema)
-        """
+    def _prepare(self, prompt: str, kwargs: dict):
+        """Per-call runnable (with bound overrides) and message list."""
         system_msg = kwargs.get("system", "You are a helpful assistant.")
         temperature = kwargs.get("temperature", self._default_temperature)
         response_format = kwargs.get("response_format", None)
+        timeout = kwargs.get("timeout", None)
 
         # Create a per-call bound runnable if overrides are provided
         runnable = self._llm
@@ -57,12 +57,41 @@ class OpenAIChat(LLMClient):
             bind_args["temperature"] = float(temperature)
         if response_format is not None:
             bind_args["response_format"] = response_format
+        if timeout is not None:
+            # Per-request HTTP timeout (remaining request deadline)
+            bind_args["timeout"] = float(timeout)
 
         if bind_args:
             runnable = self._llm.bind(**bind_args)
 
-        ai_msg = runnable.invoke(
-            [SystemMessage(content=system_msg), HumanMessage(content=prompt)]
-        )
-        
+        return runnable, [SystemMessage(content=system_msg), HumanMessage(content=prompt)]
+
+    def generate(self, *, prompt: str, **kwargs) -> str:
+        """
+        Generate a completion from the LLM.
+
+        Kwargs supported:
+            - system: str = "You are a helpful assistant."
+            - temperature: float (overrides instance default)
+            - response_format: dict (e.g., {"type": "json_object"} or JSON schema)
+            - timeout: float seconds for this request
+        """
+        runnable, messages = self._prepare(prompt, kwargs)
+        ai_msg = runnable.invoke(messages)
+        record_llm_usage("openai", ai_msg)
         return ai_msg.content if hasattr(ai_msg, "content") else str(ai_msg)
+
+    async def agenerate(self, *, prompt: str, **kwargs) -> str:
+        """Async variant of generate (LangChain ainvoke); same kwargs."""
+        runnable, messages = self._prepare(prompt, kwargs)
+        ai_msg = await runnable.ainvoke(messages)
+        record_llm_usage("openai", ai_msg)
+        return ai_msg.content if hasattr(ai_msg, "content") else str(ai_msg)
+
+    def stream(self, *, prompt: str, **kwargs) -> Iterator[str]:
+        """Token streaming variant of generate; yields content chunks as they arrive."""
+        runnable, messages = self._prepare(prompt, kwargs)
+        for chunk in runnable.stream(messages):
+            text = chunk.content if hasattr(chunk, "content") else str(chunk)
+            if text:
+                yield text
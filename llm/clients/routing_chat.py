@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Iterator, List, Optional, Sequence, Tuple
+from llm.interfaces import LLMClient
+
+log = logging.getLogger(__name__)
+
+
+def is_rate_limit_error(err: BaseException) -> bool:
+    """429 / RateLimitError from openai, groq or httpx-based SDKs."""
+    if "ratelimit" in type(err).__name__.lower():
+        return True
+    status = getattr(err, "status_code", None) or getattr(getattr(err, "response", None), "status_code", None)
+    return status == 429
+
+
+class ProviderStats:
+    """Rolling latency/error window for one provider."""
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)  # True = error
+        self.cooldown_until = 0.0
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.outcomes.append(False)
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.outcomes.append(True)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            data = sorted(self.latencies)
+        if not data:
+            return None
+        idx = min(len(data) - 1, max(0, int(round(q * (len(data) - 1)))))
+        return data[idx]
+
+    @property
+    def samples(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class _Attempt:
+    """One provider call on the router pool; `started` is set when a worker thread picks it up."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = threading.Event()
+        self.started_at: Optional[float] = None
+
+
+class RoutingChat(LLMClient):
+    """
+    Latency-aware router over several LLMClients.
+    - Providers are ordered by (rate-limit cooldown, error rate, median latency).
+    - Hedging: if the chosen provider hasn't answered within its own rolling
+      `hedge_percentile` latency (bounded by hedge_min/max), the same request is
+      sent to the next provider; the first successful answer wins. The hedge
+      clock starts when the call leaves the router's queue, so a busy pool
+      does not trigger hedges by itself.
+    - `max_workers` bounds concurrent provider calls (hedged losers included:
+      sync HTTP can't be cancelled, so they hold their thread until done).
+    - Failover: any error moves on to the next provider immediately; a
+      rate-limit (429) also puts the provider in cooldown.
+    `clock` and the clients are injectable, so it runs against local stubs.
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[Tuple[str, LLMClient]],
+        hedge_percentile: float = 0.95,
+        hedge_min_seconds: float = 0.5,
+        hedge_max_seconds: float = 10.0,
+        hedge_default_seconds: float = 2.0,
+        min_samples: int = 20,
+        rate_limit_cooldown_seconds: float = 10.0,
+        window: int = 200,
+        clock: Callable[[], float] = time.monotonic,
+        max_workers: Optional[int] = None,
+    ):
+        if not providers:
+            raise ValueError("RoutingChat needs at least one provider")
+        self.providers: List[Tuple[str, LLMClient]] = list(providers)
+        self.stats = {name: ProviderStats(window) for name, _ in self.providers}
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_seconds = hedge_min_seconds
+        self.hedge_max_seconds = hedge_max_seconds
+        self.hedge_default_seconds = hedge_default_seconds
+        self.min_samples = min_samples
+        self.rate_limit_cooldown_seconds = rate_limit_cooldown_seconds
+        self._clock = clock
+        self.max_workers = max_workers or 4 * len(self.providers)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm-route")
+
+    # ---- routing policy ----
+
+    def ordered(self) -> List[Tuple[str, LLMClient]]:
+        now = self._clock()
+
+        def rank(item):
+            st = self.stats[item[0]]
+            median = st.percentile(0.5)
+            return (st.cooldown_until > now, st.error_rate > 0.5, median if median is not None else 0.0)
+        # sorted() is stable: configuration order breaks ties
+        return sorted(self.providers, key=rank)
+
+    def hedge_after(self, name: str) -> float:
+        st = self.stats[name]
+        if st.samples < self.min_samples:
+            return self.hedge_default_seconds
+        p = st.percentile(self.hedge_percentile) or self.hedge_default_seconds
+        return min(self.hedge_max_seconds, max(self.hedge_min_seconds, p))
+
+    def _record(self, name: str, started: float, err: Optional[BaseException]) -> None:
+        st = self.stats[name]
+        if err is None:
+            st.record_success(self._clock() - started)
+            return
+        st.record_error()
+        if is_rate_limit_error(err):
+            st.cooldown_until = self._clock() + self.rate_limit_cooldown_seconds
+        log.warning({"event": "llm_provider_error", "provider": name, "rate_limited": is_rate_limit_error(err),
+                     "error": type(err).__name__})
+
+    # ---- LLMClient ----
+
+    def _call(self, attempt: _Attempt, client: LLMClient, prompt: str, kwargs: dict) -> str:
+        name = attempt.name
+        started = attempt.started_at = self._clock()
+        attempt.started.set()
+        try:
+            out = client.generate(prompt=prompt, **kwargs)
+        except BaseException as e:
+            self._record(name, started, e)
+            raise
+        self._record(name, started, None)
+        return out
+
+    def generate(self, *, prompt: str, **kwargs) -> str:
+        candidates = iter(self.ordered())
+        pending: dict[Future, _Attempt] = {}
+        last_error: Optional[BaseException] = None
+        hedged = False
+
+        def launch() -> bool:
+            nxt = next(candidates, None)
+            if nxt is None:
+                return False
+            name, client = nxt
+            attempt = _Attempt(name)
+            pending[self._pool.submit(self._call, attempt, client, prompt, kwargs)] = attempt
+            return True
+
+        launch()
+        hedge_delay = None
+        while pending:
+            timeout = None
+            if not hedged and len(pending) == 1:
+                attempt = next(iter(pending.values()))
+                # Time spent queued for a pool thread doesn't count towards the hedge delay
+                attempt.started.wait()
+                hedge_delay = self.hedge_after(attempt.name)
+                timeout = max(0.0, attempt.started_at + hedge_delay - self._clock())
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slow primary: hedge with the next provider
+                hedged = True
+                if launch():
+                    log.info({"event": "llm_hedge", "after_s": hedge_delay})
+                continue
+            for fut in done:
+                pending.pop(fut)
+                err = fut.exception()
+                if err is None:
+                    return fut.result()
+                last_error = err
+            if not pending:
+                # Fail over immediately (rate limit or any other error)
+                launch()
+        raise last_error if last_error is not None else RuntimeError("no LLM provider available")
+
+    async def _acall(self, name: str, client: LLMClient, prompt: str, kwargs: dict) -> str:
+        started = self._clock()
+        try:
+            out = await client.agenerate(prompt=prompt, **kwargs)
+        except asyncio.CancelledError:
+            raise  # hedged loser; not a provider failure
+        except BaseException as e:
+            self._record(name, started, e)
+            raise
+        self._record(name, started, None)
+        return out
+
+    async def agenerate(self, *, prompt: str, **kwargs) -> str:
+        candidates = iter(self.ordered())
+        pending: dict[asyncio.Task, str] = {}
+        last_error: Optional[BaseException] = None
+        hedged = False
+
+        def launch() -> bool:
+            nxt = next(candidates, None)
+            if nxt is None:
+                return False
+            name, client = nxt
+            pending[asyncio.ensure_future(self._acall(name, client, prompt, kwargs))] = name
+            return True
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if not hedged and len(pending) == 1:
+                    timeout = self.hedge_after(next(iter(pending.values())))
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    launch()
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    err = task.exception()
+                    if err is None:
+                        return task.result()
+                    last_error = err
+                if not pending:
+                    launch()
+        finally:
+            # Async losers can be cancelled
+            for task in pending:
+                task.cancel()
+        raise last_error if last_error is not None else RuntimeError("no LLM provider available")
+
+    def stream(self, *, prompt: str, **kwargs) -> Iterator[str]:
+        """No hedging for streams; fails over only if a provider errors before its first chunk."""
+        last_error: Optional[BaseException] = None
+        for name, client in self.ordered():
+            started = self._clock()
+            emitted = False
+            try:
+                for chunk in client.stream(prompt=prompt, **kwargs):
+                    emitted = True
+                    yield chunk
+            except Exception as e:
+                self._record(name, started, e)
+                if emitted:
+                    raise
+                last_error = e
+                continue
+            self._record(name, started, None)
+            return
+        raise last_error if last_error is not None else RuntimeError("no LLM provider available")
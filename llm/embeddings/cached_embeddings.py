@@ -0,0 +1,146 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+from llm.interfaces import EmbeddingsClient
+from helpers.cache import LRUCache
+from infra.metrics import cache_event
+
+
+class _DiskTier:
+    """
+    SQLite-backed key → float32 vector table.
+    WAL mode so several gunicorn workers can share one file.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        vec = array("f")
+        vec.frombytes(row[0])
+        return vec.tolist()
+
+    def set_many(self, items: List[tuple[str, List[float]]]) -> None:
+        if not items:
+            return
+        rows = [(k, array("f", v).tobytes()) for k, v in items]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._conn.commit()
+
+
+class _LangChainAdapter(Embeddings):
+    """Exposes the cache to LangChain consumers (e.g. Chroma's embedding_function)."""
+
+    def __init__(self, owner: "CachedEmbeddings"):
+        self._owner = owner
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._owner.embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._owner.embed_one(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._owner.aembed(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self._owner.aembed_one(text)
+
+
+class CachedEmbeddings(EmbeddingsClient):
+    """
+    Caching decorator for any EmbeddingsClient.
+    - Key: sha256(model + text), so switching models never serves stale vectors.
+    - Bounded in-memory LRU, optionally backed by a local SQLite file that
+      survives worker restarts.
+    - Only misses are sent to the wrapped client (batched in one call).
+    """
+
+    def __init__(self, inner: EmbeddingsClient, model: Optional[str] = None, maxsize: int = 4096, path: Optional[str] = None):
+        self._inner = inner
+        self.model = model or getattr(inner, "model", "") or ""
+        self._memory = LRUCache(maxsize=maxsize)
+        self._disk = _DiskTier(path) if path else None
+        self._lc = _LangChainAdapter(self)
+        self.disk_hits = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        vec = self._memory.get(key)
+        if vec is None and self._disk is not None:
+            vec = self._disk.get(key)
+            if vec is not None:
+                self.disk_hits += 1
+                self._memory.set(key, vec)
+        return vec
+
+    def _split(self, texts: List[str]) -> tuple[List[Optional[List[float]]], List[int], List[str]]:
+        """Cached vectors (None for misses), miss positions and distinct texts to embed."""
+        out = [self._lookup(self._key(t)) for t in texts]
+        missing = [i for i, v in enumerate(out) if v is None]
+        cache_event("embeddings", hit=True, n=len(texts) - len(missing))
+        cache_event("embeddings", hit=False, n=len(missing))
+        todo = list(dict.fromkeys(texts[i] for i in missing))
+        return out, missing, todo
+
+    def _fill(self, texts: List[str], out: list, missing: List[int], todo: List[str], vectors: List[List[float]]) -> List[List[float]]:
+        fresh = dict(zip(todo, vectors))
+        for i in missing:
+            out[i] = fresh[texts[i]]
+        new_items = []
+        for text, vec in fresh.items():
+            key = self._key(text)
+            self._memory.set(key, vec)
+            new_items.append((key, vec))
+        if self._disk is not None:
+            self._disk.set_many(new_items)
+        return out
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        out, missing, todo = self._split(texts)
+        if not todo:
+            return out  # type: ignore[return-value]
+        return self._fill(texts, out, missing, todo, self._inner.embed(texts=todo))
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        out, missing, todo = self._split(texts)
+        if not todo:
+            return out  # type: ignore[return-value]
+        return self._fill(texts, out, missing, todo, await self._inner.aembed(texts=todo))
+
+    async def aembed_one(self, text: str) -> List[float]:
+        return (await self.aembed([text]))[0]
+
+    def stats(self) -> dict:
+        s = self._memory.stats()
+        # memory misses that were served from disk are not real misses
+        return {
+            "hits": s["hits"] + self.disk_hits,
+            "misses": s["misses"] - self.disk_hits,
+            "memory_hits": s["hits"],
+            "disk_hits": self.disk_hits,
+            "size": s["size"],
+            "maxsize": s["maxsize"],
+        }
+
+    @property
+    def lc(self) -> Embeddings:
+        return self._lc
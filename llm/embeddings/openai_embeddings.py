@@ -14,16 +14,23 @@ class OpenAIEmbeddings(EmbeddingsClient):
         api_key: str,
         model: str,
         base_url: Optional[str] = None,
+        http_client=None,
+        http_async_client=None,
     ):
         """
         Args:
             api_key: OpenAI (or compatible) API key
             model: embedding model name (e.g., "text-embedding-3-large")
             base_url: optional custom endpoint (e.g., OpenRouter base URL)
+            http_client / http_async_client: shared httpx pools (infra/http.py)
         """
+        self.model = model
         self._emb = LCOpenAIEmbeddings(
             api_key=api_key,
             model=model,
+            base_url=base_url,
+            http_client=http_client,
+            http_async_client=http_async_client,
         )
 
     def embed(self, texts: list[str]) -> list[list[float]]:
@@ -32,6 +39,12 @@ class OpenAIEmbeddings(EmbeddingsClient):
 
     def embed_one(self, text:str) -> list[float]:
         return self._emb.embed_query(text)
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        return await self._emb.aembed_documents(texts)
+
+    async def aembed_one(self, text: str) -> list[float]:
+        return await self._emb.aembed_query(text)
     
     @property
     def lc(self) -> LCOpenAIEmbeddings:
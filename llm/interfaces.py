@@ -1,11 +1,26 @@
-from typing import Protocol, Dict, Any
+from typing import Protocol, Dict, Any, Iterator
 
 class LLMClient(Protocol):
     def generate(self, *, prompt: str, **kwargs: Any) -> str:
         ...
 
+    async def agenerate(self, *, prompt: str, **kwargs: Any) -> str:
+        ...
+
+    def stream(self, *, prompt: str, **kwargs: Any) -> Iterator[str]:
+        ...
+
 class EmbeddingsClient(Protocol):
     def embed(self, *, texts: list[str]) -> list[list[float]]:
         ...
 
+    def embed_one(self, text: str) -> list[float]:
+        ...
+
+    async def aembed(self, *, texts: list[str]) -> list[list[float]]:
+        ...
+
+    async def aembed_one(self, text: str) -> list[float]:
+        ...
+
     
\ No newline at end of file
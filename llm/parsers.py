@@ -39,3 +39,91 @@ def parse_recommendations(llm_output: str) -> RecommendationResult:
         customer_id=model.customer_id,
         recommendations=[Recommendation(**r.model_dump()) for r in model.recommendations]
     )
+
+
+class RecommendationStreamParser:
+    """
+    Incremental parser for a streamed recommendation JSON object.
+    feed() chunks as they arrive; it returns every item of the
+    "recommendations" array whose object has just been closed, validated
+    against RecommendationItemSchema (invalid items are skipped).
+    Only a small scanner state is kept; each item is json-decoded once.
+    """
+
+    _KEY = '"recommendations"'
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0            # next unscanned index in _buf
+        self._in_array = False
+        self._done = False
+        self._depth = 0          # object depth inside the array
+        self._in_str = False
+        self._escape = False
+        self._item_start = -1
+
+    def feed(self, chunk: str) -> List[Recommendation]:
+        if self._done or not chunk:
+            return []
+        self._buf += chunk
+        out: List[Recommendation] = []
+
+        if not self._in_array:
+            k = self._buf.find(self._KEY)
+            if k < 0:
+                return out
+            b = self._buf.find("[", k + len(self._KEY))
+            if b < 0:
+                return out
+            self._in_array = True
+            self._pos = b + 1
+
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            c = buf[i]
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_str = False
+            elif c == '"':
+                self._in_str = True
+            elif c == "{":
+                if self._depth == 0:
+                    self._item_start = i
+                self._depth += 1
+            elif c == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._item_start >= 0:
+                    item = self._decode(buf[self._item_start:i + 1])
+                    if item is not None:
+                        out.append(item)
+                    self._item_start = -1
+            elif c == "]" and self._depth == 0:
+                self._done = True
+                break
+            i += 1
+        self._pos = i
+
+        # Drop consumed text so the buffer stays small
+        keep_from = self._item_start if self._item_start >= 0 else self._pos
+        self._buf = buf[keep_from:]
+        self._pos -= keep_from
+        if self._item_start >= 0:
+            self._item_start = 0
+        return out
+
+    @staticmethod
+    def _decode(text: str) -> Optional[Recommendation]:
+        try:
+            model = RecommendationItemSchema.model_validate(json.loads(text))
+        except (json.JSONDecodeError, ValidationError):
+            return None
+        return Recommendation(**model.model_dump())
+
+    @property
+    def done(self) -> bool:
+        return self._done
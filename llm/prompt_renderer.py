@@ -1,5 +1,51 @@
+from string import Formatter
 from typing import Mapping
 
+
+def _escape(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+class CompiledTemplate:
+    """
+    A template with its static variables rendered once.
+    `prefix` is everything before the first per-request variable; it is
+    byte-identical across requests, which is what provider-side prompt/prefix
+    caching keys on. Only `tail` is formatted per call.
+    """
+
+    def __init__(self, prefix: str, tail: str):
+        self.prefix = prefix
+        self.tail = tail
+
+    def render(self, variables: Mapping[str, str]) -> str:
+        return self.prefix + self.tail.format(**variables)
+
+
 class PromptRenderer:
     def render(self, template: str, variables: Mapping[str, str]) -> str:
         return template.format(**variables)
+
+    def compile(self, template: str, static: Mapping[str, str]) -> CompiledTemplate:
+        """
+        Pre-render `static` variables. Place static parts first in the template
+        to get the longest shared prefix.
+        """
+        prefix, tail, in_tail = [], [], False
+        for literal, field, spec, conv in Formatter().parse(template):
+            if not in_tail:
+                prefix.append(literal)
+            else:
+                tail.append(_escape(literal))
+            if field is None:
+                continue
+            if field in static:
+                value = format(static[field], spec or "")
+                if in_tail:
+                    tail.append(_escape(value))
+                else:
+                    prefix.append(value)
+                continue
+            in_tail = True
+            tail.append("{" + field + (f"!{conv}" if conv else "") + (f":{spec}" if spec else "") + "}")
+        return CompiledTemplate("".join(prefix), "".join(tail))
@@ -9,6 +9,9 @@ Output strictly as JSON with the following schema:
 {json_schema}
 """
 
+# Static instructions, schema and examples come first and the per-customer
+# parts last, so the rendered prefix is byte-identical across requests
+# (provider prompt caching). Compiled once via PromptRenderer.compile.
 RECOMMENDATION_PROMPT = """\
 Given the customer profile and a shortlist, choose exactly 10 distinct products.
 
@@ -19,12 +22,6 @@ Given the customer profile and a shortlist, choose exactly 10 distinct products.
 - **Reason brevity:** Each reason ≤ 10 words, no filler.
 - **Diversity:** Include a mix of categories and styles.
 
-Customer profile (brief):
-{profile}
-
-Shortlist (JSON; objects with product_id, name only):
-{shortlist}
-
 Output strictly as JSON matching this schema without changing the datatypes:
 {json_schema}
 
@@ -49,6 +46,36 @@ Valid example:
     ...
   ]
 }}
+
+Customer profile (brief):
+{profile}
+
+Shortlist (JSON; objects with product_id, name only):
+{shortlist}
+"""
+
+# Compact encoding: short per-request ids and a tabular shortlist (fewer input tokens)
+RECOMMENDATION_PROMPT_COMPACT = """\
+Given the customer profile and a shortlist, choose exactly 10 distinct products.
+
+# Constraints (must follow)
+- **Does not include previously purchased products**
+- **Uniqueness:** At most one per base product.
+- Prefer items most aligned with the profile intent.
+- **Reason brevity:** Each reason ≤ 10 words, no filler.
+- **Diversity:** Include a mix of categories and styles.
+
+Output ONE JSON object only, no explanation, no code fences, matching:
+{json_schema}
+Use the shortlist id as "product_id" and its name as "product_name".
+Only keys allowed: "customer_id", "recommendations"; each item has only "product_id", "product_name", "reason".
+Example: {{"customer_id": 114, "recommendations": [{{"product_id": 3, "product_name": "...", "reason": "..."}}]}}
+
+Customer profile (brief):
+{profile}
+
+Shortlist (one per line: id|name):
+{shortlist}
 """
 
 
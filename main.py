@@ -1,21 +1,29 @@
 from api.flask_app import create_app
-from config.settings import Settings
+from config.settings import get_settings
 from api.middleware import configure_logging
 from api.errors import register_error_handlers
+from api.asgi_app import create_asgi_app
+from infra.factory import build_request_profiler
+from infra.registry import STARTUP
 
 def create_validated_app():
     # Validate critical config at boot (fail fast)
-    s = Settings()
+    s = get_settings()
     assert s.openai_api_key, "OPENAI_API_KEY is required"
     assert s.llm_model, "LLM model is required"
 
     app = create_app()
-    configure_logging(app)
+    configure_logging(app, profiler=build_request_profiler(s))
     register_error_handlers(app)
+    STARTUP.log()
     return app
 
 app = create_validated_app()
+# ASGI entrypoint with the async /recommendations route (see deploy/gunicorn.conf.py)
+asgi_app = create_asgi_app(app)
 
 if __name__ == "__main__":
     # For local dev; in prod use gunicorn/uwsgi
+    from infra.warmup import WARMUP
+    WARMUP.run()
     app.run(host="0.0.0.0", port=8000)
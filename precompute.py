@@ -0,0 +1,115 @@
+"""
+Offline job: materialize recommendations for every customer profile.
+
+Streams the profile collection in pages, runs the live pipeline for each
+profile on a thread or process pool and writes results to a SQLite
+PrecomputedStore. A checkpoint is saved after every page, so an interrupted
+run resumes where it stopped; profiles whose stored result is still fresh
+are skipped.
+
+    python precompute.py --out precomputed.sqlite3 --workers 8
+    PRECOMPUTED_STORE_PATH=precomputed.sqlite3 gunicorn -c deploy/gunicorn.conf.py   # serve
+"""
+import argparse
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from config.settings import Settings
+from data.precomputed import PrecomputedStore
+from domain.models import CustomerProfile
+from infra.factory import build_recommender_service, refresh_product_snapshot
+from service.recommender_service import RecommenderService
+
+log = logging.getLogger("precompute")
+
+JOB_NAME = "precompute"
+
+# Per-process service for the process-pool executor
+_worker_service: Optional[RecommenderService] = None
+
+
+def _init_worker(out_path: str):
+    global _worker_service
+    s = Settings()
+    s.precomputed_store_path = out_path
+    s.result_cache_enabled = False
+    _worker_service = build_recommender_service(s)
+
+
+def _materialize_in_worker(profile_json: str, shortlist_k: int) -> str:
+    profile = CustomerProfile.model_validate_json(profile_json)
+    _worker_service.materialize(profile, shortlist_k=shortlist_k)
+    return str(profile.customer_id)
+
+
+def run(args) -> None:
+    s = Settings()
+    s.precomputed_store_path = args.out
+    s.result_cache_enabled = False  # every profile is computed once; don't hold them in memory
+    s.llm_router_concurrency = max(s.llm_router_concurrency, args.workers)
+    if s.vectorstore_provider.lower() == "numpy" and refresh_product_snapshot(s):
+        log.info("re-exported the NumPy product snapshot")
+    service = build_recommender_service(s)
+    store: PrecomputedStore = service.precomputed
+
+    start_offset = 0 if args.restart else store.get_checkpoint(JOB_NAME)
+    if start_offset:
+        log.info("resuming from offset %d", start_offset)
+
+    pool: Executor
+    if args.executor == "process":
+        pool = ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.out,))
+    else:
+        pool = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="precompute")
+
+    done = skipped = failed = 0
+    started = time.time()
+    catalog_version = service.products.version
+    with pool:
+        for next_offset, profiles in service.profiles.iter_pages(page_size=args.page_size, start_offset=start_offset):
+            todo = [
+                p for p in profiles
+                if args.force or not store.is_fresh(str(p.customer_id), p.profile_text, catalog_version, s.precomputed_max_age_seconds)
+            ]
+            skipped += len(profiles) - len(todo)
+            if args.executor == "process":
+                futures = [pool.submit(_materialize_in_worker, p.model_dump_json(), args.shortlist_k) for p in todo]
+            else:
+                futures = [pool.submit(service.materialize, p, args.shortlist_k) for p in todo]
+            for p, fut in zip(todo, futures):
+                try:
+                    fut.result()
+                    done += 1
+                except Exception:
+                    failed += 1
+                    log.exception("failed customer_id=%s", p.customer_id)
+            # Whole page handled (failures are retried on the next full run)
+            store.set_checkpoint(JOB_NAME, next_offset)
+            log.info("offset=%d done=%d skipped=%d failed=%d elapsed=%.1fs",
+                     next_offset, done, skipped, failed, time.time() - started)
+
+    # Completed pass: next run starts from the beginning again
+    store.set_checkpoint(JOB_NAME, 0)
+    log.info("finished: done=%d skipped=%d failed=%d stored=%d", done, skipped, failed, store.count())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute recommendations for all customer profiles.")
+    parser.add_argument("--out", default=Settings().precomputed_store_path or "precomputed_recommendations.sqlite3",
+                        help="SQLite file to write (serving reads it via PRECOMPUTED_STORE_PATH)")
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--shortlist-k", type=int, default=None,
+                        help="default: SHORTLIST_K setting (results are served only at the serving SHORTLIST_K)")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    parser.add_argument("--force", action="store_true", help="recompute even when a fresh result exists")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s %(message)s')
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,39 @@
-from typing import List
-from domain.models import RecommendationResult, ComplementarySet, CustomerProfile, Product
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+from domain.models import RecommendationResult, ComplementarySet, CustomerProfile, Product, Recommendation
 from data.repositories import CustomerProfileRepository, ProductCatalogRepository
-from helpers.finalize_recommender import finalize_recommendations
+from helpers.finalize_recommender import finalize_recommendations, ShortlistValidator
 from llm.interfaces import LLMClient
-from llm.prompts import COMPLEMENT_PROMPT, RECOMMENDATION_PROMPT
+from llm.prompts import COMPLEMENT_PROMPT, RECOMMENDATION_PROMPT, RECOMMENDATION_PROMPT_COMPACT
 from llm.prompt_renderer import PromptRenderer
-from llm.parsers import parse_complements, parse_recommendations, RecommendationSchema, ComplementarySchema
-from datetime import datetime
-from helpers.compact_utilities import _compact_json, _to_llm_item
+from llm.parsers import parse_complements, parse_recommendations, RecommendationSchema, ComplementarySchema, RecommendationStreamParser
+from helpers.compact_utilities import (
+    _compact_json, _to_llm_item, encode_shortlist_compact, fit_token_budget, names_by_id, resolve_aliases,
+)
 from helpers.product_filters import drop_already_ordered
+from service.result_cache import RecommendationResultCache, profile_hash
+from data.precomputed import PrecomputedStore
+from helpers.single_flight import SingleFlight, AsyncSingleFlight, WaitTimeout
+from helpers.deadline import Deadline, DeadlineExceeded
+from helpers.fast_ranker import rank_shortlist
+from infra.metrics import cache_event, llm_failure, stage_timer
+import logging
+
+log = logging.getLogger(__name__)
+
+# A follower whose leader ran out of time reruns only if its own deadline ends
+# at least this much later than the leader's; less would just time out again
+RERUN_MIN_EXTRA_SECONDS = 0.25
+
+# Generation settings for the recommendation prompt (deterministic JSON).
+# cache_validator: an LLM response cache only stores output that parses.
+REC_GEN_KWARGS = {
+    "top_p": 0.0,
+    "temperature": 0,
+    "response_format": {"type": "json_object"},
+    "cache_validator": parse_recommendations,
+}
 
 class RecommenderService:
     def __init__(
@@ -16,55 +41,493 @@ class RecommenderService:
         llm: LLMClient,
         profiles: CustomerProfileRepository,
         products: ProductCatalogRepository,
-        renderer: PromptRenderer
+        renderer: PromptRenderer,
+        result_cache: Optional[RecommendationResultCache] = None,
+        precomputed: Optional[PrecomputedStore] = None,
+        precomputed_max_age_seconds: Optional[float] = None,
+        shortlist_k: int = 50,
+        prompt_encoding: str = "json",
+        prompt_shortlist_token_budget: int = 0,
+        fast_fallback: bool = True,
     ):
         self.llm = llm
         self.profiles = profiles
         self.products = products
         self.renderer = renderer
+        self.result_cache = result_cache
+        self.shortlist_k = shortlist_k
+        # "json" (objects with full ids/names) or "compact" (aliased id|base-name lines)
+        self.prompt_encoding = prompt_encoding
+        self.prompt_shortlist_token_budget = prompt_shortlist_token_budget
+        # Schema JSON and instructions are rendered once here, not per request
+        rec_schema_json = _compact_json(RecommendationSchema.model_json_schema())
+        self._rec_templates = {
+            "json": renderer.compile(RECOMMENDATION_PROMPT, {"json_schema": rec_schema_json}),
+            "compact": renderer.compile(RECOMMENDATION_PROMPT_COMPACT, {"json_schema": rec_schema_json}),
+        }
+        # LLM failure/timeout → serve the locally ranked shortlist instead of nothing
+        self.fast_fallback = fast_fallback
+        # Serving mode: read materialized results first, generate live only when missing/stale
+        self.precomputed = precomputed
+        self.precomputed_max_age_seconds = precomputed_max_age_seconds
+        # Concurrent requests for the same customer/profile share one pipeline run
+        self._inflight = SingleFlight()
+        self._ainflight = AsyncSingleFlight()
 
-    def get_recommendations(self, customer_id: str, shortlist_k: int = 50) -> RecommendationResult:
-        profile: CustomerProfile | None = self.profiles.get_by_customer_id(customer_id)
+    def invalidate_cache(self, customer_id: Optional[str] = None) -> None:
+        """Invalidation hook for profile/catalog rebuilds (all customers when customer_id is None)."""
+        if self.result_cache is not None:
+            self.result_cache.invalidate(customer_id)
 
-        current_time = datetime.now()
+    def _usable_profile(self, customer_id: str, profile: Optional[CustomerProfile]) -> bool:
         if not profile:
-            # Return empty but valid structure or raise domain error
-            return RecommendationResult(customer_id=customer_id, recommendations=[])
+            return False
         if profile.profile_text == f"No sufficient data found for customer ID: {customer_id}":
-            return RecommendationResult(customer_id=customer_id, recommendations=[])
-        
-        print("Time taken to profile search: ", datetime.now() - current_time)
-        
+            return False
+        return True
 
-        current_time = datetime.now()
-        shortlist: List[Product] = self.products.search_similar(profile.profile_text, k=shortlist_k)
-        print("Time taken to get the products: ", datetime.now() - current_time)
-        shortlist = drop_already_ordered(shortlist, profile)
+    @staticmethod
+    def _stage(deadline: Optional[Deadline], stage: str, fn, *args, **kwargs):
+        """Run a blocking pipeline stage within the request deadline (if any)."""
+        if deadline is None:
+            return fn(*args, **kwargs)
+        return deadline.call(stage, fn, *args, **kwargs)
 
-        llm_shortlist = [_to_llm_item(p) for p in shortlist]
+    @staticmethod
+    async def _astage(deadline: Optional[Deadline], stage: str, aw):
+        if deadline is None:
+            return await aw()
+        return await deadline.acall(stage, aw)
 
-        # Build JSON schema strings inline or use OpenAI JSON schema in response_format
-        # rec_schema = RecommendationSchema.model_json_schema()
+    @staticmethod
+    def _llm_kwargs(deadline: Optional[Deadline]) -> dict:
+        if deadline is None:
+            return REC_GEN_KWARGS
+        # The provider call itself also gives up at the deadline
+        return {**REC_GEN_KWARGS, "timeout": deadline.remaining()}
 
-        rec_schema_json = _compact_json(RecommendationSchema.model_json_schema())
-        shortlist_json = _compact_json(llm_shortlist)
+    @staticmethod
+    def _wait_budget(deadline: Optional[Deadline]) -> Optional[float]:
+        """How long a coalesced caller may wait for the in-flight run: its own remaining budget."""
+        return None if deadline is None else deadline.remaining()
 
-        prompt = self.renderer.render(
-            RECOMMENDATION_PROMPT,
-            {
-                "profile": profile.profile_text,
-                # "shortlist": "[" + ",".join([p.model_dump_json() for p in shortlist]) + "]",
-                "shortlist": shortlist_json,
-                "json_schema": rec_schema_json
-            },
+    @staticmethod
+    def _rerun_for_follower(
+        result: RecommendationResult, leader_deadline: Optional[Deadline], deadline: Optional[Deadline]
+    ) -> bool:
+        """
+        Only a leader result degraded by its own deadline is redone, and only for
+        a follower whose budget reaches RERUN_MIN_EXTRA_SECONDS past the leader's.
+        LLM-error, rate-limit and invalid-response fallbacks are shared: rerunning
+        them would multiply calls to a provider that is already failing.
+        """
+        if result.degraded is None or result.degraded.get("reason") != "deadline_exceeded":
+            return False
+        if deadline is None:
+            return True
+        if deadline.remaining() <= 0:
+            return False
+        return leader_deadline is not None and \
+            deadline.expires_at - leader_deadline.expires_at >= RERUN_MIN_EXTRA_SECONDS
+
+    def _coalesced(self, key, run, deadline: Optional[Deadline]) -> RecommendationResult:
+        """
+        Run `run` (returning (result, its deadline)) through the single-flight.
+        A follower that may rerun (see _rerun_for_follower) goes back through the
+        single-flight, so followers with more budget still share one rerun.
+        """
+        while True:
+            try:
+                (result, leader_deadline), shared = self._inflight.do(key, run, timeout=self._wait_budget(deadline))
+            except WaitTimeout:
+                deadline.exhaust("coalesced_wait")
+            if not (shared and self._rerun_for_follower(result, leader_deadline, deadline)):
+                break
+        # Followers get their own copy; the leader's object is not shared further
+        return result.model_copy(deep=True) if shared else result
+
+    async def _acoalesced(self, key, run, deadline: Optional[Deadline]) -> RecommendationResult:
+        while True:
+            try:
+                (result, leader_deadline), shared = await self._ainflight.do(
+                    key, run, timeout=self._wait_budget(deadline)
+                )
+            except WaitTimeout:
+                deadline.exhaust("coalesced_wait")
+            if not (shared and self._rerun_for_follower(result, leader_deadline, deadline)):
+                break
+        return result.model_copy(deep=True) if shared else result
+
+    def _degraded(self, customer_id: str, deadline: Deadline, err: DeadlineExceeded) -> RecommendationResult:
+        """Defined response for a request whose deadline ran out: no items, plus where the budget went."""
+        return RecommendationResult(
+            customer_id=customer_id,
+            recommendations=[],
+            degraded={"reason": "deadline_exceeded", "stage": err.stage, **deadline.summary()},
+        )
+
+    def _fallback(
+        self, profile: CustomerProfile, shortlist: List[Product], err: Exception, deadline: Optional[Deadline],
+        stage: str = "llm_generate",
+    ) -> RecommendationResult:
+        """Fast-ranked shortlist served when the LLM stage fails, runs out of time or answers unusably."""
+        timed_out = isinstance(err, DeadlineExceeded)
+        if timed_out:
+            reason = "deadline_exceeded"
+        else:
+            reason = "llm_invalid_response" if stage == "parse" else "llm_error"
+            log.warning({"event": "llm_fallback", "customer_id": profile.customer_id, "stage": stage,
+                         "error": type(err).__name__})
+        degraded = {"reason": reason, "stage": stage, "fallback": "fast"}
+        if deadline is not None:
+            degraded.update(deadline.summary())
+        return RecommendationResult(
+            customer_id=profile.customer_id, recommendations=rank_shortlist(shortlist, profile), degraded=degraded
+        )
+
+    def get_fast_recommendations(
+        self, customer_id: str, shortlist_k: Optional[int] = None, deadline: Optional[Deadline] = None
+    ) -> RecommendationResult:
+        """
+        mode=fast: no LLM call. The shortlist (MMR search, dedupe, category
+        interleave, already-ordered filter) is ranked locally by vector score
+        with template reasons.
+        """
+        try:
+            profile: CustomerProfile | None = self._stage(
+                deadline, "profile_lookup", self.profiles.get_by_customer_id, customer_id
+            )
+            if not self._usable_profile(customer_id, profile):
+                return RecommendationResult(customer_id=customer_id, recommendations=[])
+            shortlist = self._stage(deadline, "product_search", self._shortlist, profile, shortlist_k or self.shortlist_k)
+        except DeadlineExceeded as e:
+            if deadline is None:
+                raise
+            return self._degraded(customer_id, deadline, e)
+        return RecommendationResult(customer_id=customer_id, recommendations=rank_shortlist(shortlist, profile))
+
+    def get_recommendations(
+        self, customer_id: str, shortlist_k: Optional[int] = None, deadline: Optional[Deadline] = None
+    ) -> RecommendationResult:
+        try:
+            profile: CustomerProfile | None = self._stage(
+                deadline, "profile_lookup", self.profiles.get_by_customer_id, customer_id
+            )
+            if not self._usable_profile(customer_id, profile):
+                # Return empty but valid structure or raise domain error
+                return RecommendationResult(customer_id=customer_id, recommendations=[])
+            return self._recommend_cached(customer_id, profile, shortlist_k, deadline)
+        except DeadlineExceeded as e:
+            if deadline is None:
+                raise
+            return self._degraded(customer_id, deadline, e)
+
+    def _recommend_cached(
+        self, customer_id: str, profile: CustomerProfile, shortlist_k: Optional[int], deadline: Optional[Deadline] = None
+    ) -> RecommendationResult:
+        """Result cache → single-flight → pipeline for a usable profile."""
+        shortlist_k = shortlist_k or self.shortlist_k
+        catalog_version = self.products.version
+        if self.result_cache is not None:
+            cached = self.result_cache.get(customer_id, profile.profile_text, catalog_version, shortlist_k)
+            if cached is not None:
+                return cached
+        stored = self._lookup_precomputed(customer_id, profile, catalog_version, shortlist_k)
+        if stored is not None:
+            return stored
+
+        # Each caller's _run closes over its own deadline; only the leader's is executed
+        # unless its deadline ran out (see _rerun_for_follower)
+        def _run() -> Tuple[RecommendationResult, Optional[Deadline]]:
+            try:
+                result = self._recommend(profile, shortlist_k, deadline)
+            except DeadlineExceeded as e:
+                if deadline is None:
+                    raise
+                # Returned, not raised: followers decide for themselves whether to rerun
+                return self._degraded(customer_id, deadline, e), deadline
+            if self.result_cache is not None and result.degraded is None:
+                self.result_cache.put(customer_id, profile.profile_text, catalog_version, shortlist_k, result)
+            return result, deadline
+
+        key = (str(customer_id), profile_hash(profile.profile_text), catalog_version, shortlist_k)
+        return self._coalesced(key, _run, deadline)
+
+    def _lookup_precomputed(
+        self, customer_id: str, profile: CustomerProfile, catalog_version: str, shortlist_k: int
+    ) -> Optional[RecommendationResult]:
+        # Precomputed results are materialized at the default shortlist size
+        if self.precomputed is None or shortlist_k != self.shortlist_k:
+            return None
+        stored = self.precomputed.lookup(
+            customer_id, profile.profile_text, catalog_version, max_age_seconds=self.precomputed_max_age_seconds
+        )
+        cache_event("precomputed", hit=stored is not None)
+        if stored is not None and self.result_cache is not None:
+            self.result_cache.put(customer_id, profile.profile_text, catalog_version, shortlist_k, stored)
+        return stored
+
+    def materialize(self, profile: CustomerProfile, shortlist_k: Optional[int] = None) -> Optional[RecommendationResult]:
+        """
+        Offline path (precompute.py): run the live pipeline for one profile and
+        write it to the precomputed store. Returns None for unusable profiles.
+        """
+        customer_id = str(profile.customer_id)
+        if not self._usable_profile(customer_id, profile):
+            return None
+        catalog_version = self.products.version
+        result = self._recommend(profile, shortlist_k, allow_fallback=False)
+        if self.precomputed is not None:
+            self.precomputed.put(customer_id, profile.profile_text, catalog_version, result)
+        return result
+
+    def get_recommendations_batch(
+        self, customer_ids: List[str], concurrency: int = 8, shortlist_k: Optional[int] = None
+    ) -> Iterator[Tuple[str, Optional[RecommendationResult], Optional[Exception]]]:
+        """
+        Recommendations for many customers. Profiles are fetched in bulk before
+        this returns (a store error raises here, so callers can still answer
+        with an error status); the returned iterator runs the pipeline on at
+        most `concurrency` threads and yields (customer_id, result, error) in
+        completion order.
+        """
+        ids = [str(c) for c in dict.fromkeys(customer_ids)]
+        profiles = self.profiles.get_by_customer_ids(ids)
+        return self._run_batch(ids, profiles, concurrency, shortlist_k)
+
+    def _run_batch(
+        self, ids: List[str], profiles: Dict[str, CustomerProfile], concurrency: int, shortlist_k: Optional[int]
+    ) -> Iterator[Tuple[str, Optional[RecommendationResult], Optional[Exception]]]:
+        pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="recs-batch")
+        futures, empty = {}, []
+        try:
+            for cid in ids:
+                profile = profiles.get(cid)
+                if not self._usable_profile(cid, profile):
+                    empty.append(cid)
+                    continue
+                futures[pool.submit(self._recommend_cached, cid, profile, shortlist_k)] = cid
+            for cid in empty:
+                yield cid, RecommendationResult(customer_id=cid, recommendations=[]), None
+            for fut in as_completed(futures):
+                cid = futures[fut]
+                try:
+                    yield cid, fut.result(), None
+                except Exception as e:
+                    yield cid, None, e
+        finally:
+            # Consumer went away (or we're done): don't start queued work
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stream_recommendations(self, customer_id: str, shortlist_k: Optional[int] = None) -> Iterator[Recommendation]:
+        """
+        Yields validated recommendations one by one while the LLM is still
+        generating. Each item passes the same shortlist checks as
+        finalize_recommendations as soon as its JSON object is complete.
+        Cached/precomputed results are replayed directly.
+        """
+        profile: CustomerProfile | None = self.profiles.get_by_customer_id(customer_id)
+        if not self._usable_profile(customer_id, profile):
+            return
+        shortlist_k = shortlist_k or self.shortlist_k
+        catalog_version = self.products.version
+        known = None
+        if self.result_cache is not None:
+            known = self.result_cache.get(customer_id, profile.profile_text, catalog_version, shortlist_k)
+        if known is None:
+            known = self._lookup_precomputed(customer_id, profile, catalog_version, shortlist_k)
+        if known is not None:
+            yield from known.recommendations
+            return
+
+        shortlist = self._shortlist(profile, shortlist_k)
+        prompt, shortlist, aliases = self._build_prompt(profile, shortlist)
+        validator = ShortlistValidator(shortlist, shortlist_k)
+        parser = RecommendationStreamParser()
+        names = names_by_id(shortlist) if aliases is not None else None
+        items: List[Recommendation] = []
+        for chunk in self.llm.stream(prompt=prompt, **REC_GEN_KWARGS):
+            decoded = parser.feed(chunk)
+            if aliases is not None:
+                decoded = resolve_aliases(decoded, aliases, names)
+            for item in decoded:
+                if validator.accept(item):
+                    items.append(item)
+                    yield item
+            if parser.done or validator.full:
+                break
+        if self.result_cache is not None and parser.done:
+            # Only complete generations are cached
+            self.result_cache.put(
+                customer_id, profile.profile_text, catalog_version, shortlist_k,
+                RecommendationResult(customer_id=customer_id, recommendations=items),
+            )
+
+    async def aget_recommendations(
+        self, customer_id: str, shortlist_k: Optional[int] = None, deadline: Optional[Deadline] = None
+    ) -> RecommendationResult:
+        """
+        Async variant of get_recommendations. The LLM call and query embedding
+        (profiles without a stored vector) are awaited natively; blocking Chroma
+        calls run in the default thread pool.
+        """
+        try:
+            return await self._aget_recommendations(customer_id, shortlist_k, deadline)
+        except DeadlineExceeded as e:
+            if deadline is None:
+                raise
+            return self._degraded(customer_id, deadline, e)
+
+    async def _aget_recommendations(
+        self, customer_id: str, shortlist_k: Optional[int], deadline: Optional[Deadline]
+    ) -> RecommendationResult:
+        profile: CustomerProfile | None = await self._astage(
+            deadline, "profile_lookup", lambda: asyncio.to_thread(self.profiles.get_by_customer_id, customer_id)
         )
+        if not self._usable_profile(customer_id, profile):
+            return RecommendationResult(customer_id=customer_id, recommendations=[])
+
+        shortlist_k = shortlist_k or self.shortlist_k
+        catalog_version = await asyncio.to_thread(lambda: self.products.version)
+        if self.result_cache is not None:
+            cached = self.result_cache.get(customer_id, profile.profile_text, catalog_version, shortlist_k)
+            if cached is not None:
+                return cached
+        if self.precomputed is not None:
+            stored = await asyncio.to_thread(self._lookup_precomputed, customer_id, profile, catalog_version, shortlist_k)
+            if stored is not None:
+                return stored
+
+        async def _run() -> Tuple[RecommendationResult, Optional[Deadline]]:
+            try:
+                result = await self._arecommend(profile, shortlist_k, deadline)
+            except DeadlineExceeded as e:
+                if deadline is None:
+                    raise
+                return self._degraded(customer_id, deadline, e), deadline
+            if self.result_cache is not None and result.degraded is None:
+                self.result_cache.put(customer_id, profile.profile_text, catalog_version, shortlist_k, result)
+            return result, deadline
+
+        key = (str(customer_id), profile_hash(profile.profile_text), catalog_version, shortlist_k)
+        return await self._acoalesced(key, _run, deadline)
+
+    async def _ashortlist(self, profile: CustomerProfile, shortlist_k: int) -> List[Product]:
+        shortlist = await self.products.asearch_similar(profile.profile_text, k=shortlist_k, vector=profile.vector)
+        with stage_timer("ordered_filter"):
+            return drop_already_ordered(shortlist, profile)
+
+    def _shortlist(self, profile: CustomerProfile, shortlist_k: int) -> List[Product]:
+        shortlist: List[Product] = self.products.search_similar(profile.profile_text, k=shortlist_k, vector=profile.vector)
+        with stage_timer("ordered_filter"):
+            return drop_already_ordered(shortlist, profile)
+
+    def _build_prompt(
+        self, profile: CustomerProfile, shortlist: List[Product]
+    ) -> Tuple[str, List[Product], Optional[Dict[int, int]]]:
+        """
+        Returns (prompt, shortlist actually shown to the LLM, alias map).
+        The shortlist is trimmed to the token budget; the alias map is only set
+        in compact mode and must be applied to the LLM's product_ids.
+        """
+        with stage_timer("prompt_build"):
+            return self._render_prompt(profile, shortlist)
+
+    def _render_prompt(
+        self, profile: CustomerProfile, shortlist: List[Product]
+    ) -> Tuple[str, List[Product], Optional[Dict[int, int]]]:
+        budget = self.prompt_shortlist_token_budget
+        aliases = None
+        if self.prompt_encoding == "compact":
+            lines, aliases = encode_shortlist_compact(shortlist)
+            n = fit_token_budget(lines, budget)
+            shortlist = shortlist[:n]
+            aliases = {a: pid for a, pid in aliases.items() if a <= n}
+            shortlist_text = "\n".join(lines[:n])
+        else:
+            llm_shortlist = [_to_llm_item(p) for p in shortlist]
+            n = fit_token_budget([_compact_json(i) for i in llm_shortlist], budget)
+            shortlist = shortlist[:n]
+            shortlist_text = _compact_json(llm_shortlist[:n])
+
+        template = self._rec_templates.get(self.prompt_encoding, self._rec_templates["json"])
+        prompt = template.render({"profile": profile.profile_text, "shortlist": shortlist_text})
+        return prompt, shortlist, aliases
+
+    def _finish(
+        self, raw: str, shortlist: List[Product], shortlist_k: int, aliases: Optional[Dict[int, int]] = None
+    ) -> RecommendationResult:
+        with stage_timer("parse"):
+            parsed = parse_recommendations(raw)
+            if aliases is not None:
+                parsed.recommendations = resolve_aliases(parsed.recommendations, aliases, names_by_id(shortlist))
+        with stage_timer("finalize"):
+            return finalize_recommendations(parsed, shortlist, k=shortlist_k)
+
+    def _on_llm_error(
+        self, profile: CustomerProfile, candidates: List[Product], err: Exception,
+        deadline: Optional[Deadline], allow_fallback: bool = True, stage: str = "llm_generate",
+    ) -> RecommendationResult:
+        """
+        Failed LLM call (stage "llm_generate") or unusable answer (stage "parse":
+        malformed JSON, schema or shortlist validation): counted, then the
+        fast-ranked fallback, or re-raised when fallback is off.
+        """
+        if isinstance(err, DeadlineExceeded):
+            llm_failure("timeout")
+        else:
+            llm_failure("parse" if stage == "parse" else "error")
+        if not (allow_fallback and self.fast_fallback):
+            raise err
+        return self._fallback(profile, candidates, err, deadline, stage)
+
+    def _recommend(
+        self,
+        profile: CustomerProfile,
+        shortlist_k: Optional[int],
+        deadline: Optional[Deadline] = None,
+        allow_fallback: bool = True,
+    ) -> RecommendationResult:
+        """
+        Shortlist → prompt → LLM → parse → finalize for an already loaded profile.
+        With a deadline, each stage gets the remaining budget as its timeout
+        (product_search covers query embedding when no stored vector exists).
+        If the LLM stage fails or times out, or its answer does not parse or
+        validate, the fast-ranked shortlist is returned (marked degraded)
+        unless fallback is disabled.
+        """
+        shortlist_k = shortlist_k or self.shortlist_k
+        candidates = self._stage(deadline, "product_search", self._shortlist, profile, shortlist_k)
+        prompt, shortlist, aliases = self._build_prompt(profile, candidates)
+
+        try:
+            with stage_timer("llm_generate"):
+                raw = self._stage(deadline, "llm_generate", self.llm.generate, prompt=prompt, **self._llm_kwargs(deadline))
+        except Exception as e:
+            return self._on_llm_error(profile, candidates, e, deadline, allow_fallback)
+        try:
+            return self._finish(raw, shortlist, shortlist_k, aliases)
+        except Exception as e:
+            return self._on_llm_error(profile, candidates, e, deadline, allow_fallback, stage="parse")
 
-        current_time = datetime.now()
-        raw = self.llm.generate(prompt=prompt,top_p=0.0, temperature=0, response_format={"type": "json_object"})
-        print("time taken to generate the llm output: ", datetime.now() - current_time)
-        parsed = parse_recommendations(raw)
-        parsed = finalize_recommendations(parsed, shortlist, k=shortlist_k)
-        return parsed
+    async def _arecommend(
+        self, profile: CustomerProfile, shortlist_k: Optional[int], deadline: Optional[Deadline] = None
+    ) -> RecommendationResult:
+        shortlist_k = shortlist_k or self.shortlist_k
+        shortlist = await self._astage(deadline, "product_search", lambda: self._ashortlist(profile, shortlist_k))
+        candidates = shortlist
+        prompt, shortlist, aliases = self._build_prompt(profile, candidates)
+        try:
+            with stage_timer("llm_generate"):
+                raw = await self._astage(
+                    deadline, "llm_generate", lambda: self.llm.agenerate(prompt=prompt, **self._llm_kwargs(deadline))
+                )
+        except Exception as e:
+            return self._on_llm_error(profile, candidates, e, deadline)
+        try:
+            return self._finish(raw, shortlist, shortlist_k, aliases)
+        except Exception as e:
+            return self._on_llm_error(profile, candidates, e, deadline, stage="parse")
 
     def get_complements(self, base_product_id: str, behavior_summary: str) -> ComplementarySet:
         comp_schema = ComplementarySchema.model_json_schema()
@@ -72,5 +535,5 @@ class RecommenderService:
             COMPLEMENT_PROMPT,
             {"behavior": behavior_summary, "json_schema": comp_schema},
         )
-        raw = self.llm.generate(prompt=prompt, temperature=0.2)
+        raw = self.llm.generate(prompt=prompt, temperature=0.2, cache_validator=parse_complements)
         return parse_complements(raw)
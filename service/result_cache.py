@@ -0,0 +1,64 @@
+import hashlib
+from typing import Optional
+from domain.models import RecommendationResult
+from helpers.cache import LRUCache
+from infra.metrics import cache_event
+
+
+def profile_hash(profile_text: str) -> str:
+    return hashlib.sha256((profile_text or "").encode("utf-8")).hexdigest()[:16]
+
+
+class RecommendationResultCache:
+    """
+    End-to-end cache of finalized recommendations.
+    - Entries are stored per customer_id together with a fingerprint
+      (profile_text hash + catalog version + shortlist_k); a lookup only hits
+      when all match, so a changed profile, a rebuilt catalog or another
+      shortlist size never serves a mismatched result (same inputs as the
+      service's single-flight key).
+    - TTL + max_entries bound staleness and memory (LRU eviction).
+    - invalidate()/clear() are the explicit hooks for store rebuilds.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 10_000):
+        self._cache = LRUCache(maxsize=max_entries, ttl=ttl_seconds)
+
+    @staticmethod
+    def fingerprint(profile_text: str, catalog_version: str, shortlist_k: int) -> str:
+        return f"{profile_hash(profile_text)}:{catalog_version}:{shortlist_k}"
+
+    def get(
+        self, customer_id: str, profile_text: str, catalog_version: str, shortlist_k: int
+    ) -> Optional[RecommendationResult]:
+        entry = self._cache.get(str(customer_id))
+        if entry is None:
+            cache_event("result", hit=False)
+            return None
+        fp, result = entry
+        if fp != self.fingerprint(profile_text, catalog_version, shortlist_k):
+            self._cache.pop(str(customer_id))
+            cache_event("result", hit=False)
+            return None
+        cache_event("result", hit=True)
+        # Callers may mutate the result (e.g. finalize); hand out a copy
+        return result.model_copy(deep=True)
+
+    def put(
+        self, customer_id: str, profile_text: str, catalog_version: str, shortlist_k: int, result: RecommendationResult
+    ) -> None:
+        fp = self.fingerprint(profile_text, catalog_version, shortlist_k)
+        self._cache.set(str(customer_id), (fp, result.model_copy(deep=True)))
+
+    def invalidate(self, customer_id: Optional[str] = None) -> None:
+        """Drop one customer's entry, or everything when customer_id is None."""
+        if customer_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(str(customer_id))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
@@ -0,0 +1,12 @@
+import pytest
+
+# The smoke run needs the full serving stack (Chroma, LangChain, Flask, pydantic)
+for module in ("chromadb", "langchain_chroma", "flask", "pydantic", "numpy"):
+    pytest.importorskip(module)
+
+from bench.runner import smoke  # noqa: E402
+
+
+def test_documented_bench_commands_run_clean(tmp_path):
+    reports = smoke(str(tmp_path / "bench"))
+    assert set(reports) == {"service/llm", "service/fast", "flask/llm", "flask/fast"}
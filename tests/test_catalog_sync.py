@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+import pytest
+
+pytest.importorskip("chromadb")  # data.catalog_ingestion imports the Chroma store module
+
+from data.catalog_ingestion import sync_catalog  # noqa: E402
+
+
+class StubStore:
+    """Empty catalog that records upserts and revision bumps."""
+
+    def __init__(self):
+        self.upserted = []
+        self.revision = 0
+
+    def get_page(self, offset, limit, where=None, with_embedding=False):
+        return []
+
+    def upsert_embeddings(self, ids, embeddings, metadatas, documents=None):
+        self.upserted.extend(ids)
+
+    def update_metadatas(self, ids, metadatas):
+        pass
+
+    def delete(self, ids):
+        pass
+
+    def bump_revision(self):
+        self.revision += 1
+        return self.revision
+
+
+class SlowEmbeddings:
+    """Counts batches and the most embedding calls running at once."""
+
+    def __init__(self, latency=0.01):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.batches = 0
+
+    def embed(self, texts):
+        with self.lock:
+            self.active += 1
+            self.batches += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.latency)
+        with self.lock:
+            self.active -= 1
+        return [[1.0, 0.0] for _ in texts]
+
+
+def test_sync_embeds_in_bounded_windows(tmp_path, monkeypatch):
+    source = tmp_path / "products.jsonl"
+    with open(source, "w", encoding="utf-8") as f:
+        for i in range(1, 501):
+            f.write(json.dumps({"product_id": str(i), "name": f"p{i}", "price": "1"}) + "\n")
+
+    # Queued batches never exceed 2 x concurrency while the source streams in
+    from data import catalog_ingestion
+    real_wait = catalog_ingestion.wait
+    queued = []
+
+    def _wait(futures, return_when):
+        queued.append(len(futures))
+        return real_wait(futures, return_when=return_when)
+    monkeypatch.setattr(catalog_ingestion, "wait", _wait)
+
+    store, embeddings = StubStore(), SlowEmbeddings()
+    stats = sync_catalog(str(source), store, embeddings, "m", batch_size=10, concurrency=2)
+
+    assert stats["new"] == stats["embedded"] == 500
+    assert len(store.upserted) == 500
+    assert embeddings.batches == 50
+    assert embeddings.max_active <= 2
+    assert max(queued) <= 4
+    assert store.revision == 1
@@ -0,0 +1,66 @@
+import os
+import pytest
+
+for module in ("chromadb", "langchain_chroma", "numpy"):
+    pytest.importorskip(module)
+
+import chromadb  # noqa: E402
+from chromadb.api.shared_system_client import SharedSystemClient  # noqa: E402
+from vectorstores import chroma_store  # noqa: E402
+from vectorstores.chroma_store import ChromaStore  # noqa: E402
+from vectorstores.manifest import publish  # noqa: E402
+
+COLLECTION = "products"
+
+
+def _build(root: str, version: str, n: int) -> str:
+    path = os.path.join(root, "versions", version)
+    client = chromadb.PersistentClient(path=path)
+    client.get_or_create_collection(COLLECTION).add(
+        ids=[str(i) for i in range(n)],
+        embeddings=[[float(i), 1.0] for i in range(n)],
+        metadatas=[{"id": str(i)} for i in range(n)],
+    )
+    client.close()
+    publish(root, version)
+    return path
+
+
+def test_manifest_switch_closes_retired_version_after_last_call(tmp_path):
+    root = str(tmp_path)
+    old_dir = _build(root, "v1", 3)
+    store = ChromaStore(COLLECTION, root, None, manifest_poll_seconds=0)
+    assert len(store.similarity_search_by_vector([1.0, 1.0], k=10)) == 3
+
+    old = store._entered()  # a call still in flight on v1
+    new_dir = _build(root, "v2", 5)
+    assert len(store.similarity_search_by_vector([1.0, 1.0], k=10)) == 5
+    assert store.version.endswith(":v2")
+
+    # v1 stays open for the in-flight call, then its System is stopped
+    assert not old.closed and old_dir in SharedSystemClient._identifier_to_system
+    assert len(old.collection.query(query_embeddings=[[1.0, 1.0]], n_results=10)["ids"][0]) == 3
+    old.exit()
+    assert old.closed
+    assert old_dir not in SharedSystemClient._identifier_to_system
+    assert old_dir not in chroma_store._CLIENTS
+    assert new_dir in chroma_store._CLIENTS
+
+
+def test_in_place_writes_change_version_after_bump(tmp_path):
+    path = _build(str(tmp_path), "v1", 3)
+    reader = ChromaStore(COLLECTION, path, None, revalidate_seconds=0)
+    writer = ChromaStore(COLLECTION, path, None)
+    swaps = []
+    reader.on_swap(lambda: swaps.append(reader.version))
+    before = reader.version
+
+    writer.upsert_embeddings(["9"], [[9.0, 1.0]], [{"id": "9"}])
+    writer.delete(["0"])
+    assert reader.version == before  # rows alone do not identify a write
+
+    assert writer.bump_revision() == 1
+    assert writer.version == reader.version == before + ":r1"
+    assert swaps == [before + ":r1"]
+    assert writer.bump_revision() == 2
+    assert reader.version.endswith(":r2")
@@ -0,0 +1,67 @@
+import asyncio
+import time
+import pytest
+from helpers.deadline import Deadline, DeadlineExceeded
+
+
+def test_from_ms_without_a_positive_budget_is_no_deadline():
+    assert Deadline.from_ms(None) is None
+    assert Deadline.from_ms(0) is None
+    assert Deadline.from_ms(-5) is None
+    assert Deadline.from_ms(250).budget_ms == 250
+
+
+def test_call_returns_within_budget_and_records_timing():
+    deadline = Deadline(1.0)
+    assert deadline.call("lookup", lambda x: x * 2, 21) == 42
+    assert "lookup" in deadline.timings
+    assert deadline.exhausted_by is None
+
+
+def test_call_raises_when_the_stage_outlives_the_budget():
+    deadline = Deadline(0.05)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as exc:
+        deadline.call("llm_generate", time.sleep, 0.5)
+    assert time.monotonic() - started < 0.4
+    assert exc.value.stage == "llm_generate"
+    assert deadline.exhausted_by == "llm_generate"
+    assert deadline.summary()["exhausted_by"] == "llm_generate"
+
+
+def test_no_stage_starts_once_the_budget_is_gone():
+    now = [0.0]
+    deadline = Deadline(1.0, clock=lambda: now[0])
+    now[0] = 2.0
+    ran = []
+    with pytest.raises(DeadlineExceeded):
+        deadline.call("product_search", lambda: ran.append(1))
+    assert ran == []
+    assert deadline.remaining() == 0.0
+
+
+def test_acall_raises_when_time_runs_out():
+    async def main():
+        deadline = Deadline(0.05)
+        assert await deadline.acall("fast", lambda: asyncio.sleep(0, result="ok")) == "ok"
+        with pytest.raises(DeadlineExceeded) as exc:
+            await deadline.acall("slow", lambda: asyncio.sleep(1))
+        return deadline, exc.value
+    deadline, err = asyncio.run(main())
+    assert err.stage == "slow"
+    assert deadline.exhausted_by == "slow"
+
+
+def test_controller_clamps_the_header_budget():
+    pytest.importorskip("flask")
+    from controllers.recommendation_controller import RecommendationController
+    controller = RecommendationController(None, request_deadline_ms=500, request_deadline_max_ms=1000)
+    assert controller._deadline(None).budget_ms == 500
+    assert controller._deadline("200").budget_ms == 200
+    assert controller._deadline("5000").budget_ms == 1000
+    # A client cannot switch the deadline off
+    assert controller._deadline("0").budget_ms == 500
+    assert controller._deadline("-1").budget_ms == 500
+    assert controller._deadline("soon").budget_ms == 500
+    # Only the configured default can
+    assert RecommendationController(None, request_deadline_ms=0)._deadline(None) is None
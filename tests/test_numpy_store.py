@@ -0,0 +1,75 @@
+import multiprocessing
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from vectorstores.manifest import publish  # noqa: E402
+from vectorstores.numpy_store import NumpyStore  # noqa: E402
+
+
+class StubSource:
+    """Minimal exportable store: get_page with embeddings plus a version string."""
+
+    def __init__(self, version: str, n: int = 4):
+        self.version = version
+        self.rows = [
+            {"id": str(i), "page_content": f"product {i}", "metadata": {"id": str(i)}, "embedding": [float(i), 1.0]}
+            for i in range(n)
+        ]
+
+    def get_page(self, offset: int, limit: int, where=None, with_embedding: bool = False):
+        return self.rows[offset:offset + limit]
+
+
+def _ensure(args):
+    version, snapshot_dir = args
+    return NumpyStore.ensure_snapshot(StubSource(version), snapshot_dir)
+
+
+def test_snapshot_rebuilt_only_when_source_version_changes(tmp_path):
+    snapshot_dir = str(tmp_path / "snapshot")
+    assert NumpyStore.ensure_snapshot(StubSource("v1"), snapshot_dir)
+    assert not NumpyStore.ensure_snapshot(StubSource("v1"), snapshot_dir)
+    assert NumpyStore(snapshot_dir).version == "numpy:v1"
+
+    assert NumpyStore.ensure_snapshot(StubSource("v2", n=6), snapshot_dir)
+    store = NumpyStore(snapshot_dir)
+    assert store.version == "numpy:v2"
+    assert len(store.get_page(0, 100)) == 6
+
+
+def test_versioned_snapshot_gets_a_new_manifest_version(tmp_path):
+    root = tmp_path / "snapshot"
+    (root / "versions" / "first").mkdir(parents=True)
+    NumpyStore._export(StubSource("v1"), str(root / "versions" / "first"), 1000)
+    publish(str(root), "first")
+    store = NumpyStore(str(root), manifest_poll_seconds=0)
+
+    assert NumpyStore.ensure_snapshot(StubSource("v2", n=6), str(root))
+    assert store.version != "numpy:first"
+    assert len(store.get_page(0, 100)) == 6
+
+
+def test_concurrent_builders_export_once(tmp_path):
+    snapshot_dir = str(tmp_path / "snapshot")
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        rebuilt = pool.map(_ensure, [("v1", snapshot_dir)] * 4)
+    assert sum(rebuilt) == 1
+
+
+def test_export_is_paged_and_normalized(tmp_path):
+    source = StubSource("v1", n=7)
+    source.rows.append({"id": "x", "page_content": None, "metadata": {}, "embedding": None})
+    snapshot_dir = str(tmp_path / "snapshot")
+    NumpyStore.build_snapshot(source, snapshot_dir, page_size=3)
+    store = NumpyStore(snapshot_dir)
+    assert store._snap.matrix.dtype == np.float32
+    assert store._snap.matrix.shape == (7, 2)
+    assert np.allclose(np.linalg.norm(store._snap.matrix, axis=1), 1.0)
+    assert [r["id"] for r in store.get_page(0, 100)] == [str(i) for i in range(7)]
+
+
+def test_empty_source_exports_an_empty_snapshot(tmp_path):
+    snapshot_dir = str(tmp_path / "snapshot")
+    NumpyStore.build_snapshot(StubSource("v1", n=0), snapshot_dir)
+    assert NumpyStore(snapshot_dir).get_page(0, 10) == []
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+import pytest
+
+pytest.importorskip("pydantic")
+
+from domain.models import CustomerProfile, Product  # noqa: E402
+from helpers.deadline import Deadline  # noqa: E402
+from llm.prompt_renderer import PromptRenderer  # noqa: E402
+from service.recommender_service import RecommenderService  # noqa: E402
+
+PROFILE = CustomerProfile(customer_id=1, profile_text="Customer 1 likes tents")
+SHORTLIST = [Product(id=str(i), name=f"Product {i}", price=1.0, score=0.1 * i) for i in range(1, 6)]
+
+
+class StubProfiles:
+    def get_by_customer_id(self, customer_id):
+        return PROFILE
+
+
+class StubProducts:
+    version = "v1"
+
+    def search_similar(self, text, k=50, vector=None):
+        return list(SHORTLIST)
+
+    async def asearch_similar(self, text, k=50, vector=None):
+        return list(SHORTLIST)
+
+
+class StubLLM:
+    """Counts calls; answers after `latency` with `error` raised or unparseable text."""
+
+    def __init__(self, latency: float, error: Exception = None):
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _answer(self):
+        if self.error is not None:
+            raise self.error
+        return "not json"
+
+    def generate(self, *, prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return self._answer()
+
+    async def agenerate(self, *, prompt, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self._answer()
+
+
+def _service(llm: StubLLM) -> RecommenderService:
+    return RecommenderService(llm=llm, profiles=StubProfiles(), products=StubProducts(), renderer=PromptRenderer())
+
+
+def _concurrent(service: RecommenderService, budgets_ms):
+    results = [None] * len(budgets_ms)
+
+    def _one(i, budget_ms):
+        results[i] = service.get_recommendations("1", deadline=Deadline.from_ms(budget_ms))
+    threads = []
+    for i, budget_ms in enumerate(budgets_ms):
+        threads.append(threading.Thread(target=_one, args=(i, budget_ms)))
+        threads[-1].start()
+        time.sleep(0.005)  # the first thread leads
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_followers_share_llm_error_fallback():
+    llm = StubLLM(latency=0.1, error=RuntimeError("provider down"))
+    results = _concurrent(_service(llm), [2000] * 8)
+    assert llm.calls == 1
+    assert {r.degraded["reason"] for r in results} == {"llm_error"}
+
+
+def test_followers_share_deadline_result_without_extra_budget():
+    llm = StubLLM(latency=0.3)
+    results = _concurrent(_service(llm), [100] * 4)
+    assert llm.calls == 1
+    assert {r.degraded["reason"] for r in results} == {"deadline_exceeded"}
+
+
+def test_followers_with_more_budget_share_one_rerun():
+    llm = StubLLM(latency=0.2)
+    results = _concurrent(_service(llm), [50] + [2000] * 4)
+    assert llm.calls == 2
+    assert results[0].degraded["reason"] == "deadline_exceeded"
+    assert {r.degraded["reason"] for r in results[1:]} == {"llm_invalid_response"}
+
+
+def test_async_followers_share_llm_error_fallback():
+    llm = StubLLM(latency=0.05, error=RuntimeError("provider down"))
+    service = _service(llm)
+
+    async def _main():
+        return await asyncio.gather(*(
+            service.aget_recommendations("1", deadline=Deadline.from_ms(2000)) for _ in range(8)
+        ))
+    results = asyncio.run(_main())
+    assert llm.calls == 1
+    assert {r.degraded["reason"] for r in results} == {"llm_error"}
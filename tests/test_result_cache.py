@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("pydantic")
+
+from domain.models import Recommendation, RecommendationResult  # noqa: E402
+from service.result_cache import RecommendationResultCache  # noqa: E402
+
+
+def _result(n: int) -> RecommendationResult:
+    return RecommendationResult(customer_id=1, recommendations=[
+        Recommendation(product_id=i, product_name=f"p{i}", reason="r") for i in range(n)
+    ])
+
+
+def test_hit_requires_the_same_profile_catalog_and_shortlist_size():
+    cache = RecommendationResultCache()
+    cache.put("1", "likes tents", "v1", 50, _result(3))
+    assert len(cache.get("1", "likes tents", "v1", 50).recommendations) == 3
+    assert cache.get("1", "likes tents", "v1", 20) is None
+    cache.put("1", "likes tents", "v1", 50, _result(3))
+    assert cache.get("1", "likes lamps", "v1", 50) is None
+    cache.put("1", "likes tents", "v1", 50, _result(3))
+    assert cache.get("1", "likes tents", "v2", 50) is None
+
+
+def test_hits_are_copies():
+    cache = RecommendationResultCache()
+    cache.put("1", "t", "v1", 50, _result(2))
+    cache.get("1", "t", "v1", 50).recommendations.clear()
+    assert len(cache.get("1", "t", "v1", 50).recommendations) == 2
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+from llm.clients.routing_chat import RoutingChat
+
+
+class RateLimitError(Exception):
+    """Named like the SDKs' 429 error, which is what is_rate_limit_error looks for."""
+
+
+class StubLLM:
+    """Local LLMClient: fixed latency, optional error, counts calls."""
+
+    def __init__(self, answer: str, latency: float = 0.0, error: Exception = None):
+        self.answer = answer
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+
+    def generate(self, *, prompt: str, **kwargs) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return self.answer
+
+    async def agenerate(self, *, prompt: str, **kwargs) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return self.answer
+
+    def stream(self, *, prompt: str, **kwargs):
+        yield self.generate(prompt=prompt)
+
+
+def _router(primary: StubLLM, secondary: StubLLM, **kwargs) -> RoutingChat:
+    kwargs.setdefault("hedge_default_seconds", 0.05)
+    return RoutingChat([("A", primary), ("B", secondary)], **kwargs)
+
+
+def test_fails_over_on_error():
+    a, b = StubLLM("a", error=RuntimeError("boom")), StubLLM("b")
+    router = _router(a, b, hedge_default_seconds=5.0)
+    assert router.generate(prompt="p") == "b"
+    assert (a.calls, b.calls) == (1, 1)
+    assert router.stats["A"].error_rate == 1.0
+
+
+def test_rate_limit_puts_provider_in_cooldown():
+    a, b = StubLLM("a", error=RateLimitError("429")), StubLLM("b")
+    router = _router(a, b, hedge_default_seconds=5.0, rate_limit_cooldown_seconds=60)
+    assert router.generate(prompt="p") == "b"
+    assert [name for name, _ in router.ordered()] == ["B", "A"]
+    assert router.generate(prompt="p") == "b"
+    assert a.calls == 1  # not retried while cooling down
+
+
+def test_hedges_slow_primary():
+    a, b = StubLLM("a", latency=0.5), StubLLM("b", latency=0.01)
+    router = _router(a, b)
+    start = time.monotonic()
+    assert router.generate(prompt="p") == "b"
+    assert time.monotonic() - start < 0.3
+    assert (a.calls, b.calls) == (1, 1)
+
+
+def test_queue_time_does_not_trigger_hedge():
+    a, b = StubLLM("a", latency=0.02), StubLLM("b")
+    router = _router(a, b, hedge_default_seconds=0.1, max_workers=1)
+    release = threading.Event()
+    router._pool.submit(release.wait)  # the only worker is busy for longer than the hedge delay
+    threading.Timer(0.2, release.set).start()
+    assert router.generate(prompt="p") == "a"
+    assert b.calls == 0
+
+
+def test_async_hedge_cancels_loser():
+    a, b = StubLLM("a", latency=0.5), StubLLM("b", latency=0.01)
+    router = _router(a, b)
+
+    async def run():
+        start = time.monotonic()
+        out = await router.agenerate(prompt="p")
+        return out, time.monotonic() - start
+
+    out, elapsed = asyncio.run(run())
+    assert out == "b" and elapsed < 0.3
+    assert router.stats["A"].error_rate == 0.0  # a cancelled loser is not a provider failure
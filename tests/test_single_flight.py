@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+import pytest
+from helpers.single_flight import AsyncSingleFlight, SingleFlight, WaitTimeout
+
+
+def _start(fn, n):
+    """Run fn in n threads, the first one slightly ahead so it leads."""
+    results, errors = [None] * n, [None] * n
+
+    def _one(i):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            errors[i] = e
+    threads = []
+    for i in range(n):
+        threads.append(threading.Thread(target=_one, args=(i,)))
+        threads[-1].start()
+        time.sleep(0.01)
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.1)
+        return "answer"
+    results, errors = _start(lambda: flight.do("k", work), 5)
+    assert len(calls) == 1
+    assert errors == [None] * 5
+    assert results[0] == ("answer", False)
+    assert results[1:] == [("answer", True)] * 4
+    assert flight.in_flight() == 0
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    calls = []
+
+    def work(key):
+        calls.append(key)
+        time.sleep(0.05)
+        return key
+    _start(lambda: flight.do(threading.current_thread().name, lambda: work(threading.current_thread().name)), 3)
+    assert len(calls) == 3
+
+
+def test_leader_exception_reaches_followers():
+    flight = SingleFlight()
+
+    def work():
+        time.sleep(0.1)
+        raise ValueError("boom")
+    _, errors = _start(lambda: flight.do("k", work), 3)
+    assert all(isinstance(e, ValueError) and str(e) == "boom" for e in errors)
+    # The failed call is not cached: the next caller runs fn again
+    assert flight.do("k", lambda: "ok") == ("ok", False)
+
+
+def test_follower_stops_waiting_after_its_timeout():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("k", lambda: release.wait(2)))
+    leader.start()
+    time.sleep(0.02)
+    started = time.monotonic()
+    with pytest.raises(WaitTimeout):
+        flight.do("k", lambda: "never", timeout=0.05)
+    assert time.monotonic() - started < 0.5
+    release.set()
+    leader.join()
+
+
+def test_async_followers_share_and_time_out():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "answer"
+
+    async def main():
+        shared = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+        leader = asyncio.ensure_future(flight.do("slow", lambda: asyncio.sleep(0.3, result="late")))
+        await asyncio.sleep(0)
+        with pytest.raises(WaitTimeout):
+            await flight.do("slow", work, timeout=0.05)
+        return shared, await leader
+    shared, late = asyncio.run(main())
+    assert len(calls) == 1
+    assert sorted(s for _, s in shared) == [False, True, True, True, True]
+    assert {r for r, _ in shared} == {"answer"}
+    assert late == ("late", False)
+
+
+def test_async_leader_exception_and_cancellation():
+    flight = AsyncSingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise ValueError("boom")
+
+    async def main():
+        outcomes = await asyncio.gather(*(flight.do("k", failing) for _ in range(3)), return_exceptions=True)
+        # Cancelling the caller that started the work does not fail the ones that joined it
+        leader = asyncio.ensure_future(flight.do("c", lambda: asyncio.sleep(0.1, result="done")))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("c", failing))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return outcomes, await follower
+    outcomes, joined = asyncio.run(main())
+    assert all(isinstance(e, ValueError) for e in outcomes)
+    assert joined == ("done", True)
@@ -0,0 +1,82 @@
+import json
+import random
+import pytest
+
+pytest.importorskip("pydantic")
+
+from llm.parsers import RecommendationStreamParser  # noqa: E402
+
+ITEMS = [
+    {"product_id": 1, "product_name": "Tent", "reason": "plain"},
+    {"product_id": 2, "product_name": 'Mug "Camp"', "reason": "has {braces} and } a stray close"},
+    {"product_id": 3, "product_name": "Lamp\\Light", "reason": 'escaped \\" quote then {"not": "an item"}'},
+]
+DOCUMENT = json.dumps({"customer_id": 7, "recommendations": ITEMS})
+
+
+def _feed(parser, chunks):
+    emitted = []
+    for chunk in chunks:
+        emitted.extend(parser.feed(chunk))
+    return emitted
+
+
+def _ids(items):
+    return [r.product_id for r in items]
+
+
+def test_whole_document_in_one_chunk():
+    parser = RecommendationStreamParser()
+    items = _feed(parser, [DOCUMENT])
+    assert [r.model_dump() for r in items] == ITEMS
+    assert parser.done
+
+
+def test_character_by_character():
+    parser = RecommendationStreamParser()
+    assert _ids(_feed(parser, list(DOCUMENT))) == [1, 2, 3]
+    assert parser.done
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_splits_emit_each_item_once(seed):
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(DOCUMENT)), 12))
+    chunks = [DOCUMENT[a:b] for a, b in zip([0] + cuts, cuts + [len(DOCUMENT)])]
+    parser = RecommendationStreamParser()
+    items = _feed(parser, chunks)
+    assert [r.model_dump() for r in items] == ITEMS
+
+
+def test_items_are_emitted_as_soon_as_they_close():
+    first_end = DOCUMENT.index("}") + 1
+    parser = RecommendationStreamParser()
+    assert parser.feed(DOCUMENT[:first_end - 1]) == []
+    assert _ids(parser.feed(DOCUMENT[first_end - 1:first_end])) == [1]
+    assert parser.feed(DOCUMENT[first_end:first_end + 3]) == []
+    assert not parser.done
+
+
+def test_split_key_and_escape_sequences():
+    # Cut inside the "recommendations" key, inside a \" escape and inside a \\ escape
+    key_cut = DOCUMENT.index("recommendations") + 5
+    quote_cut = DOCUMENT.index('\\"') + 1
+    backslash_cut = DOCUMENT.index("\\\\") + 1
+    cuts = sorted({key_cut, quote_cut, backslash_cut})
+    chunks = [DOCUMENT[a:b] for a, b in zip([0] + cuts, cuts + [len(DOCUMENT)])]
+    assert [r.model_dump() for r in _feed(RecommendationStreamParser(), chunks)] == ITEMS
+
+
+def test_unterminated_trailing_object_is_not_emitted():
+    truncated = DOCUMENT[:DOCUMENT.rindex("}", 0, len(DOCUMENT) - 2)]
+    parser = RecommendationStreamParser()
+    assert _ids(_feed(parser, [truncated[:40], truncated[40:]])) == [1, 2]
+    assert not parser.done
+
+
+def test_invalid_items_are_skipped_and_nothing_after_the_array():
+    doc = json.dumps({"recommendations": [{"product_id": "x"}, ITEMS[0]], "extra": [{"product_id": 9}]})
+    parser = RecommendationStreamParser()
+    assert _ids(_feed(parser, [doc[:20], doc[20:]])) == [1]
+    assert parser.done
+    assert parser.feed('{"product_id": 4, "product_name": "n", "reason": "r"}') == []
@@ -1,37 +1,457 @@
-from typing import Optional, Any, List, Callable
-from langchain_chroma import Chroma
-from langchain_core.documents import Document
+import logging
+import os
+import threading
+import time
+from typing import Optional, Any, List, Callable, Dict, Tuple
+import numpy as np
+import chromadb
+from chromadb.api import ClientAPI
+from chromadb.api.models.Collection import Collection
 from chromadb.errors import NotFoundError
+from langchain_chroma import Chroma
+from langchain_chroma.vectorstores import maximal_marginal_relevance
 from vectorstores.interfaces import VectorStore
+from vectorstores.manifest import ManifestWatcher
+from infra.metrics import stage_timer
+
+log = logging.getLogger(__name__)
+
+# One chromadb client per persist directory per process; shared by every
+# ChromaStore handle pointing at that directory and closed with the last one.
+_CLIENTS: Dict[str, "_SharedClient"] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+# Collection metadata key counting in-place writes (see ChromaStore.bump_revision)
+REVISION_KEY = "revision"
+
+
+def _dir_generation(persist_dir: str) -> Tuple[int, int]:
+    """
+    Identity of the on-disk store: inode of the directory and of its sqlite file.
+    Both change when a DAG swaps in a freshly built directory (rename/replace),
+    but not on ordinary reads/writes.
+    """
+    try:
+        dir_ino = os.stat(persist_dir).st_ino
+    except FileNotFoundError:
+        return (0, 0)
+    try:
+        db_ino = os.stat(os.path.join(persist_dir, "chroma.sqlite3")).st_ino
+    except FileNotFoundError:
+        db_ino = 0
+    return (dir_ino, db_ino)
+
+
+class _SharedClient:
+    """A chromadb client plus the number of open handles using it."""
+
+    def __init__(self, persist_dir: str, client: ClientAPI):
+        self.persist_dir = persist_dir
+        self.client = client
+        self.handles = 0
+        # Set when the directory was replaced in place and a newer client took over the path
+        self.detached_system: Optional[Any] = None
+
+
+def _detach_system(persist_dir: str) -> Optional[Any]:
+    """
+    Take the System chromadb caches for `persist_dir` out of its per-path
+    registry, so the next PersistentClient opens the swapped-in sqlite file
+    instead of the old inode. Returns it so it can be stopped once unused.
+    chromadb has no public API for this; it relies on SharedSystemClient's
+    class-level registries (chromadb 1.x) and is only needed for in-place
+    directory swaps, not for manifest versions (each has its own path).
+    """
+    from chromadb.api.shared_system_client import SharedSystemClient
+    with SharedSystemClient._refcount_lock:
+        SharedSystemClient._identifier_to_refcount.pop(persist_dir, None)
+    return SharedSystemClient._identifier_to_system.pop(persist_dir, None)
+
+
+def _acquire_client(persist_dir: str, fresh: bool = False) -> _SharedClient:
+    with _CLIENTS_LOCK:
+        shared = _CLIENTS.get(persist_dir)
+        if shared is not None and not fresh:
+            shared.handles += 1
+            return shared
+        if shared is not None:
+            # Handles on the old inode keep their client; it is stopped with the last of them
+            shared.detached_system = _detach_system(persist_dir)
+            if shared.handles == 0:
+                _close_client(shared)
+        shared = _SharedClient(persist_dir, chromadb.PersistentClient(path=persist_dir))
+        shared.handles = 1
+        _CLIENTS[persist_dir] = shared
+        return shared
+
+
+def _release_client(shared: _SharedClient) -> None:
+    """Drop one handle's reference; the last one closes the client and stops its System."""
+    with _CLIENTS_LOCK:
+        shared.handles -= 1
+        if shared.handles > 0:
+            return
+        if _CLIENTS.get(shared.persist_dir) is shared:
+            del _CLIENTS[shared.persist_dir]
+        _close_client(shared)
+
+
+def _close_client(shared: _SharedClient) -> None:
+    try:
+        if shared.detached_system is not None:
+            # close() would release the refcount of the newer client now registered for this path
+            shared.detached_system.stop()
+        else:
+            shared.client.close()
+    except Exception:
+        log.exception({"event": "store_client_close_failed", "persist_dir": shared.persist_dir})
+    log.info({"event": "store_client_closed", "persist_dir": shared.persist_dir})
+
+
+def _revision(collection: Collection) -> int:
+    return int((collection.metadata or {}).get(REVISION_KEY) or 0)
+
+
+def _warm_up(collection: Collection) -> None:
+    """
+    Run one real nearest-neighbour query (with a stored vector) so the vector
+    index is loaded before the handle takes traffic; count() only reads sqlite.
+    """
+    sample = collection.get(limit=1, include=["embeddings"])
+    embeddings = sample.get("embeddings")
+    if embeddings is None or len(embeddings) == 0:
+        return
+    collection.query(query_embeddings=[embeddings[0]], n_results=1, include=[])
+
+
+class _Handle:
+    """
+    Resolved client/collection pair plus the identity it was resolved against.
+    Calls run between enter() and exit(); a superseded handle releases its
+    client once the last call in flight on it returns.
+    """
+
+    def __init__(
+        self, shared: _SharedClient, store: Chroma, persist_dir: str, generation: Tuple[int, int],
+        manifest_version: Optional[str] = None,
+    ):
+        self.shared = shared
+        self.client = shared.client
+        self.store = store
+        self.collection: Collection = store._collection  # underlying chromadb Collection
+        self.collection_id = str(self.collection.id)
+        self.revision = _revision(self.collection)
+        self.persist_dir = persist_dir
+        self.generation = generation
+        self.manifest_version = manifest_version
+        self.validated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._superseded = False
+        self.closed = False
+
+    def enter(self) -> bool:
+        """Register a call; False when the handle was already closed (use the current one)."""
+        with self._lock:
+            if self.closed:
+                return False
+            self._calls += 1
+            return True
+
+    def exit(self) -> None:
+        with self._lock:
+            self._calls -= 1
+            close = self._close_if_idle()
+        if close:
+            _release_client(self.shared)
+
+    def supersede(self) -> None:
+        with self._lock:
+            self._superseded = True
+            close = self._close_if_idle()
+        if close:
+            _release_client(self.shared)
+
+    def _close_if_idle(self) -> bool:
+        if not self._superseded or self._calls or self.closed:
+            return False
+        self.closed = True
+        return True
+
+
+def _rows(res: dict, with_scores: bool = False) -> List[dict]:
+    """Flatten a chromadb query/get result into our row dicts (no Document wrapping)."""
+    ids = res.get("ids") or []
+    # query() nests one list per query embedding; get() does not
+    nested = bool(ids) and isinstance(ids[0], list)
+    pick = (lambda key: (res.get(key) or [[]])[0]) if nested else (lambda key: res.get(key) or [])
+    ids = pick("ids")
+    docs = pick("documents")
+    metas = pick("metadatas")
+    dists = pick("distances") if with_scores else []
+    out = []
+    for i, _id in enumerate(ids):
+        md = (metas[i] if i < len(metas) else None) or {}
+        row = {
+            "id": md.get("id") or md.get("product_id"),
+            "page_content": docs[i] if i < len(docs) else None,
+            "metadata": md,
+        }
+        if with_scores and i < len(dists):
+            row["score"] = float(dists[i])
+        out.append(row)
+    return out
+
+
+def _get_rows(res: dict, with_embedding: bool = False) -> List[dict]:
+    """Rows for a collection.get() result, keyed by chroma id, optionally with the stored vector."""
+    if not res or not res.get("ids"):
+        return []
+    rows = _rows(res)
+    embeddings = res.get("embeddings") if with_embedding else None
+    for i, row in enumerate(rows):
+        row["id"] = res["ids"][i]
+        if with_embedding:
+            row["embedding"] = [float(x) for x in embeddings[i]] if embeddings is not None and len(embeddings) > i else None
+    return rows
+
 
 class ChromaStore(VectorStore):
     """
-    Stateless, resilient Chroma wrapper:
-    - Resolves a fresh Chroma vectorstore per call (cheap).
-    - Retries once on NotFoundError (collection UUID changed after DAG swap).
+    Long-lived, resilient Chroma wrapper:
+    - Keeps one shared client/collection handle per process (thread-safe).
+    - Rebuilds the handle only when the underlying store was actually swapped:
+      the persist-dir generation changed (checked on every call, one stat) or the
+      collection UUID changed (checked every `revalidate_seconds` and on NotFoundError).
+    - Reads go straight to the chromadb collection; LangChain is only used for writes.
+    - In-place writers call `bump_revision`; the revision is checked with the
+      collection UUID and is part of `version`.
+    - Versioned mode: when `persist_dir` holds a MANIFEST.json (vectorstores.manifest),
+      the active version directory is served. A new manifest version is opened and
+      warmed by one thread while the others keep serving the old handle, then the
+      handle reference is swapped; no request waits on or fails because of a rebuild.
     """
 
-    def __init__(self, collection_name: str, persist_dir: str, embedding_lc):
+    def __init__(
+        self, collection_name: str, persist_dir: str, embedding_lc, revalidate_seconds: float = 5.0,
+        manifest_poll_seconds: float = 1.0,
+    ):
         self.collection_name = collection_name
         self.persist_dir = persist_dir
         self.embedding_lc = embedding_lc
+        self.revalidate_seconds = revalidate_seconds
+        self._lock = threading.Lock()
+        self._handle: Optional[_Handle] = None
+        self._swap_listeners: List[Callable[[], None]] = []
+        self._manifest = ManifestWatcher(persist_dir, poll_seconds=manifest_poll_seconds)
+        self._failed_version: Optional[Tuple[str, float]] = None  # (version, monotonic time) of a failed switch
 
-    def _new_store(self) -> Chroma:
-        return Chroma(
-            collection_name=self.collection_name,
-            persist_directory=self.persist_dir,
-            embedding_function=self.embedding_lc,
-        )
+    @property
+    def version(self) -> str:
+        """
+        Identity of the collection currently served: UUID + manifest version, or
+        UUID + persist-dir generation for an unversioned dir, plus the revision
+        once in-place writes bumped it. Changes on every swap and bump, so caches
+        keyed on it never mix results across store versions.
+        """
+        h = self._current()
+        if h.manifest_version is not None:
+            version = f"{h.collection_id}:{h.manifest_version}"
+        else:
+            version = f"{h.collection_id}:{h.generation[0]}-{h.generation[1]}"
+        return f"{version}:r{h.revision}" if h.revision else version
 
-    def _with_store(self, fn: Callable[[Chroma], Any]) -> Any:
-        # First attempt
-        store = self._new_store()
+    def bump_revision(self) -> int:
+        """
+        Record an in-place write (sync, enrich, build-base) in the collection
+        metadata and return the new revision. This process switches at once;
+        serving processes pick it up within `revalidate_seconds` and fire their
+        swap listeners.
+        """
+        def _run(h: _Handle) -> int:
+            current = h.client.get_collection(self.collection_name)
+            # modify() replaces the metadata; the hnsw:* keys are creation-only settings
+            md = {k: v for k, v in (current.metadata or {}).items() if not k.startswith("hnsw:")}
+            md[REVISION_KEY] = _revision(current) + 1
+            current.modify(metadata=md)
+            return md[REVISION_KEY]
+        revision = self._with_handle(_run)
+        self._current(force=True)
+        log.info({"event": "store_revision_bumped", "collection": self.collection_name, "revision": revision})
+        return revision
+
+    def on_swap(self, callback: Callable[[], None]) -> None:
+        """Register a callback fired after the handle is rebuilt for a swapped store."""
+        self._swap_listeners.append(callback)
+
+    def close(self) -> None:
+        """Release this store's client once its in-flight calls return (reopened on next use)."""
+        with self._lock:
+            handle, self._handle = self._handle, None
+        if handle is not None:
+            handle.supersede()
+
+    def _resolve(self) -> Tuple[str, Optional[str]]:
+        """(directory to serve, manifest version or None when unversioned)."""
+        manifest = self._manifest.current()
+        if not manifest:
+            return self.persist_dir, None
+        return os.path.join(self.persist_dir, manifest["path"]), manifest["version"]
+
+    def _open(self, persist_dir: str, manifest_version: Optional[str] = None, fresh_client: bool = False) -> _Handle:
+        generation = _dir_generation(persist_dir)
+        shared = _acquire_client(persist_dir, fresh=fresh_client)
+        try:
+            store = Chroma(
+                client=shared.client,
+                collection_name=self.collection_name,
+                embedding_function=self.embedding_lc,
+            )
+            return _Handle(shared, store, persist_dir, generation, manifest_version)
+        except BaseException:
+            _release_client(shared)
+            raise
+
+    def _is_stale(self, handle: _Handle) -> bool:
+        if handle.closed:
+            return True
+        _, manifest_version = self._resolve()
+        if manifest_version != handle.manifest_version:
+            failed = self._failed_version
+            # A version that failed to open is retried every revalidate_seconds, not per request
+            return failed is None or failed[0] != manifest_version or \
+                time.monotonic() - failed[1] >= self.revalidate_seconds
+        if _dir_generation(handle.persist_dir) != handle.generation:
+            return True
+        if time.monotonic() - handle.validated_at < self.revalidate_seconds:
+            return False
+        try:
+            current = handle.client.get_collection(self.collection_name)
+        except (NotFoundError, ValueError):
+            return True
+        if str(current.id) != handle.collection_id or _revision(current) != handle.revision:
+            return True
+        handle.validated_at = time.monotonic()
+        return False
+
+    def _current(self, force: bool = False) -> _Handle:
+        handle = self._handle
+        if handle is not None and not force and not self._is_stale(handle):
+            return handle
+        # The old version stays readable during a manifest switch: if another
+        # thread is already opening the new one, keep serving the current handle
+        background = handle is not None and not force and handle.manifest_version is not None
+        if not self._lock.acquire(blocking=not background):
+            return handle
+        try:
+            # Another thread may have rebuilt while we waited
+            if self._handle is not None and self._handle is not handle:
+                return self._handle
+            persist_dir, manifest_version = self._resolve()
+            swapped_dir = (
+                handle is not None and handle.persist_dir == persist_dir
+                and _dir_generation(persist_dir) != handle.generation
+            )
+            new_handle = None
+            try:
+                new_handle = self._open(persist_dir, manifest_version, fresh_client=swapped_dir)
+                if handle is not None:
+                    _warm_up(new_handle.collection)
+            except Exception:
+                if new_handle is not None:
+                    new_handle.supersede()
+                if not background:
+                    raise
+                self._failed_version = (manifest_version, time.monotonic())
+                log.exception({"event": "store_switch_failed", "collection": self.collection_name,
+                               "version": manifest_version, "serving": handle.manifest_version})
+                return handle
+            self._handle = new_handle
+            self._failed_version = None
+        finally:
+            self._lock.release()
+        if handle is not None:
+            if handle.persist_dir != new_handle.persist_dir:
+                log.info({"event": "store_switched", "collection": self.collection_name, "version": manifest_version})
+            handle.supersede()
+            for cb in self._swap_listeners:
+                cb()
+        return new_handle
+
+    def _entered(self, force: bool = False) -> _Handle:
+        handle = self._current(force=force)
+        # A handle closes only after being superseded, so the retry sees its successor
+        while not handle.enter():
+            handle = self._current()
+        return handle
+
+    def _with_handle(self, fn: Callable[[_Handle], Any]) -> Any:
+        handle = self._entered()
         try:
-            return fn(store)
+            return fn(handle)
         except NotFoundError:
-            # Re-open once; DAG likely flipped the underlying store
-            store = self._new_store()
-            return fn(store)
+            pass
+        finally:
+            handle.exit()
+        # Collection vanished under us (DAG swap between checks); rebuild once
+        handle = self._entered(force=True)
+        try:
+            return fn(handle)
+        finally:
+            handle.exit()
+
+    def _with_store(self, fn: Callable[[Chroma], Any]) -> Any:
+        return self._with_handle(lambda h: fn(h.store))
+
+    def _embed_query(self, query: str) -> List[float]:
+        with stage_timer("embedding"):
+            return self.embedding_lc.embed_query(query)
+
+    def query_by_vector(
+        self,
+        vector: List[float],
+        k: int = 5,
+        metadata_filter: Optional[dict] = None,
+        include_embeddings: bool = False,
+    ) -> dict:
+        """Raw chromadb query (no LangChain Document wrapping)."""
+        include = ["metadatas", "documents", "distances"]
+        if include_embeddings:
+            include.append("embeddings")
+
+        def _run(h: _Handle):
+            return h.collection.query(
+                query_embeddings=[vector], n_results=k, where=metadata_filter, include=include
+            )
+        return self._with_handle(_run)
+
+    def update_metadatas(self, ids: List[str], metadatas: List[dict]) -> None:
+        """Overwrite metadata of existing rows by chroma id (documents/embeddings untouched)."""
+        def _run(h: _Handle):
+            h.collection.update(ids=ids, metadatas=metadatas)
+        return self._with_handle(_run)
+
+    def upsert_embeddings(
+        self, ids: List[str], embeddings: List[List[float]], metadatas: List[dict], documents: Optional[List[str]] = None
+    ) -> None:
+        """Write rows with precomputed vectors (no embedding call)."""
+        def _run(h: _Handle):
+            h.collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+        return self._with_handle(_run)
+
+    def delete(self, ids: List[str]) -> None:
+        if not ids:
+            return
+
+        def _run(h: _Handle):
+            h.collection.delete(ids=ids)
+        return self._with_handle(_run)
+
+    def list_ids(self, where: Optional[dict] = None) -> List[str]:
+        def _run(h: _Handle):
+            return h.collection.get(where=where, include=[])
+        res = self._with_handle(_run)
+        return list(res.get("ids") or []) if res else []
 
     # ---- VectorStore Protocol methods ----
 
@@ -41,64 +461,70 @@ class ChromaStore(VectorStore):
         return self._with_store(_run)
 
     def similarity_search(self, query: str, k: int = 5, metadata_filter: Optional[dict] = None) -> List[dict]:
-        def _run(store: Chroma):
-            docs: List[Document] = store.similarity_search(query, k=k, filter=metadata_filter)
-            return [
-                {"id": d.metadata.get("id") or d.metadata.get("product_id"), "page_content": d.page_content, "metadata": d.metadata}
-                for d in docs
-            ]
-        return self._with_store(_run)
+        return self.similarity_search_by_vector(self._embed_query(query), k=k, metadata_filter=metadata_filter)
 
     def similarity_search_by_vector(self, vector: List[float], k: int = 5, metadata_filter: Optional[dict] = None) -> List[dict]:
-        def _run(store: Chroma):
-            docs: List[Document] = store.similarity_search_by_vector(embedding=vector, k=k, filter=metadata_filter)
-            return [
-                {"id": d.metadata.get("id") or d.metadata.get("product_id"), "page_content": d.page_content, "metadata": d.metadata}
-                for d in docs
-            ]
-        return self._with_store(_run)
+        return _rows(self.query_by_vector(vector, k=k, metadata_filter=metadata_filter))
 
     def similarity_search_with_score(self, query: str, k: int = 1, filter: Optional[dict] = None) -> List[dict]:
-        def _run(store: Chroma):
-            pairs = store.similarity_search_with_score(query, k=k, filter=filter)
-            out = []
-            for d, score in pairs:
-                out.append({
-                    "id": d.metadata.get("id") or d.metadata.get("product_id"),
-                    "page_content": d.page_content,
-                    "metadata": d.metadata,
-                    "score": float(score),
-                })
-            return out
-        return self._with_store(_run)
+        res = self.query_by_vector(self._embed_query(query), k=k, metadata_filter=filter)
+        return _rows(res, with_scores=True)
 
     def max_mmr_search(
         self, query: str, k: int = 50, fetch_k: int = 105, lambda_mult: float = 0.2, metadata_filter: Optional[dict] = None
     ) -> List[dict]:
-        def _run(store: Chroma):
-            docs: List[Document] = store.max_marginal_relevance_search(
-                query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, filter=metadata_filter
-            )
-            return [
-                {"id": d.metadata.get("id") or d.metadata.get("product_id"), "page_content": d.page_content, "metadata": d.metadata}
-                for d in docs
-            ]
-        return self._with_store(_run)
+        return self.max_mmr_search_by_vector(
+            self._embed_query(query), k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, metadata_filter=metadata_filter
+        )
+
+    def max_mmr_search_by_vector(
+        self, vector: List[float], k: int = 50, fetch_k: int = 105, lambda_mult: float = 0.2, metadata_filter: Optional[dict] = None
+    ) -> List[dict]:
+        res = self.query_by_vector(vector, k=fetch_k, metadata_filter=metadata_filter, include_embeddings=True)
+        candidates = _rows(res, with_scores=True)
+        embeddings = (res.get("embeddings") or [[]])[0]
+        if not candidates:
+            return []
+        selected = set(maximal_marginal_relevance(
+            np.array(vector, dtype=np.float32), embeddings, k=k, lambda_mult=lambda_mult
+        ))
+        # Same ordering as LangChain's implementation: candidate (distance) order
+        return [r for i, r in enumerate(candidates) if i in selected]
+
+    def get_many(self, where: dict, with_embedding: bool = False) -> List[dict]:
+        """
+        Bulk metadata fetch in one collection.get (e.g. {"customer_id": {"$in": [...]}}).
+        Rows carry the chroma id and, with `with_embedding`, the stored vector.
+        """
+        include = ['metadatas', 'documents']
+        if with_embedding:
+            include.append('embeddings')
 
-    def get_one(self, where: dict) -> Optional[dict]:
+        def _run(h: _Handle):
+            return h.collection.get(where=where, include=include)
+        return _get_rows(self._with_handle(_run), with_embedding)
+
+    def get_page(self, offset: int, limit: int, where: Optional[dict] = None, with_embedding: bool = False) -> List[dict]:
+        """One page of the collection (stable chroma order) for offline scans."""
+        include = ['metadatas', 'documents']
+        if with_embedding:
+            include.append('embeddings')
+
+        def _run(h: _Handle):
+            return h.collection.get(where=where, offset=offset, limit=limit, include=include)
+        return _get_rows(self._with_handle(_run), with_embedding)
+
+    def get_one(self, where: dict, with_embedding: bool = False) -> Optional[dict]:
         """
         Direct metadata fetch via underlying Chroma collection
-        (avoids embeddings). We go through the wrapped collection.
+        (no embedding call). With `with_embedding`, the stored vector is
+        returned under "embedding" so callers can search with it directly.
         """
-        def _run(store: Chroma):
-            col = store._collection  # underlying chromadb Collection
-            res = col.get(where=where, include=['metadatas', 'documents'])
-            if not res or not res.get("ids"):
-                return None
-            i = 0
-            return {
-                "id": res["ids"][i],
-                "page_content": (res.get("documents") or [None])[i],
-                "metadata": (res.get("metadatas") or [{}])[i],
-            }
-        return self._with_store(_run)
+        include = ['metadatas', 'documents']
+        if with_embedding:
+            include.append('embeddings')
+
+        def _run(h: _Handle):
+            return h.collection.get(where=where, limit=1, include=include)
+        rows = _get_rows(self._with_handle(_run), with_embedding)
+        return rows[0] if rows else None
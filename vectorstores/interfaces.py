@@ -1,6 +1,10 @@
 from typing import Protocol, Any, Optional
 
 class VectorStore(Protocol):
+    @property
+    def version(self) -> str:
+        ...
+
     def add_texts(self, texts: list[str], metadatas: list[dict], ids: list[str]) -> None:
         ...
 
@@ -18,5 +22,16 @@ class VectorStore(Protocol):
     ) -> list[dict[str, Any]]:
         ... 
 
-    def get_one(self, where: dict) -> Optional[dict]: 
+    def max_mmr_search_by_vector(
+        self, vector: list[float], k: int = 50, fetch_k: int = 105, lambda_mult: float = 0.2, metadata_filter: Optional[dict] = None
+    ) -> list[dict[str, Any]]:
+        ...
+
+    def get_one(self, where: dict, with_embedding: bool = False) -> Optional[dict]: 
+        ...
+
+    def get_many(self, where: dict, with_embedding: bool = False) -> list[dict]:
+        ...
+
+    def get_page(self, offset: int, limit: int, where: Optional[dict] = None, with_embedding: bool = False) -> list[dict]:
         ...
\ No newline at end of file
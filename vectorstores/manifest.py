@@ -0,0 +1,180 @@
+"""
+Versioned store directories named by a manifest.
+
+    <root>/MANIFEST.json          {"version": "...", "path": "versions/<version>", "created_at": ...}
+    <root>/versions/<version>/    one complete store (Chroma persist dir or NumPy snapshot)
+
+Builds write a fresh version directory and only then replace the manifest
+(write temp file, fsync, os.replace), so readers see either the old or the new
+version, never a half-built one. Serving processes poll the manifest with a
+stat() and switch their handles when the version changes.
+"""
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+MANIFEST_FILE = "MANIFEST.json"
+VERSIONS_DIR = "versions"
+
+
+def manifest_path(root: str) -> str:
+    return os.path.join(root, MANIFEST_FILE)
+
+
+def has_manifest(root: str) -> bool:
+    return os.path.isfile(manifest_path(root))
+
+
+def read_manifest(root: str) -> Optional[dict]:
+    try:
+        with open(manifest_path(root), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def active_dir(root: str) -> str:
+    """Directory of the active version (the root itself when there is no manifest)."""
+    manifest = read_manifest(root)
+    return os.path.join(root, manifest["path"]) if manifest else root
+
+
+def new_version() -> str:
+    return time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + "-" + uuid.uuid4().hex[:8]
+
+
+def publish(root: str, version: str, **extra) -> dict:
+    """Atomically point the manifest at versions/<version> (which must be complete)."""
+    rel = os.path.join(VERSIONS_DIR, version)
+    if not os.path.isdir(os.path.join(root, rel)):
+        raise FileNotFoundError(f"version directory {rel!r} does not exist under {root!r}")
+    manifest = {"version": version, "path": rel, "created_at": time.time(), **extra}
+    tmp = manifest_path(root) + f".tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, manifest_path(root))
+    log.info({"event": "store_version_published", "root": root, "version": version})
+    return manifest
+
+
+def prune(root: str, keep: int = 2) -> int:
+    """
+    Delete old version directories, keeping the active one and the `keep - 1`
+    newest others (workers still finishing requests on the previous version
+    keep their files). Returns the number removed.
+    """
+    manifest = read_manifest(root)
+    base = os.path.join(root, VERSIONS_DIR)
+    if not manifest or not os.path.isdir(base):
+        return 0
+    active = os.path.basename(manifest["path"])
+    # Version names start with a UTC timestamp, so name order is build order
+    others = sorted((v for v in os.listdir(base) if v != active), reverse=True)
+    removed = 0
+    for v in others[max(0, keep - 1):]:
+        shutil.rmtree(os.path.join(base, v), ignore_errors=True)
+        removed += 1
+    return removed
+
+
+def _copy_active(root: str, target: str) -> None:
+    source = active_dir(root)
+    if not os.path.isdir(source):
+        os.makedirs(target)
+        return
+
+    def _skip_bookkeeping(d: str, names: list) -> list:
+        # A legacy root (no manifest yet) holds the store itself next to versions/
+        if d != root:
+            return []
+        return [n for n in names if n == VERSIONS_DIR or n.startswith(MANIFEST_FILE)]
+    shutil.copytree(source, target, ignore=_skip_bookkeeping)
+
+
+@contextmanager
+def build_lock(path: str) -> Iterator[None]:
+    """
+    Exclusive advisory lock on `<path>.lock` across processes (e.g. gunicorn
+    workers booting together), released when the block exits or the process dies.
+    """
+    lock_path = os.path.abspath(path) + ".lock"
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def staged_version(root: str, copy_active: bool = True, keep: int = 2) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (version, directory) for a new build; publish it when the block
+    completes, discard it on error. With `copy_active` the directory starts as a
+    copy of the active version, so incremental commands (sync, enrich) can run
+    against it without touching what is being served. The copy is a full
+    one: Chroma updates its sqlite and segment files in place, so hard links
+    would write through to the served version.
+    """
+    version = new_version()
+    target = os.path.join(root, VERSIONS_DIR, version)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if copy_active:
+        _copy_active(root, target)
+    else:
+        os.makedirs(target)
+    try:
+        yield version, target
+    except BaseException:
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+    publish(root, version)
+    prune(root, keep=keep)
+
+
+class ManifestWatcher:
+    """
+    Cheap change detection for one root: one stat() per `poll_seconds`,
+    re-reading the manifest only when its inode/mtime changed.
+    """
+
+    def __init__(self, root: str, poll_seconds: float = 1.0):
+        self.root = root
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._stat_key: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._manifest: Optional[dict] = None
+
+    def current(self) -> Optional[dict]:
+        now = time.monotonic()
+        if now - self._checked_at < self.poll_seconds:
+            return self._manifest
+        with self._lock:
+            self._checked_at = now
+            try:
+                st = os.stat(manifest_path(self.root))
+                key = (st.st_ino, st.st_mtime_ns)
+            except FileNotFoundError:
+                key = None
+            if key != self._stat_key:
+                try:
+                    self._manifest = read_manifest(self.root)
+                except ValueError:
+                    # Never happens with publish(); a hand-edited file keeps the last good manifest
+                    log.warning({"event": "manifest_unreadable", "root": self.root})
+                    return self._manifest
+                self._stat_key = key
+            return self._manifest
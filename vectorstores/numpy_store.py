@@ -0,0 +1,366 @@
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from vectorstores.interfaces import VectorStore
+from vectorstores.manifest import ManifestWatcher, active_dir, build_lock, has_manifest, staged_version
+from infra.metrics import stage_timer
+
+log = logging.getLogger(__name__)
+
+MATRIX_FILE = "embeddings.f32.npy"
+ROWS_FILE = "rows.json"
+SOURCE_FILE = "source.json"  # {"version": <source store version>}, readable without loading the rows
+
+
+def _matches(md: dict, where: Optional[dict]) -> bool:
+    """Minimal Chroma-style `where`: equality, $eq/$ne/$in/$nin, $and/$or."""
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(_matches(md, c) for c in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches(md, c) for c in cond):
+                return False
+            continue
+        val = md.get(key)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$eq" and val != arg:
+                    return False
+                if op == "$ne" and val == arg:
+                    return False
+                if op == "$in" and val not in arg:
+                    return False
+                if op == "$nin" and val in arg:
+                    return False
+        elif val != cond:
+            return False
+    return True
+
+
+def _mmr(query: np.ndarray, cands: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """
+    Vectorized maximal marginal relevance over unit-normalized rows.
+    Keeps a running max-similarity-to-selected vector, so each step is one
+    mat-vec instead of a Python loop over the selected set.
+    """
+    n = cands.shape[0]
+    if n == 0 or k <= 0:
+        return []
+    k = min(k, n)
+    rel = cands @ query
+    first = int(np.argmax(rel))
+    selected = [first]
+    max_sim = cands @ cands[first]
+    available = np.ones(n, dtype=bool)
+    available[first] = False
+    while len(selected) < k:
+        score = lambda_mult * rel - (1.0 - lambda_mult) * max_sim
+        score[~available] = -np.inf
+        nxt = int(np.argmax(score))
+        selected.append(nxt)
+        available[nxt] = False
+        np.maximum(max_sim, cands @ cands[nxt], out=max_sim)
+    return selected
+
+
+class _Snapshot:
+    """One loaded snapshot; requests read a single instance so rows and matrix always agree."""
+
+    def __init__(self, snapshot_dir: str, manifest_version: Optional[str] = None):
+        with open(os.path.join(snapshot_dir, ROWS_FILE), encoding="utf-8") as f:
+            rows = json.load(f)
+        self.matrix = np.load(os.path.join(snapshot_dir, MATRIX_FILE), mmap_mode="r")
+        self.ids: List[str] = rows["ids"]
+        self.documents: List[Optional[str]] = rows["documents"]
+        self.metadatas: List[dict] = rows["metadatas"]
+        self.source_version: str = rows.get("version") or ""
+        self.manifest_version = manifest_version
+
+
+class NumpyStore(VectorStore):
+    """
+    In-memory exact-search product index.
+    - Snapshot dir holds a contiguous float32 matrix (unit-normalized rows) and a
+      JSON sidecar with ids/documents/metadatas.
+    - The matrix is memory-mapped, so every gunicorn worker shares the same pages.
+    - Top fetch_k search and MMR re-ranking are batched NumPy ops.
+    Scores are reported as Chroma-style squared L2 distance (2 - 2·cos), so
+    callers see the same ordering/semantics as ChromaStore.
+    Read-only: build snapshots with `build_snapshot` from an existing store.
+    Versioned mode: when `snapshot_dir` holds a MANIFEST.json (vectorstores.manifest),
+    a newly published version is loaded by one thread while requests keep using
+    the current snapshot, then swapped in with a single reference assignment.
+    """
+
+    def __init__(
+        self, snapshot_dir: str, embed_query: Optional[Callable[[str], List[float]]] = None,
+        manifest_poll_seconds: float = 1.0,
+    ):
+        self.snapshot_dir = snapshot_dir
+        self._embed_query = embed_query
+        self._manifest = ManifestWatcher(snapshot_dir, poll_seconds=manifest_poll_seconds)
+        self._lock = threading.Lock()
+        self._swap_listeners: List[Callable[[], None]] = []
+        self._failed_version: Optional[str] = None
+        self._snap = self._load()
+
+    def _load(self) -> _Snapshot:
+        manifest = self._manifest.current()
+        if not manifest:
+            return _Snapshot(self.snapshot_dir)
+        return _Snapshot(os.path.join(self.snapshot_dir, manifest["path"]), manifest["version"])
+
+    def _current(self) -> _Snapshot:
+        snap = self._snap
+        manifest = self._manifest.current()
+        target = manifest["version"] if manifest else None
+        if target == snap.manifest_version or target == self._failed_version:
+            return snap
+        if not self._lock.acquire(blocking=False):
+            return snap  # another thread is loading the new version
+        try:
+            if self._snap is not snap:
+                return self._snap
+            try:
+                new = self._load()
+            except Exception:
+                self._failed_version = target
+                log.exception({"event": "store_switch_failed", "snapshot_dir": self.snapshot_dir,
+                               "version": target, "serving": snap.manifest_version})
+                return snap
+            self._snap = new
+            self._failed_version = None
+        finally:
+            self._lock.release()
+        log.info({"event": "store_switched", "snapshot_dir": self.snapshot_dir, "version": new.manifest_version})
+        for cb in self._swap_listeners:
+            cb()
+        return new
+
+    def on_swap(self, callback: Callable[[], None]) -> None:
+        """Register a callback fired after a newly published version is swapped in."""
+        self._swap_listeners.append(callback)
+
+    @property
+    def version(self) -> str:
+        snap = self._current()
+        if snap.manifest_version is not None:
+            return f"numpy:{snap.manifest_version}"
+        return f"numpy:{snap.source_version}"
+
+    # ---- snapshot building ----
+
+    @staticmethod
+    def build_snapshot(source: VectorStore, snapshot_dir: str, page_size: int = 1000, versioned: bool = False) -> None:
+        """
+        Export every row (with its stored embedding) from `source` into a snapshot.
+        Written to a temp dir and renamed into place, so readers never see a
+        half-written snapshot. With `versioned`, `snapshot_dir` is a manifest
+        root: the snapshot goes to a new version dir and serving stores switch
+        to it in-process.
+        """
+        if versioned:
+            with staged_version(snapshot_dir, copy_active=False) as (_, version_dir):
+                NumpyStore._export(source, version_dir, page_size)
+            return
+        parent = os.path.dirname(os.path.abspath(snapshot_dir))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = f"{snapshot_dir}.tmp-{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        NumpyStore._export(source, tmp_dir, page_size)
+        if os.path.isdir(snapshot_dir):
+            old_dir = f"{snapshot_dir}.old-{os.getpid()}"
+            os.replace(snapshot_dir, old_dir)
+            os.replace(tmp_dir, snapshot_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        else:
+            os.replace(tmp_dir, snapshot_dir)
+
+    @staticmethod
+    def snapshot_source_version(snapshot_dir: str) -> Optional[str]:
+        """Version of the store the active snapshot was exported from (None if missing)."""
+        try:
+            with open(os.path.join(active_dir(snapshot_dir), SOURCE_FILE), encoding="utf-8") as f:
+                return json.load(f).get("version")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def ensure_snapshot(
+        source: VectorStore, snapshot_dir: str, page_size: int = 1000, versioned: Optional[bool] = None
+    ) -> bool:
+        """
+        Build the snapshot when it is missing or was exported from another
+        version of `source`; returns whether it was rebuilt. Offline jobs
+        (ingest.py, precompute.py) call this, never serving workers. Concurrent
+        builders serialize on a lock file: the first one exports, the others
+        then find the snapshot current. A versioned build (default: when
+        `snapshot_dir` already has a manifest) gets a new manifest version, so
+        stores already serving it switch in-process.
+        """
+        expected = source.version
+        if NumpyStore.snapshot_source_version(snapshot_dir) == expected:
+            return False
+        with build_lock(snapshot_dir):
+            current = NumpyStore.snapshot_source_version(snapshot_dir)
+            if current == expected:
+                return False
+            log.info({"event": "snapshot_rebuild", "snapshot_dir": snapshot_dir,
+                      "snapshot_source": current, "source": expected})
+            if versioned is None:
+                versioned = has_manifest(snapshot_dir)
+            NumpyStore.build_snapshot(source, snapshot_dir, page_size, versioned=versioned)
+        return True
+
+    @staticmethod
+    def _export(source: VectorStore, out_dir: str, page_size: int) -> None:
+        ids: List[str] = []
+        documents: List[Optional[str]] = []
+        metadatas: List[dict] = []
+        # One normalized float32 block per page: only the current page is ever
+        # held as Python floats, and the final concatenate peaks at 2x the matrix
+        blocks: List[np.ndarray] = []
+        offset = 0
+        while True:
+            page = source.get_page(offset=offset, limit=page_size, with_embedding=True)
+            if not page:
+                break
+            offset += len(page)
+            rows = [r for r in page if r.get("embedding") is not None]
+            if not rows:
+                continue
+            block = np.asarray([r["embedding"] for r in rows], dtype=np.float32)
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            blocks.append(block / norms)
+            for r in rows:
+                ids.append(r["id"])
+                documents.append(r.get("page_content"))
+                metadatas.append(r.get("metadata") or {})
+
+        matrix = np.concatenate(blocks) if blocks else np.zeros((0, 0), dtype=np.float32)
+        blocks.clear()
+        np.save(os.path.join(out_dir, MATRIX_FILE), matrix)
+        version = source.version
+        with open(os.path.join(out_dir, ROWS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"version": version, "ids": ids, "documents": documents, "metadatas": metadatas}, f)
+        with open(os.path.join(out_dir, SOURCE_FILE), "w", encoding="utf-8") as f:
+            json.dump({"version": version}, f)
+
+    # ---- search ----
+
+    # Helpers take the snapshot explicitly: one request never mixes two versions
+
+    @staticmethod
+    def _mask(snap: _Snapshot, metadata_filter: Optional[dict]) -> Optional[np.ndarray]:
+        if not metadata_filter:
+            return None
+        return np.fromiter((_matches(md, metadata_filter) for md in snap.metadatas), dtype=bool, count=len(snap.metadatas))
+
+    def _query_vec(self, vector: List[float]) -> np.ndarray:
+        q = np.asarray(vector, dtype=np.float32)
+        n = np.linalg.norm(q)
+        return q / n if n else q
+
+    def _top(self, snap: _Snapshot, q: np.ndarray, k: int, metadata_filter: Optional[dict]) -> tuple[np.ndarray, np.ndarray]:
+        sims = snap.matrix @ q
+        mask = self._mask(snap, metadata_filter)
+        if mask is not None:
+            sims = np.where(mask, sims, -np.inf)
+        k = min(k, sims.shape[0])
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        idx = np.argpartition(-sims, k - 1)[:k]
+        idx = idx[np.argsort(-sims[idx])]
+        idx = idx[np.isfinite(sims[idx])]
+        return idx, sims[idx]
+
+    @staticmethod
+    def _row(snap: _Snapshot, i: int, sim: Optional[float] = None) -> Dict[str, Any]:
+        md = snap.metadatas[i] or {}
+        row = {"id": md.get("id") or md.get("product_id"), "page_content": snap.documents[i], "metadata": md}
+        if sim is not None:
+            row["score"] = float(2.0 - 2.0 * sim)
+        return row
+
+    def _embed(self, query: str) -> List[float]:
+        if self._embed_query is None:
+            raise RuntimeError("NumpyStore needs embed_query for text search")
+        with stage_timer("embedding"):
+            return self._embed_query(query)
+
+    # ---- VectorStore Protocol methods ----
+
+    def add_texts(self, texts: List[str], metadatas: List[dict], ids: List[str]) -> None:
+        raise NotImplementedError("NumpyStore is read-only; rebuild the snapshot instead")
+
+    def similarity_search(self, query: str, k: int = 5, metadata_filter: Optional[dict] = None) -> List[dict]:
+        return self.similarity_search_by_vector(self._embed(query), k=k, metadata_filter=metadata_filter)
+
+    def similarity_search_by_vector(self, vector: List[float], k: int = 5, metadata_filter: Optional[dict] = None) -> List[dict]:
+        snap = self._current()
+        idx, _ = self._top(snap, self._query_vec(vector), k, metadata_filter)
+        return [self._row(snap, int(i)) for i in idx]
+
+    def similarity_search_with_score(self, query: str, k: int = 1, filter: Optional[dict] = None) -> List[dict]:
+        q = self._query_vec(self._embed(query))
+        snap = self._current()
+        idx, sims = self._top(snap, q, k, filter)
+        return [self._row(snap, int(i), float(s)) for i, s in zip(idx, sims)]
+
+    def max_mmr_search(
+        self, query: str, k: int = 50, fetch_k: int = 105, lambda_mult: float = 0.2, metadata_filter: Optional[dict] = None
+    ) -> List[dict]:
+        return self.max_mmr_search_by_vector(
+            self._embed(query), k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, metadata_filter=metadata_filter
+        )
+
+    def max_mmr_search_by_vector(
+        self, vector: List[float], k: int = 50, fetch_k: int = 105, lambda_mult: float = 0.2, metadata_filter: Optional[dict] = None
+    ) -> List[dict]:
+        q = self._query_vec(vector)
+        snap = self._current()
+        idx, sims = self._top(snap, q, fetch_k, metadata_filter)
+        if idx.size == 0:
+            return []
+        cands = np.asarray(snap.matrix[idx])
+        selected = set(_mmr(q, cands, k, lambda_mult))
+        # Candidate (similarity) order, like ChromaStore
+        return [self._row(snap, int(i), float(s)) for j, (i, s) in enumerate(zip(idx, sims)) if j in selected]
+
+    def get_one(self, where: dict, with_embedding: bool = False) -> Optional[dict]:
+        rows = self._get(self._current(), where, with_embedding, limit=1)
+        return rows[0] if rows else None
+
+    def get_many(self, where: dict, with_embedding: bool = False) -> List[dict]:
+        return self._get(self._current(), where, with_embedding)
+
+    def get_page(self, offset: int, limit: int, where: Optional[dict] = None, with_embedding: bool = False) -> List[dict]:
+        snap = self._current()
+        if where:
+            return self._get(snap, where, with_embedding)[offset:offset + limit]
+        return [self._full_row(snap, i, with_embedding) for i in range(offset, min(offset + limit, len(snap.ids)))]
+
+    @staticmethod
+    def _full_row(snap: _Snapshot, i: int, with_embedding: bool) -> dict:
+        row = {"id": snap.ids[i], "page_content": snap.documents[i], "metadata": snap.metadatas[i] or {}}
+        if with_embedding:
+            row["embedding"] = snap.matrix[i].tolist()
+        return row
+
+    def _get(self, snap: _Snapshot, where: Optional[dict], with_embedding: bool, limit: Optional[int] = None) -> List[dict]:
+        out = []
+        for i, md in enumerate(snap.metadatas):
+            if _matches(md or {}, where):
+                out.append(self._full_row(snap, i, with_embedding))
+                if limit is not None and len(out) >= limit:
+                    break
+        return out